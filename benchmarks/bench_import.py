@@ -0,0 +1,82 @@
+"""
+导入耗时基准：检查离线入口不会加载浏览器相关的库
+
+每个场景在新的子进程中运行，测量耗时并检查 sys.modules；
+离线场景加载了 selenium、undetected_chromedriver 或 webdriver_manager 时以非零状态退出。
+
+用法：
+    python benchmarks/bench_import.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BROWSER_MODULES = ("selenium", "undetected_chromedriver", "webdriver_manager")
+
+# (名称, 代码, 是否允许加载浏览器相关的库)
+SCENARIOS = (
+    ("import citescholareasy", "import citescholareasy", False),
+    ("sanitize_filename", "from citescholareasy import sanitize_filename; sanitize_filename('a/b')", False),
+    ("import cli", "import citescholareasy.cli", False),
+    ("cli stats", "from citescholareasy.cli import main; main(['--library', LIBRARY, 'stats'])", False),
+    ("cli export", "from citescholareasy.cli import main; "
+                   "main(['--library', LIBRARY, 'export', 'ris', '-o', os.path.join(LIBRARY, '.out.ris')])", False),
+    ("cli dedup", "from citescholareasy.cli import main; main(['--library', LIBRARY, 'dedup'])", False),
+    ("import cite_downloader", "import citescholareasy.cite_downloader", True),
+)
+
+PROBE = """
+import io, json, os, sys, time, contextlib
+LIBRARY = {library!r}
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    {code}
+elapsed = time.perf_counter() - start
+loaded = sorted(name for name in {modules!r} if name in sys.modules)
+print(json.dumps({{"elapsed": elapsed, "loaded": loaded}}))
+"""
+
+
+def run_scenario(code, library):
+    source = PROBE.format(library=library, code=code, modules=BROWSER_MODULES)
+    result = subprocess.run([sys.executable, "-c", source], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景运行的次数，取最小值")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as library:
+        with open(os.path.join(library, "sample.enw"), 'w', encoding='utf-8') as f:
+            f.write("%0 Journal Article\n%T Attention Is All You Need\n%A Vaswani, Ashish\n%D 2017\n")
+
+        print(f"{'场景':<24}{'耗时(ms)':>10}  浏览器相关的库")
+        for name, code, allowed in SCENARIOS:
+            try:
+                runs = [run_scenario(code, library) for _ in range(args.repeat)]
+            except subprocess.CalledProcessError as e:
+                print(f"{name:<24}{'失败':>10}  {e.stderr.strip().splitlines()[-1:]}")
+                if not allowed:
+                    failures.append(name)
+                continue
+            best = min(run["elapsed"] for run in runs)
+            loaded = runs[0]["loaded"]
+            print(f"{name:<24}{best * 1000:>10.1f}  {', '.join(loaded) or '-'}")
+            if loaded and not allowed:
+                failures.append(name)
+
+    if failures:
+        print(f"\n以下离线场景加载了浏览器相关的库: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+标题匹配微基准：比较原来的 SequenceMatcher 路径和 TitleMatcher
+
+用法：
+    python benchmarks/bench_matcher.py [--pairs 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citescholareasy.core import matcher as matcher_module  # noqa: E402
+from citescholareasy.core.matcher import TitleMatcher  # noqa: E402
+
+WORDS = ("deep learning neural network transformer attention language model graph "
+         "retrieval generation efficient scalable robust survey analysis framework "
+         "representation optimization benchmark adaptive").split()
+HANZI = "基于深度学习的中文命名实体识别研究人工智能在自然语言处理中应用综述城镇化对农产品物流效率影响"
+PREFIXES = ("", "", "[PDF] ", "[HTML] ")
+
+
+def make_title(rng):
+    if rng.random() < 0.5:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize()
+    return "".join(rng.choice(HANZI) for _ in range(rng.randint(12, 40)))
+
+
+def make_candidate(rng, title):
+    """生成一个候选：一半是带前缀/标点变化的同一标题，一半是无关标题"""
+    if rng.random() < 0.5:
+        variant = title.upper() if rng.random() < 0.3 else title
+        return rng.choice(PREFIXES) + variant + rng.choice(("", "。", ": a survey", "（综述）"))
+    return make_title(rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=10000)
+    parser.add_argument("--candidates", type=int, default=10, help="每个查询的候选数量（批量接口）")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    queries = [make_title(rng) for _ in range(args.pairs // args.candidates)]
+    groups = [[make_candidate(rng, query) for _ in range(args.candidates)] for query in queries]
+    pairs = [(query, candidate) for query, group in zip(queries, groups) for candidate in group]
+
+    start = time.perf_counter()
+    for query, candidate in pairs:
+        SequenceMatcher(None, query.lower(), candidate.lower()).ratio()
+    baseline = time.perf_counter() - start
+
+    matcher = TitleMatcher()
+    matcher_module._profile.cache_clear()
+    matcher_module.normalize_title.cache_clear()
+    start = time.perf_counter()
+    for query, candidate in pairs:
+        matcher.score(query, candidate)
+    pairwise = time.perf_counter() - start
+
+    matcher_module._profile.cache_clear()
+    matcher_module.normalize_title.cache_clear()
+    start = time.perf_counter()
+    for query, group in zip(queries, groups):
+        matcher.score_many(query, group)
+    batched = time.perf_counter() - start
+
+    print(f"{len(pairs)} 对标题")
+    print(f"SequenceMatcher:        {baseline * 1000:8.1f} ms")
+    print(f"TitleMatcher.score:     {pairwise * 1000:8.1f} ms ({baseline / pairwise:.1f}x)")
+    print(f"TitleMatcher.score_many:{batched * 1000:8.1f} ms ({baseline / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
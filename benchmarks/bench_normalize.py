@@ -0,0 +1,157 @@
+"""
+标题规范化微基准：比较原来各自实现的规范化函数和 core.normalize
+
+原来的实现（缓存键、匹配、搜索词、文件名各自一套 str.replace 循环）按当时的代码复制在本文件中作为基线。
+同时统计同一标题的不同写法（大小写、全角、中英文标点）在缓存键上是否一致。
+
+用法：
+    python benchmarks/bench_normalize.py [--titles 20000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citescholareasy.core import normalize  # noqa: E402
+
+WORDS = ("deep learning neural network transformer attention language model graph "
+         "retrieval generation efficient scalable robust survey analysis framework "
+         "representation optimization benchmark adaptive GPT-3 BERT XL-Net").split()
+HANZI = "基于深度学习的中文命名实体识别研究人工智能在自然语言处理中应用综述城镇化对农产品物流效率影响"
+CJK_MARKS = ("：", "，", "。", "《", "》", "（", "）", "“", "”", "—")
+
+
+# 原来的实现 ---------------------------------------------------------------
+
+def old_cache_key(title):
+    title = unicodedata.normalize("NFKC", title).casefold()
+    return " ".join(title.split()).strip(" .。")
+
+
+_OLD_PREFIX_RE = re.compile(r"^\s*(?:\[(?:pdf|html|book|b|citation|c|doc|ps|引用|图书|書籍)\]\s*)+", re.IGNORECASE)
+_OLD_SEPARATOR_RE = re.compile(r"[\W_]+")
+
+
+def old_match_key(title):
+    title = unicodedata.normalize("NFKC", title)
+    title = _OLD_PREFIX_RE.sub("", title).casefold()
+    return _OLD_SEPARATOR_RE.sub(" ", title).strip()
+
+
+def old_search_query(title):
+    special_terms = ["GPT-3", "BERT", "T5", "XL-Net"]
+    preserved_terms = {}
+    for i, term in enumerate(special_terms):
+        if term in title:
+            placeholder = f"__TERM{i}__"
+            preserved_terms[placeholder] = term
+            title = title.replace(term, placeholder)
+    cleaned = title
+    for char in [':', '(', ')', '[', ']', '{', '}', '/', '\\']:
+        cleaned = cleaned.replace(char, ' ')
+    for placeholder, term in preserved_terms.items():
+        cleaned = cleaned.replace(placeholder, term)
+    cleaned = ' '.join(word if word in preserved_terms.values() else word.replace('-', ' ')
+                       for word in cleaned.split())
+    return f'"{" ".join(cleaned.split())}"'
+
+
+def old_sanitize_filename(filename):
+    for char in '<>:"/\\|?*':
+        filename = filename.replace(char, '_')
+    filename = filename.strip('. ')
+    if len(filename) > 200:
+        filename = filename[:197] + '...'
+    return filename
+
+
+# 数据 --------------------------------------------------------------------
+
+def make_title(rng):
+    if rng.random() < 0.5:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 14))]
+        if rng.random() < 0.5:
+            words.insert(rng.randint(1, len(words) - 1), rng.choice((":", "(a survey)", "/", "-")))
+        return " ".join(words).capitalize()
+    return "".join(rng.choice(HANZI) if rng.random() < 0.9 else rng.choice(CJK_MARKS)
+                   for _ in range(rng.randint(12, 40)))
+
+
+def make_variant(rng, title):
+    """同一标题的另一种写法：大小写、全角字母、中英文标点互换、句末标点"""
+    variant = title.upper() if rng.random() < 0.3 else title
+    if rng.random() < 0.3:
+        variant = "".join(chr(ord(c) + 0xFEE0) if "!" <= c <= "~" else c for c in variant)
+    variant = variant.replace("：", ": ").replace("《", "\"").replace("》", "\"") if rng.random() < 0.5 else variant
+    return variant + rng.choice(("", "。", ".", " "))
+
+
+def timed(func, titles, setup=None, repeat=5):
+    """多次运行取最短耗时（秒）"""
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for title in titles:
+            func(title)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def clear_caches():
+    for func in (normalize.fold, normalize.normalize_title):
+        func.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--titles", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    titles = [make_title(rng) for _ in range(args.titles)]
+    variants = [make_variant(rng, title) for title in titles]
+
+    print(f"{len(titles)} 个标题，单位毫秒")
+    print(f"{'函数':<20}{'原实现':>10}{'首次':>10}{'缓存命中':>10}")
+    rows = (
+        ("缓存键", old_cache_key, normalize.normalize_title),
+        ("匹配规范化", old_match_key, normalize.normalize_title),
+        ("搜索词", old_search_query, normalize.search_query),
+        ("文件名", old_sanitize_filename, normalize.sanitize_filename),
+    )
+    for name, old, new in rows:
+        baseline = timed(old, titles)
+        cold = timed(new, titles, setup=clear_caches)
+        # 搜索词和文件名不带缓存
+        warm = f"{timed(new, titles) * 1000:.1f}" if hasattr(new, "cache_clear") else "-"
+        print(f"{name:<20}{baseline * 1000:>10.1f}{cold * 1000:>10.1f}{warm:>10}")
+
+    # 标题中的书名号和引号不能把外层的精确匹配引号拆开
+    assert normalize.search_query('基于《红楼梦》的“人物”研究') == '"基于 红楼梦 的 人物 研究"'
+    assert normalize.search_query('The "Best" 「Model」') == '"The Best Model"'
+    # 配置中的术语可以是列表
+    assert normalize.search_query("GPT-3 and Self-Attention", ["GPT-3"]) == '"GPT-3 and Self Attention"'
+
+    batched = timed(normalize.normalize_many, [titles])
+    assert normalize.normalize_many(titles) == [normalize.normalize_title(title) for title in titles]
+    # 词尾的 + 和 # 保留在键中，C++ 和 C 不是同一篇论文
+    assert normalize.normalize_title("C++ vs C#") != normalize.normalize_title("C vs C")
+    print(f"\nnormalize_many（不经过缓存）: {batched * 1000:8.1f} ms")
+
+    old_same = sum(old_cache_key(a) == old_cache_key(b) for a, b in zip(titles, variants))
+    match_same = sum(old_match_key(a) == old_match_key(b) for a, b in zip(titles, variants))
+    new_same = sum(normalize.normalize_title(a) == normalize.normalize_title(b) for a, b in zip(titles, variants))
+    print(f"\n同一标题的不同写法得到相同的键：原缓存键 {old_same}/{len(titles)}，"
+          f"原匹配规范化 {match_same}/{len(titles)}，core.normalize {new_same}/{len(titles)}")
+
+
+if __name__ == "__main__":
+    main()
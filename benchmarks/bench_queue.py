@@ -0,0 +1,146 @@
+"""
+共享任务队列基准：多个下载进程同时处理同一个队列
+
+启动 MockScholar，把一批合成标题登记到任务队列，然后分别用 1、2、4 个进程处理
+（每个进程各自限速，模拟不同出口 IP 的机器），报告耗时、每分钟处理篇数和被重新领取的篇数。
+--kill-after 会在指定秒数后强制结束第一个进程（SIGKILL，不归还租约），检查它持有的论文在租约过期后被其他进程接手。
+
+用法：
+    python benchmarks/bench_queue.py [--titles 60] [--processes 1 2 4] [--rate 120] [--lease 3] [--kill-after 2]
+"""
+import argparse
+import contextlib
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_throughput import make_titles  # noqa: E402
+from mock_scholar import MockScholar  # noqa: E402
+from citescholareasy.core.work_queue import WorkQueue  # noqa: E402
+
+
+def run_child(args):
+    """
+    子进程：用 FakeDriver 处理队列直到没有可领取的论文
+    """
+    from citescholareasy.cite_downloader import CiteDownloader
+    from citescholareasy.core.rate_control import AdaptiveRateController
+    from mock_scholar import FakeDriver
+
+    class BenchDownloader(CiteDownloader):
+        def _initialize_driver(self):
+            return FakeDriver(self.download_dir)
+
+    downloader = BenchDownloader(download_dir=args.library, base_url=args.base_url,
+                                 use_cache=False, use_index=False)
+    # 每个进程代表一个出口 IP，各自限速
+    downloader.rate = AdaptiveRateController(None, initial_rate=args.rate, max_rate=args.rate,
+                                             min_rate=min(2.0, args.rate))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        downloader.download_citations(None, queue_path=args.child_queue, lease_seconds=args.lease)
+
+
+def reclaimed(queue_path):
+    """
+    统计被领取过不止一次的论文数量
+    """
+    conn = sqlite3.connect(queue_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM tasks WHERE attempts > 1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def check_stale_finish():
+    """
+    租约过期、论文被其他进程重新领取后，原来的进程不能再写回结果
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        queue_path = os.path.join(workdir, "queue.sqlite3")
+        first = WorkQueue(queue_path, lease_seconds=0.1, owner="first")
+        second = WorkQueue(queue_path, lease_seconds=60, owner="second")
+        try:
+            first.add(["Stale lease test"])
+            title = first.claim()
+            time.sleep(0.2)
+            assert second.claim() == title
+            assert not first.finish(title, reason="租约过期后写回")
+            assert second.finish(title, "second.enw")
+            assert not second.finish(title, reason="重复写回")
+            assert second.counts()["done"] == 1
+        finally:
+            first.close()
+            second.close()
+
+
+def run(processes, titles, base_url, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        queue_path = os.path.join(workdir, "queue.sqlite3")
+        queue = WorkQueue(queue_path)
+        queue.add(titles)
+        queue.close()
+
+        start = time.perf_counter()
+        children = []
+        for n in range(processes):
+            command = [sys.executable, os.path.abspath(__file__), "--child-queue", queue_path,
+                       "--base-url", base_url, "--library", os.path.join(workdir, f"library-{n}"),
+                       "--rate", str(args.rate), "--lease", str(args.lease)]
+            children.append(subprocess.Popen(command, stderr=subprocess.DEVNULL))
+        killed = False
+        while any(child.poll() is None for child in children):
+            if args.kill_after and not killed and processes > 1 and time.perf_counter() - start > args.kill_after:
+                children[0].send_signal(signal.SIGKILL)
+                killed = True
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        queue = WorkQueue(queue_path)
+        counts = queue.counts()
+        queue.close()
+        return {"elapsed": elapsed, "counts": counts, "reclaimed": reclaimed(queue_path), "killed": killed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--titles", type=int, default=60)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rate", type=float, default=120, help="每个进程的请求速率上限（次/分钟）")
+    parser.add_argument("--lease", type=float, default=3, help="租约时长（秒）")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身服务器的平均响应延迟（秒）")
+    parser.add_argument("--kill-after", type=float, default=0, help="多少秒后强制结束第一个进程，0 表示不结束")
+    parser.add_argument("--child-queue", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--library", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_queue:
+        run_child(args)
+        return
+
+    check_stale_finish()
+    server = MockScholar(latency=args.latency).start()
+    titles = make_titles(args.titles)
+    print(f"{len(titles)} 篇论文，每个进程限速 {args.rate:.0f} 次/分钟，租约 {args.lease:.0f} 秒")
+    print(f"{'进程数':>6}{'耗时(秒)':>10}{'篇/分钟':>10}{'完成':>6}{'失败':>6}{'重新领取':>10}")
+    try:
+        for processes in args.processes:
+            result = run(processes, titles, server.base_url, args)
+            counts = result["counts"]
+            note = "（第一个进程被强制结束）" if result["killed"] else ""
+            print(f"{processes:>6}{result['elapsed']:>10.1f}{len(titles) / result['elapsed'] * 60:>10.0f}"
+                  f"{counts['done']:>6}{counts['failed']:>6}{result['reclaimed']:>10}{note}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+引用库存储基准：比较每篇论文一个文件（files）和紧凑存储（packed）
+
+用替身服务器的数据生成器（不启动服务器）构造引用内容，通过下载器的保存路径写入引用库，
+然后测量写入、按内容查找已有记录、检查格式是否齐全、全库扫描的耗时，以及占用的 inode 数和磁盘空间。
+
+用法：
+    python benchmarks/bench_store.py [--records 20000] [--formats enw,bib]
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_throughput import make_titles  # noqa: E402
+from mock_scholar import MockScholar, make_cid  # noqa: E402
+from citescholareasy.cite_downloader import CiteDownloader  # noqa: E402
+from citescholareasy.core.export import iter_library  # noqa: E402
+from citescholareasy.core.files import FORMAT_EXTENSIONS  # noqa: E402
+
+
+def make_citations(count, formats):
+    """
+    生成 (标题, 格式到内容的映射) 列表
+    """
+    scholar = MockScholar()
+    citations = []
+    for title in make_titles(count):
+        cid = make_cid(title)
+        scholar._paper(title)
+        citations.append((title, {fmt: scholar.citation(cid, FORMAT_EXTENSIONS[fmt].lstrip("."))
+                                  for fmt in formats}))
+    return citations
+
+
+def disk_usage(directory):
+    """
+    返回 (文件数, 占用的磁盘字节数)
+    """
+    files = blocks = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            files += 1
+            blocks += os.stat(os.path.join(root, name)).st_blocks
+    return files, blocks * 512
+
+
+def run(storage, citations, formats):
+    with tempfile.TemporaryDirectory() as workdir:
+        library = os.path.join(workdir, "library")
+        downloader = CiteDownloader(download_dir=library, use_cache=False, use_index=False,
+                                    formats=formats, storage=storage)
+        result = {}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            paths = [downloader._store_citation(texts, title, title, 1.0) for title, texts in citations]
+            result["write"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = [downloader._existing_record(texts["enw"], title) for title, texts in citations]
+            result["find"] = time.perf_counter() - start
+            assert found == paths
+
+            start = time.perf_counter()
+            assert all(downloader._has_formats(path) for path in paths)
+            result["has_formats"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            records = sum(1 for _ in iter_library(library))
+            result["scan"] = time.perf_counter() - start
+            assert records == len(citations)
+        downloader.close()
+        result["files"], result["disk"] = disk_usage(library)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--formats", default="enw,bib", help="保存的引用格式，逗号分隔")
+    args = parser.parse_args()
+
+    formats = tuple(args.formats.split(","))
+    citations = make_citations(args.records, ("enw",) + tuple(fmt for fmt in formats if fmt != "enw"))
+    print(f"{len(citations)} 条记录，格式 {', '.join(formats)}")
+    print(f"{'存储':<8}{'写入(秒)':>10}{'查找(秒)':>10}{'格式检查(秒)':>14}{'扫描(秒)':>10}{'文件数':>8}{'磁盘(MB)':>10}")
+    for storage in CiteDownloader.STORAGES:
+        result = run(storage, citations, formats)
+        print(f"{storage:<8}{result['write']:>10.2f}{result['find']:>10.2f}{result['has_formats']:>14.2f}"
+              f"{result['scan']:>10.2f}{result['files']:>8}{result['disk'] / 1024 / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+离线吞吐量基准：针对本地 Scholar 替身运行完整的下载流程
+
+每个批次在独立的子进程中运行（峰值内存互不影响）：启动 MockScholar，
+用 FakeDriver 代替 Chrome（或使用 HTTP 后端），下载一批合成标题，
+报告每分钟处理的论文数、各阶段 p50/p95 耗时、每篇论文的传输量和峰值内存，结果写入 JSON 文件便于比较不同提交。
+
+用法：
+    python benchmarks/bench_throughput.py [--sizes 10 100 1000] [--backend browser|http|hybrid]
+                                          [--latency 0.05] [--captcha-rate 0.01] [--browser-profile full|lean]
+                                          [--pacing fast|balanced|stealth] [--pacing-budget 3]
+                                          [--navigation direct|homepage]
+                                          [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+WORDS = ("deep learning neural network transformer attention language model graph retrieval "
+         "generation efficient scalable robust survey analysis framework representation "
+         "optimization benchmark adaptive federated contrastive multimodal").split()
+HANZI = "基于深度学习的中文命名实体识别研究人工智能在自然语言处理中应用综述城镇化对农产品物流效率影响"
+
+
+def make_titles(count, seed=0):
+    """
+    生成互不相同的合成标题（英文与中文各约一半）
+    """
+    rng = random.Random(seed)
+    titles = []
+    seen = set()
+    while len(titles) < count:
+        if rng.random() < 0.5:
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize()
+        else:
+            title = "".join(rng.choice(HANZI) for _ in range(rng.randint(12, 36)))
+        if title not in seen:
+            seen.add(title)
+            titles.append(title)
+    return titles
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_batch(args):
+    """
+    在当前进程中运行一个批次（子进程模式）
+
+    返回：
+    dict: 批次结果
+    """
+    from citescholareasy.cite_downloader import CiteDownloader
+    from citescholareasy.core.rate_control import AdaptiveRateController
+    from mock_scholar import FakeDriver, MockScholar
+
+    server = MockScholar(latency=args.latency, captcha_rate=args.captcha_rate, seed=args.seed).start()
+    drivers = []
+
+    class BenchDownloader(CiteDownloader):
+        """使用 FakeDriver 代替 Chrome 的下载器"""
+
+        def _initialize_driver(self):
+            start = time.perf_counter()
+            driver = FakeDriver(self.download_dir, captcha_solve=args.captcha_solve,
+                                page_load_strategy=self.options.page_load_strategy)
+            self.startup_times.append(("fake", time.perf_counter() - start))
+            drivers.append(driver)
+            return driver
+
+    with tempfile.TemporaryDirectory() as workdir:
+        titles_file = os.path.join(workdir, "titles.txt")
+        with open(titles_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(make_titles(args.child, args.seed)) + "\n")
+
+        library = os.path.join(workdir, "library")
+        downloader = BenchDownloader(download_dir=library, backend=args.backend, base_url=server.base_url,
+                                     use_cache=False, use_index=False, formats=args.formats.split(","),
+                                     post_workers=args.post_workers, storage=args.storage,
+                                     browser_profile=args.browser_profile, pacing=args.pacing,
+                                     pacing_budget=args.pacing_budget, navigation=args.navigation)
+        # 基准默认不限速，只衡量流程本身；--rate 可模拟限速
+        downloader.rate = AdaptiveRateController(None, initial_rate=args.rate, max_rate=args.rate,
+                                                 min_rate=min(2.0, args.rate))
+        if downloader.http_backend:
+            downloader.http_backend.rate = downloader.rate
+
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            stats = downloader.download_citations(titles_file, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        summary = downloader.metrics.summary()
+
+    server.stop()
+    return {
+        "titles": args.child,
+        "succeeded": stats.succeeded,
+        "failed": len(stats.failed),
+        "elapsed": elapsed,
+        "titles_per_min": args.child / elapsed * 60 if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        # 真实浏览器中每个 WebDriver 命令是一次往返
+        "driver_commands_per_title": sum(driver.commands for driver in drivers) / args.child,
+        # 替身服务器发出的字节数，包括页面、子资源和引用内容
+        "kb_per_title": server.counters["bytes"] / 1024 / args.child,
+        # 替身服务器收到的页面请求（不含图片、样式等子资源），包括首页、结果页和引用弹窗
+        "pages_per_title": (server.counters["requests"] - server.counters["asset_requests"]) / args.child,
+        # 刻意停顿占论文处理时间的比例
+        "pacing_share": (summary["stages"].get("pacing", {}).get("total", 0.0)
+                         / (sum(record["seconds"] for record in summary["titles"]) or 1)),
+        "stages": summary["stages"],
+        "counters": summary["counters"],
+        "server": server.counters,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线吞吐量基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="批次大小")
+    parser.add_argument("--backend", choices=("browser", "http", "hybrid"), default="browser",
+                        help="browser/hybrid 使用 FakeDriver 走浏览器流程，http 使用 HTTP 后端")
+    parser.add_argument("--workers", type=int, default=1, help="并行工作线程数量")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身服务器的平均响应延迟（秒）")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="搜索请求返回验证码的比例")
+    parser.add_argument("--captcha-solve", type=float, default=1.0, help="模拟用户完成验证所需的秒数")
+    parser.add_argument("--rate", type=float, default=1e6, help="请求速率上限（次/分钟），默认不限速")
+    parser.add_argument("--formats", default="enw", help="需要的引用格式，逗号分隔，例如 enw,bib,ris")
+    parser.add_argument("--post-workers", type=int, default=2, help="后处理线程数量，0 表示不使用流水线")
+    parser.add_argument("--storage", choices=("files", "packed"), default="files", help="引用库的保存方式")
+    parser.add_argument("--browser-profile", choices=("full", "lean"), default="full",
+                        help="浏览器资源配置，lean 拦截图片、字体和统计脚本并使用 eager 页面加载策略")
+    parser.add_argument("--pacing", choices=("fast", "balanced", "stealth"), default="fast", help="交互节奏配置")
+    parser.add_argument("--pacing-budget", type=float, help="每篇论文刻意停顿的时间上限（秒）")
+    parser.add_argument("--navigation", choices=("direct", "homepage"), default="direct",
+                        help="打开搜索结果的方式，homepage 每篇论文都从首页输入搜索词")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench-throughput.json", help="结果 JSON 文件")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_batch(args)))
+        return
+
+    options = ["--backend", args.backend, "--workers", str(args.workers), "--latency", str(args.latency),
+               "--captcha-rate", str(args.captcha_rate), "--captcha-solve", str(args.captcha_solve),
+               "--rate", str(args.rate), "--formats", args.formats,
+               "--post-workers", str(args.post_workers), "--storage", args.storage,
+               "--browser-profile", args.browser_profile, "--pacing", args.pacing,
+               "--navigation", args.navigation, "--seed", str(args.seed)]
+    if args.pacing_budget is not None:
+        options += ["--pacing-budget", str(args.pacing_budget)]
+    batches = []
+    print(f"{'批次':>6}{'成功':>6}{'耗时(秒)':>10}{'篇/分钟':>10}{'峰值内存(MB)':>14}{'命令/篇':>8}{'KB/篇':>8}{'页面/篇':>8}{'停顿占比':>10}")
+    for size in args.sizes:
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(size)] + options,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{size:>6}  失败: {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        batch = json.loads(result.stdout.strip().splitlines()[-1])
+        batches.append(batch)
+        print(f"{size:>6}{batch['succeeded']:>6}{batch['elapsed']:>10.1f}"
+              f"{batch['titles_per_min']:>10.0f}{batch['peak_rss_mb']:>14.1f}"
+              f"{batch['driver_commands_per_title']:>8.1f}{batch['kb_per_title']:>8.0f}"
+              f"{batch['pages_per_title']:>8.1f}{batch['pacing_share']:>10.0%}")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {name: value for name, value in vars(args).items() if name not in ("child", "output")},
+        "batches": batches,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
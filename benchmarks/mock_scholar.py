@@ -0,0 +1,690 @@
+"""
+离线基准用的 Google Scholar 替身
+
+MockScholar：本地 HTTP 服务器，提供首页、搜索结果页、引用弹窗和 ENW 引用内容，
+以及页面引用的样式、字体、图片和统计脚本，可配置响应延迟和验证码注入比例。
+FakeDriver：用 requests + BeautifulSoup 模拟 CiteDownloader 用到的那部分 WebDriver 接口，
+浏览器流程可以在没有 Chrome 的机器上针对 MockScholar 运行。
+
+单独运行时启动服务器，便于手动调试：
+    python benchmarks/mock_scholar.py [--port 8000] [--latency 0.05] [--captcha-rate 0.02]
+"""
+import argparse
+import hashlib
+import html
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.keys import Keys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citescholareasy.core.browser_profile import is_blocked  # noqa: E402
+
+from citescholareasy.core.page_state import (CAPTCHA_SELECTOR, CITE_LINKS_SCRIPT,  # noqa: E402
+                                             CLICK_CITE_SCRIPT, ENDNOTE_LINK_SCRIPT, IMAGE_CHALLENGE_SELECTOR,
+                                             PROBE_SCRIPT, RESULT_SELECTOR, RESULTS_SCRIPT)
+
+# 绕过验证码注入的请求头，FakeDriver 用它模拟“用户已完成验证”
+SOLVED_HEADER = "X-Mock-Solved"
+
+WORDS = ("deep learning neural network transformer attention language model graph retrieval "
+         "generation efficient scalable robust survey analysis framework representation "
+         "optimization benchmark adaptive federated contrastive multimodal").split()
+AUTHORS = ("A Vaswani", "N Shazeer", "J Devlin", "MW Chang", "K Lee", "Y Bengio",
+           "G Hinton", "李明", "王芳", "张伟", "刘洋")
+VENUES = ("Advances in neural information processing systems", "arXiv preprint",
+          "Proceedings of the ACL", "计算机学报", "软件学报")
+
+# 页面引用的子资源：(路径, 大小 KB, Content-Type, 缓存秒数)
+ASSETS = {
+    "/static/scholar.css": (20, "text/css", 86400),
+    "/static/roboto.woff2": (48, "font/woff2", 86400),
+    "/static/logo.png": (12, "image/png", 86400),
+    "/static/sprite.png": (30, "image/png", 86400),
+    "/gtag/js": (140, "application/javascript", 900),
+}
+# 每次页面浏览发送的统计请求，不可缓存
+BEACON_PATH = "/g/collect"
+ASSET_TAGS = """<link rel="stylesheet" href="/static/scholar.css">
+<link rel="preload" href="/static/roboto.woff2" as="font" crossorigin>
+<script async src="/gtag/js?id=G-MOCK"></script>"""
+BODY_ASSET_TAGS = """<img src="/static/logo.png" alt="" width="149" height="23">
+<img src="/static/sprite.png" alt="" width="1" height="1">
+<img src="{beacon}?v=2&amp;en=page_view&amp;z={nonce}" alt="" width="1" height="1">"""
+
+HOMEPAGE = """<!doctype html><html><head><title>Google 学术搜索</title>{head}</head><body>
+<div id="gs_hdr_frm"><form action="/scholar" method="get" id="gs_hdr_frm_form">
+<input type="text" name="q" id="gs_hdr_tsi" value="" autocomplete="off">
+<input type="hidden" name="hl" value="zh-CN">
+<button type="submit" id="gs_hdr_tsb">搜索</button></form></div>{assets}</body></html>"""
+
+CAPTCHA_PAGE = """<!doctype html><html><head><title>Google 学术搜索</title></head><body>
+<div id="gs_captcha_ccl"><h1>请证明您不是机器人</h1>
+<form id="gs_captcha_f" method="post"><div class="g-recaptcha" data-sitekey="mock"></div>
+<script src="https://www.google.com/recaptcha/api.js"></script></form></div></body></html>"""
+
+RESULT = """<div class="gs_r gs_or gs_scl" data-cid="{cid}" data-did="{cid}" data-lid="" data-aid="{cid}" data-rp="{rp}">
+<div class="gs_ggs gs_fl"><div class="gs_ggsd"><div class="gs_or_ggsm"><a href="https://example.org/{cid}.pdf"><span class="gs_ctg2">[PDF]</span> example.org</a></div></div></div>
+<div class="gs_ri"><h3 class="gs_rt" ontouchstart="gs_evt_dsp(event)">{prefix}<a id="{cid}" href="https://example.org/{cid}" data-clk="hl=zh-CN&amp;sa=T&amp;oi=ggp">{title}</a></h3>
+<div class="gs_a">{authors} - {venue}, {year} - example.org</div>
+<div class="gs_rs">{snippet}</div>
+<div class="gs_fl gs_flb"><a href="javascript:void(0)" class="gs_or_sav gs_or_btn" role="button"><span class="gs_or_btn_lbl">保存</span></a>
+<a href="javascript:void(0)" class="gs_or_cit gs_or_btn gs_nph" role="button" aria-controls="gs_cit" aria-haspopup="true" onclick="gs_ocit(event,'{cid}','{rp}')"><span>引用</span></a>
+<a href="/scholar?cites={cid}&amp;hl=zh-CN">被引用次数：{cites}</a> <a href="/scholar?q=related:{cid}:scholar.google.com/&amp;hl=zh-CN">相关文章</a></div></div></div>"""
+
+RESULTS_PAGE = """<!doctype html><html><head><title>{query} - Google 学术搜索</title>{head}</head><body>
+<div id="gs_hdr_frm"><form action="/scholar" method="get"><input type="text" name="q" value="{query}">
+<input type="hidden" name="hl" value="zh-CN"></form></div>
+<div id="gs_res_ccl_mid">{results}</div>{assets}</body></html>"""
+
+CITE_POPUP = """<div id="gs_citt"><table><tr><th class="gs_cith">GB/T 7714</th><td><div class="gs_citr">{authors}. {title}[J]. {venue}, {year}.</div></td></tr></table></div>
+<div id="gs_citi"><a class="gs_citi" href="/scholar.bib?q=info:{cid}:scholar.google.com/&amp;output=citation&amp;scisdr=mock&amp;scisf=4&amp;ct=citation&amp;cd=-1&amp;hl=zh-CN">BibTeX</a>
+<a class="gs_citi" href="/scholar.enw?q=info:{cid}:scholar.google.com/&amp;output=citation&amp;scisdr=mock&amp;scisf=3&amp;ct=citation&amp;cd=-1&amp;hl=zh-CN">EndNote</a>
+<a class="gs_citi" href="/scholar.ris?q=info:{cid}:scholar.google.com/&amp;output=citation&amp;scisdr=mock&amp;scisf=2&amp;ct=citation&amp;cd=-1&amp;hl=zh-CN">RefMan</a>
+<a class="gs_citi" href="/scholar.rfw?q=info:{cid}:scholar.google.com/&amp;output=citation&amp;scisdr=mock&amp;scisf=1&amp;ct=citation&amp;cd=-1&amp;hl=zh-CN">RefWorks</a></div>"""
+
+
+def make_cid(title):
+    return hashlib.sha1(title.encode("utf-8")).hexdigest()[:12]
+
+
+class MockScholar:
+    """
+    本地 Google Scholar 替身服务器
+
+    特点：
+    1. 搜索结果的第一条是查询标题本身（部分带 [PDF] 前缀），其余为干扰结果
+    2. 每个响应按配置的延迟等待，按配置的比例返回验证码页面
+    3. 页面大小接近真实的结果页，便于衡量页面传输的开销
+    4. 页面引用可缓存的样式、字体、图片和统计脚本，每次浏览还会发送一个不可缓存的统计请求
+    """
+
+    def __init__(self, latency=0.05, captcha_rate=0.0, results=10, page_kb=120, seed=0,
+                 host="127.0.0.1", port=0, assets=True):
+        """
+        参数：
+        latency (float): 每个响应的平均延迟（秒），实际延迟在 0.5 到 1.5 倍之间浮动
+        captcha_rate (float): 搜索请求返回验证码页面的比例
+        results (int): 每页的结果数量
+        page_kb (int): 首页和结果页的填充大小（KB），模拟真实页面中的脚本和样式
+        seed (int): 随机数种子
+        assets (bool): 首页和结果页是否引用子资源（样式、字体、图片、统计脚本）
+        """
+        self.latency = latency
+        self.captcha_rate = captcha_rate
+        self.results = results
+        self.padding = "<style>" + ("." * 1024 * page_kb) + "</style>" if page_kb else ""
+        self.assets = assets
+        self._nonce = 0
+        self.random = random.Random(seed)
+        self.papers = {}  # cid -> 论文信息
+        self.counters = {"requests": 0, "captchas": 0, "bytes": 0, "asset_requests": 0, "asset_bytes": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """
+        在后台线程中启动服务器
+
+        返回：
+        MockScholar: 自身，便于链式调用
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-scholar", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _paper(self, title):
+        cid = make_cid(title)
+        with self._lock:
+            paper = self.papers.get(cid)
+            if paper is None:
+                rng = random.Random(cid)
+                paper = {
+                    "cid": cid,
+                    "title": title,
+                    "authors": rng.sample(AUTHORS, rng.randint(1, 4)),
+                    "venue": rng.choice(VENUES),
+                    "year": rng.randint(1995, 2024),
+                    "volume": rng.randint(1, 40),
+                    "pages": f"{rng.randint(1, 500)}-{rng.randint(501, 900)}",
+                    "cites": rng.randint(0, 50000),
+                }
+                self.papers[cid] = paper
+        return paper
+
+    def _distractor(self, query, index):
+        rng = random.Random(f"{query}:{index}")
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 12))).capitalize()
+
+    def _inject_captcha(self, handler):
+        if handler.headers.get(SOLVED_HEADER) or not self.captcha_rate:
+            return False
+        with self._lock:
+            hit = self.random.random() < self.captcha_rate
+            if hit:
+                self.counters["captchas"] += 1
+        return hit
+
+    def results_page(self, query):
+        """
+        构造搜索结果页
+        """
+        papers = [self._paper(query)] + [self._paper(self._distractor(query, i))
+                                         for i in range(1, self.results)]
+        blocks = []
+        for rp, paper in enumerate(papers):
+            prefix = ('<span class="gs_ctc"><span class="gs_ct1">[PDF]</span>'
+                      '<span class="gs_ct2">[PDF]</span></span> ') if rp % 3 == 0 else ""
+            blocks.append(RESULT.format(
+                cid=paper["cid"], rp=rp, prefix=prefix, title=html.escape(paper["title"]),
+                authors=", ".join(paper["authors"]), venue=paper["venue"], year=paper["year"],
+                snippet=html.escape(" ".join([paper["title"]] * 3)), cites=paper["cites"],
+            ))
+        return RESULTS_PAGE.format(query=html.escape(query), results="\n".join(blocks), **self.page_parts())
+
+    def page_parts(self):
+        """
+        首页和结果页共用的头部（填充和子资源）与正文末尾的子资源
+        """
+        if not self.assets:
+            return {"head": self.padding, "assets": ""}
+        with self._lock:
+            self._nonce += 1
+            nonce = self._nonce
+        return {"head": self.padding + ASSET_TAGS,
+                "assets": BODY_ASSET_TAGS.format(beacon=BEACON_PATH, nonce=nonce)}
+
+    def asset(self, path):
+        """
+        子资源的 (内容, Content-Type, Cache-Control)，不存在时返回 None
+        """
+        if path == BEACON_PATH:
+            return "GIF89a\x01\x00\x01\x00", "image/gif", "no-store"
+        if path not in ASSETS:
+            return None
+        size_kb, content_type, max_age = ASSETS[path]
+        return "x" * 1024 * size_kb, content_type, f"public, max-age={max_age}"
+
+    def cite_popup(self, cid):
+        paper = self.papers.get(cid)
+        if paper is None:
+            return None
+        return CITE_POPUP.format(cid=cid, title=html.escape(paper["title"]),
+                                 authors=", ".join(paper["authors"]), venue=paper["venue"], year=paper["year"])
+
+    def enw(self, cid):
+        paper = self.papers.get(cid)
+        if paper is None:
+            return None
+        lines = ["%0 Journal Article", f"%T {paper['title']}"]
+        lines += [f"%A {author}" for author in paper["authors"]]
+        lines += [f"%J {paper['venue']}", f"%V {paper['volume']}", f"%P {paper['pages']}",
+                  f"%@ {paper['cid']}", f"%D {paper['year']}"]
+        return "\n".join(lines) + "\n"
+
+    def citation(self, cid, extension):
+        """
+        构造指定格式（enw/bib/ris/rfw）的引用内容
+        """
+        paper = self.papers.get(cid)
+        if paper is None:
+            return None
+        if extension == "bib":
+            return (f"@article{{{paper['cid']},\n  title={{{paper['title']}}},\n"
+                    f"  author={{{' and '.join(paper['authors'])}}},\n  journal={{{paper['venue']}}},\n"
+                    f"  volume={{{paper['volume']}}},\n  pages={{{paper['pages']}}},\n  year={{{paper['year']}}}\n}}\n")
+        if extension == "ris":
+            lines = ["TY  - JOUR", f"T1  - {paper['title']}"]
+            lines += [f"A1  - {author}" for author in paper["authors"]]
+            lines += [f"JO  - {paper['venue']}", f"VL  - {paper['volume']}", f"SP  - {paper['pages']}",
+                      f"Y1  - {paper['year']}", "ER  - "]
+            return "\n".join(lines) + "\n"
+        if extension == "rfw":
+            lines = ["RT Journal Article", f"T1 {paper['title']}"]
+            lines += [f"A1 {author}" for author in paper["authors"]]
+            lines += [f"JF {paper['venue']}", f"VO {paper['volume']}", f"YR {paper['year']}"]
+            return "\n".join(lines) + "\n"
+        return self.enw(cid)
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+                with mock._lock:
+                    mock.counters["bytes"] += len(data)
+
+            def do_GET(self):
+                with mock._lock:
+                    mock.counters["requests"] += 1
+                if mock.latency:
+                    time.sleep(mock.latency * random.uniform(0.5, 1.5))
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                q = query.get("q", [""])[0]
+                cid = q[5:].split(":")[0] if q.startswith("info:") else None
+
+                asset = mock.asset(url.path)
+                if asset:
+                    body, content_type, cache_control = asset
+                    with mock._lock:
+                        mock.counters["asset_requests"] += 1
+                        mock.counters["asset_bytes"] += len(body.encode("utf-8"))
+                    return self._send(200, body, content_type, {"Cache-Control": cache_control})
+                if url.path == "/":
+                    return self._send(200, HOMEPAGE.format(**mock.page_parts()),
+                                      headers={"Set-Cookie": "GSP=LM=mock:S=mock; Path=/"})
+                if url.path == "/scholar" and query.get("output") == ["cite"]:
+                    body = mock.cite_popup(cid)
+                    return self._send(200, body) if body else self._send(404, "not found")
+                if url.path == "/scholar" and q:
+                    if mock._inject_captcha(self):
+                        return self._send(200, CAPTCHA_PAGE)
+                    # 直接打开结果页时搜索词带引号（短语检索）
+                    return self._send(200, mock.results_page(q.strip('"')))
+                if url.path.startswith("/scholar.") and cid:
+                    extension = url.path.rsplit(".", 1)[1]
+                    body = mock.citation(cid, extension)
+                    if body is None:
+                        return self._send(404, "not found")
+                    return self._send(200, body, "application/x-endnote-refer; charset=utf-8",
+                                      {"Content-Disposition": f'attachment; filename="scholar.{extension}"'})
+                return self._send(404, "not found")
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# FakeDriver
+# ---------------------------------------------------------------------------
+
+XPATH_CONTAINS = re.compile(r"^//(\w+|\*)\[contains\((text\(\)|@[\w-]+),\s*'([^']*)'\)\]$")
+
+
+def _css(by, value):
+    """
+    把 selenium 的定位方式转换为 CSS 选择器；不支持的 XPath 返回 None
+    """
+    if by == "css selector":
+        return value
+    if by == "class name":
+        return "." + value
+    if by == "name":
+        return f'[name="{value}"]'
+    if by == "id":
+        return "#" + value
+    if by == "tag name":
+        return value
+    return None
+
+
+class FakeElement:
+    """
+    FakeDriver 返回的元素
+    """
+
+    def __init__(self, driver, tag):
+        self.driver = driver
+        self.tag = tag
+
+    @property
+    def text(self):
+        self.driver.commands += 1
+        return self.tag.get_text(" ", strip=True)
+
+    def get_attribute(self, name):
+        self.driver.commands += 1
+        if name == "value":
+            return self.tag.get("value", "")
+        if name in ("innerHTML", "outerHTML"):
+            return str(self.tag) if name == "outerHTML" else self.tag.decode_contents()
+        value = self.tag.get(name)
+        return " ".join(value) if isinstance(value, list) else value
+
+    def find_elements(self, by, value):
+        return self.driver._find(self.tag, by, value)
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+    def is_displayed(self):
+        self.driver.commands += 1
+        return True
+
+    def is_enabled(self):
+        self.driver.commands += 1
+        return True
+
+    def clear(self):
+        self.driver.commands += 1
+        self.tag["value"] = ""
+
+    def send_keys(self, *keys):
+        self.driver.commands += 1
+        for key in keys:
+            if Keys.RETURN in key or Keys.ENTER in key:
+                self.driver._submit(self)
+                return
+            if key == Keys.BACKSPACE:
+                self.tag["value"] = self.tag.get("value", "")[:-1]
+                continue
+            self.tag["value"] = self.tag.get("value", "") + key
+
+    def click(self):
+        self.driver.commands += 1
+        self.driver._click(self)
+
+
+class FakeDriver:
+    """
+    针对 MockScholar 的最小 WebDriver 实现
+
+    支持 get、find_element(s)（CSS、类名、name、id 和 contains 形式的 XPath）、
+    页面状态探测脚本、设置输入框的值、点击（引用按钮加载弹窗，EndNote 链接下载文件）
+    以及 Browser.setDownloadBehavior、Network.setBlockedURLs。遇到验证码页面时，在 captcha_solve 秒后模拟用户完成验证。
+    commands 统计 WebDriver 命令数（真实浏览器中每个命令是一次往返）。
+
+    页面中同源的样式、脚本和图片按浏览器的方式加载：最多 6 个并发请求，按 Cache-Control 缓存，
+    跳过被拦截的地址；页面加载策略为 normal 时 get 等待全部子资源，eager 时只等待文档本身。
+    """
+
+    # 浏览器对同一主机的最大并发连接数
+    MAX_CONNECTIONS = 6
+
+    def __init__(self, download_dir, captcha_solve=1.0, page_load_strategy="normal"):
+        self.download_dir = download_dir
+        self.captcha_solve = captcha_solve
+        self.page_load_strategy = page_load_strategy
+        self.session = requests.Session()
+        self.blocked = ()
+        self._asset_session = requests.Session()
+        self._asset_cache = {}  # 地址 -> 过期时间
+        self._loader = ThreadPoolExecutor(self.MAX_CONNECTIONS, thread_name_prefix="fake-driver-assets")
+        self.current_url = "about:blank"
+        self.page_source = "<html><head><title></title></head><body></body></html>"
+        self.soup = BeautifulSoup(self.page_source, "html.parser")
+        self._captcha_since = None
+        self.service = self
+        self.commands = 0
+
+    # WebDriver 接口 --------------------------------------------------------
+
+    @property
+    def title(self):
+        self.commands += 1
+        return self._page_title()
+
+    def get(self, url, headers=None):
+        self.commands += 1
+        if url == "about:blank":
+            return
+        response = self.session.get(url, headers=headers, timeout=30)
+        self.current_url = response.url
+        self.page_source = response.text
+        self.soup = BeautifulSoup(response.text, "html.parser")
+        captcha = self.soup.select_one(CAPTCHA_SELECTOR) is not None
+        self._captcha_since = (self._captcha_since or time.monotonic()) if captcha else None
+        pending = self._load_subresources()
+        if self.page_load_strategy != "eager":
+            wait(pending)
+
+    def find_elements(self, by, value):
+        return self._find(self.soup, by, value)
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        self.commands += 1
+        if script == PROBE_SCRIPT:
+            return self._probe()
+        if script == RESULTS_SCRIPT:
+            return self._results(args[0])
+        if script == CLICK_CITE_SCRIPT:
+            return self._click_cite(args[0], args[1])
+        if script == ENDNOTE_LINK_SCRIPT:
+            link = next((link for link in self.soup.select("#gs_citi a[href], #gs_cit a[href]")
+                         if re.search(r"format=enw|scholar\.enw", link["href"]) or "EndNote" in link.get_text()), None)
+            return FakeElement(self, link) if link is not None else None
+        if script == CITE_LINKS_SCRIPT:
+            return [[urljoin(self.current_url, link["href"]), link.get_text()]
+                    for link in self.soup.select("#gs_citi a[href], #gs_cit a[href]")]
+        if script.startswith("arguments[0].value"):
+            args[0].tag["value"] = args[1]
+            return None
+        if script.startswith("arguments[0].click"):
+            args[0].click()
+            return None
+        # 滚动等与页面内容无关的脚本
+        return 0
+
+    def get_cookies(self):
+        self.commands += 1
+        return [{"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+                for cookie in self.session.cookies]
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.commands += 1
+        if cmd == "Browser.setDownloadBehavior":
+            self.download_dir = params["downloadPath"]
+        elif cmd == "Network.setBlockedURLs":
+            self.blocked = tuple(params["urls"])
+        return {}
+
+    def quit(self):
+        self.stop()
+
+    def stop(self):
+        # 对应 driver.service.stop()
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        self._asset_session.close()
+
+    # 内部实现 ----------------------------------------------------------------
+
+    def _find(self, root, by, value):
+        self.commands += 1
+        css = _css(by, value)
+        if css is not None:
+            tags = root.select(css)
+        else:
+            match = XPATH_CONTAINS.match(value) if by == "xpath" else None
+            if not match:
+                return []
+            name, attribute, needle = match.groups()
+            tags = [tag for tag in root.find_all(None if name == "*" else name)
+                    if needle in (tag.get_text() if attribute == "text()" else str(tag.get(attribute[1:], "")))]
+        return [FakeElement(self, tag) for tag in tags]
+
+    def _page_title(self):
+        return self.soup.title.get_text() if self.soup.title else ""
+
+    def _probe(self):
+        if self._captcha_since is not None and time.monotonic() - self._captcha_since >= self.captcha_solve:
+            # 模拟用户完成验证：重新加载当前页面，服务器不再注入验证码
+            self.get(self.current_url, headers={SOLVED_HEADER: "1"})
+        return {
+            "url": self.current_url,
+            "title": self._page_title(),
+            "results": len(self.soup.select(RESULT_SELECTOR)),
+            "search_box": self.soup.select_one("input[name='q']") is not None,
+            "captcha": self.soup.select_one(CAPTCHA_SELECTOR) is not None,
+            "image_challenge": self.soup.select_one(IMAGE_CHALLENGE_SELECTOR) is not None,
+        }
+
+    @staticmethod
+    def _find_cite(box):
+        cite = box.select_one(".gs_or_cit, a[onclick*='gs_ocit']")
+        if cite is None:
+            cite = next((link for link in box.find_all("a") if link.get_text().strip() in ("Cite", "引用")), None)
+        return cite
+
+    def _results(self, selectors):
+        for selector in selectors:
+            nodes = self.soup.select(selector)
+            if not nodes:
+                continue
+            results = []
+            for index, node in enumerate(nodes):
+                heading = node.select_one(".gs_rt")
+                if heading is None:
+                    continue
+                box = node if node.get("data-cid") else node.find_parent(attrs={"data-cid": True}) or node
+                enw = next((urljoin(self.current_url, link["href"]) for link in box.find_all("a", href=True)
+                            if re.search(r"format=enw|scholar\.enw", link["href"]) or "EndNote" in link.get_text()),
+                           None)
+                cite = self._find_cite(box)
+                match = re.search(r"gs_ocit\(event,\s*'([^']*)',\s*'([^']*)'", cite.get("onclick", "")) if cite else None
+                results.append({
+                    "index": index,
+                    "title": heading.get_text(" ", strip=True),
+                    "cid": box.get("data-cid") or (match and match.group(1)) or None,
+                    "rp": box.get("data-rp") or (match and match.group(2)) or "0",
+                    "enw": enw,
+                    "cite": cite is not None,
+                    # 没有布局，按每条结果约 150 像素估计
+                    "top": 200 + 150 * index,
+                })
+            return {"selector": selector, "results": results}
+        return None
+
+    def _click_cite(self, selector, index):
+        nodes = self.soup.select(selector)
+        if index >= len(nodes):
+            return False
+        node = nodes[index]
+        box = node if node.get("data-cid") else node.find_parent(attrs={"data-cid": True}) or node
+        cite = self._find_cite(box)
+        if cite is None:
+            return False
+        self._click(FakeElement(self, cite))
+        return True
+
+    def _load_subresources(self):
+        """
+        开始加载当前页面引用的同源子资源，返回未完成的任务
+        """
+        origin = urlparse(self.current_url).netloc
+        tags = (self.soup.select('link[href][rel~="stylesheet"], link[href][rel~="preload"]')
+                + self.soup.select("script[src], img[src]"))
+        pending = []
+        now = time.monotonic()
+        for tag in tags:
+            url = urljoin(self.current_url, tag.get("href") or tag.get("src"))
+            if urlparse(url).netloc != origin or is_blocked(url, self.blocked):
+                continue
+            if self._asset_cache.get(url, 0) > now:
+                continue
+            pending.append(self._loader.submit(self._fetch_subresource, url))
+        return pending
+
+    def _fetch_subresource(self, url):
+        try:
+            response = self._asset_session.get(url, timeout=30)
+        except requests.RequestException:
+            return
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        if match and "no-store" not in response.headers.get("Cache-Control", ""):
+            self._asset_cache[url] = time.monotonic() + int(match.group(1))
+
+    def _submit(self, element):
+        form = element.tag.find_parent("form")
+        action = urljoin(self.current_url, form.get("action", "")) if form else self.current_url
+        params = {}
+        for field in (form.find_all("input") if form else [element.tag]):
+            if field.get("name"):
+                params[field["name"]] = field.get("value", "")
+        self.get(action.split("?")[0] + "?" + urlencode(params))
+
+    def _click(self, element):
+        tag = element.tag
+        classes = tag.get("class") or []
+        if "gs_or_cit" in classes:
+            container = tag.find_parent(attrs={"data-cid": True})
+            url = urljoin(self.current_url, "/scholar") + "?" + urlencode({
+                "q": f"info:{container['data-cid']}:scholar.google.com/",
+                "output": "cite", "scirp": container.get("data-rp", "0"), "hl": "zh-CN",
+            })
+            popup = self.session.get(url, timeout=30).text
+            holder = self.soup.new_tag("div", id="gs_cit")
+            holder.append(BeautifulSoup(popup, "html.parser"))
+            self.soup.body.append(holder)
+            return
+        href = tag.get("href")
+        if not href or href.startswith("javascript:"):
+            return
+        url = urljoin(self.current_url, href)
+        if "/scholar." in url:
+            self._download(url)
+        else:
+            self.get(url)
+
+    def _download(self, url):
+        # 与 Chrome 一样先写 .crdownload，写完后改名
+        response = self.session.get(url, timeout=30)
+        match = re.search(r'filename="?([^";]+)"?', response.headers.get("Content-Disposition", ""))
+        name = match.group(1) if match else os.path.basename(urlparse(url).path)
+        path = os.path.join(self.download_dir, name)
+        with open(path + ".crdownload", 'wb') as f:
+            f.write(response.content)
+        os.replace(path + ".crdownload", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Google Scholar 替身服务器")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05, help="平均响应延迟（秒）")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="搜索请求返回验证码的比例")
+    args = parser.parse_args()
+    server = MockScholar(latency=args.latency, captcha_rate=args.captcha_rate, port=args.port).start()
+    print(f"替身服务器: {server.base_url}  (Ctrl+C 退出)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+CiteScholarEasy - Google Scholar 引用下载工具
+
+CiteDownloader 在第一次访问时才导入，只使用文件工具的脚本不会加载 selenium 等浏览器相关的库。
+"""
+from citescholareasy.core.files import get_endnote_title, sanitize_filename
+
+__all__ = ["CiteDownloader", "get_endnote_title", "sanitize_filename"]
+
+
+def __getattr__(name):
+    if name == "CiteDownloader":
+        from citescholareasy.cite_downloader import CiteDownloader
+        return CiteDownloader
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
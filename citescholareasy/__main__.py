@@ -0,0 +1,3 @@
+from citescholareasy.cli import main
+
+main()
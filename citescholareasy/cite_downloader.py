@@ -5,25 +5,55 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 import time
 import os
 import random
-from difflib import SequenceMatcher
 import undetected_chromedriver as uc
 import sys
-import glob
 import shutil
 from pathlib import Path
+from urllib.parse import urljoin
 import urllib3
+import requests
 from urllib3.exceptions import MaxRetryError, NewConnectionError
 import socket
 import logging
+import threading
+import itertools
 
-# 设置日志记录
-logging.basicConfig(level=logging.INFO,
-                   format='%(asctime)s - %(levelname)s - %(message)s')
+# 以脚本方式运行时，把项目根目录加入模块搜索路径
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citescholareasy.core.inputs import TitleStream
+from citescholareasy.core.http_backend import (DEFAULT_BASE_URL, CaptchaDetected, ScholarHttpBackend,
+                                               build_search_url, build_session, citation_format)
+from citescholareasy.core import journal
+from citescholareasy.core.browser_profile import BROWSER_PROFILES, block_resources, configure_options
+from citescholareasy.core.cache import CitationCache
+from citescholareasy.core.driver_startup import DriverPathCache
+from citescholareasy.core.downloads import (DownloadWatcher, cleanup_download_dirs,
+                                            create_download_dir)
+from citescholareasy.core.enw import detect_encoding, iter_lines_records
+from citescholareasy.core.files import (FORMAT_EXTENSIONS, format_path, get_endnote_title,
+                                        sanitize_filename)
+from citescholareasy.core.journal import JobJournal
+from citescholareasy.core.library_lock import lock_directory, unlock
+from citescholareasy.core.matcher import TitleMatcher
+from citescholareasy.core.metrics import RunMetrics
+from citescholareasy.core.normalize import PROTECTED_TERMS, search_query
+from citescholareasy.core.pacing import DEFAULT_PACING, PACING_PROFILES, Pacer
+from citescholareasy.core.page_state import (CITE_LINKS_SCRIPT, CLICK_CITE_SCRIPT, ENDNOTE_LINK_SCRIPT,
+                                             RESULT_SELECTORS, RESULTS_SCRIPT, probe_page)
+from citescholareasy.core.pipeline import DEFERRED, PostProcessor
+from citescholareasy.core.rate_control import AdaptiveRateController
+from citescholareasy.core.store import PackedStore
+from citescholareasy.core.title_index import TitleIndex
+from citescholareasy.core.work_queue import WorkQueue
+from citescholareasy.core.worker_pool import BrowserWorkerPool, RunStats
+
+# 日志格式由命令行入口配置，导入本模块不会修改全局日志设置
 logger = logging.getLogger(__name__)
 
 class CiteDownloader:
@@ -39,7 +69,29 @@ class CiteDownloader:
     5. 智能重试机制
     """
     
-    def __init__(self, download_dir="downloads", headless=True, max_retries=3):
+    BACKENDS = ("browser", "http", "hybrid")
+
+    # 引用库的保存方式：files 每篇论文一个 .enw 文件，packed 追加写入紧凑存储
+    STORAGES = ("files", "packed")
+
+    # 浏览器资源配置：full 加载全部资源，lean 拦截图片、字体和统计脚本并在 DOM 就绪后即返回
+    BROWSER_PROFILES = BROWSER_PROFILES
+
+    # 浏览器打开搜索结果的方式：direct 直接打开结果页地址，homepage 先打开首页再输入搜索词
+    NAVIGATIONS = ("direct", "homepage")
+
+    # 不访问网络的处理来源，处理后无需等待
+    OFFLINE_SOURCES = ("cache", "journal", "library")
+
+    # 多个工作线程共用引用库目录，重命名时需要互斥
+    _rename_lock = threading.Lock()
+
+    def __init__(self, download_dir="downloads", headless=True, max_retries=3,
+                 backend="browser", base_url=DEFAULT_BASE_URL, library_dir=None,
+                 use_cache=True, cache_path=None, use_index=True, dedup_threshold=0.95,
+                 rate_state_path=None, profile_dir=None, attach=None, formats=("enw",), post_workers=2,
+                 storage="files", browser_profile="full", pacing=DEFAULT_PACING, pacing_budget=None,
+                 navigation="direct"):
         """
         初始化下载器
         
@@ -47,14 +99,118 @@ class CiteDownloader:
         download_dir (str): 下载文件保存目录
         headless (bool): 是否使用无头模式（不显示浏览器界面）
         max_retries (int): 最大重试次数
+        backend (str): 检索后端，"browser" 使用 Chrome，"http" 直接发送 HTTP 请求（遇到验证码时切换到浏览器），
+                       "hybrid" 用浏览器检索，再用共享浏览器 Cookie 的 HTTP 会话直接获取引用内容
+        base_url (str): Scholar 根地址，可指向本地替身服务器
+        library_dir (str): 重命名后引用文件的存放目录，默认与下载目录相同
+        use_cache (bool): 是否使用持久化引用缓存
+        cache_path (str): 缓存数据库路径，默认为引用库目录下的 .citation_cache.sqlite3
+        use_index (bool): 是否在检索前用引用库标题索引查找已有的相同论文
+        dedup_threshold (float): 认为引用库中已有该论文的最低相似度
+        rate_state_path (str): 保存自适应请求速率的文件，默认为引用库目录下的 .rate_state.json
+        profile_dir (str): 持久化的浏览器用户目录，默认每次使用全新的临时目录
+        attach (str): 已启动浏览器的远程调试地址（如 "127.0.0.1:9222"），设置后不再启动新浏览器
+        formats (tuple): 需要的引用格式（enw、bib、ris、refworks），enw 总是会获取，作为引用库的主记录
+        post_workers (int): 下载后处理（重命名、其他格式、缓存和索引）的后台线程数量，0 表示在浏览器线程中直接处理
+        storage (str): 引用库的保存方式，"files" 每篇论文一个 .enw 文件，
+                       "packed" 追加写入引用库目录下的紧凑存储（.store），可用 export files 导出为单独的文件
+        browser_profile (str): 浏览器资源配置，"full" 加载页面的全部资源，
+                               "lean" 拦截图片、字体和统计脚本，页面在 DOM 就绪后即返回
+        pacing (str): 浏览器交互的节奏配置：fast 不做刻意停顿，balanced 只在关键操作前短暂停顿，
+                      stealth 逐字输入并分步滚动，见 core.pacing.PACING_PROFILES
+        pacing_budget (float): 每篇论文刻意停顿的时间上限（秒），默认使用节奏配置中的值
+        navigation (str): 浏览器打开搜索结果的方式："direct" 直接打开由 clean_search_query 生成的结果页地址，
+                          只在浏览器刚启动（还没有 Cookie）或上次直接打开没有得到结果页时先访问首页；
+                          "homepage" 每篇论文都先打开首页再输入搜索词
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的后端: {backend}，可选: {', '.join(self.BACKENDS)}")
+        if storage not in self.STORAGES:
+            raise ValueError(f"不支持的保存方式: {storage}，可选: {', '.join(self.STORAGES)}")
+        if navigation not in self.NAVIGATIONS:
+            raise ValueError(f"不支持的打开方式: {navigation}，可选: {', '.join(self.NAVIGATIONS)}")
+        if pacing not in PACING_PROFILES:
+            raise ValueError(f"不支持的节奏配置: {pacing}，可选: {', '.join(PACING_PROFILES)}")
+        if browser_profile not in self.BROWSER_PROFILES:
+            raise ValueError(f"不支持的浏览器配置: {browser_profile}，可选: {', '.join(self.BROWSER_PROFILES)}")
+        unknown = [fmt for fmt in formats if fmt not in FORMAT_EXTENSIONS]
+        if unknown:
+            raise ValueError(f"不支持的引用格式: {', '.join(unknown)}，可选: {', '.join(FORMAT_EXTENSIONS)}")
+        self.formats = ("enw",) + tuple(fmt for fmt in dict.fromkeys(formats) if fmt != "enw")
         self.download_dir = os.path.abspath(download_dir)
+        self.library_dir = os.path.abspath(library_dir) if library_dir else self.download_dir
+        self.headless = headless
         self.max_retries = max_retries
-        if not os.path.exists(self.download_dir):
-            os.makedirs(self.download_dir)
+        self.matcher = TitleMatcher()
+        # 生成搜索词时保留连字符的术语
+        self.protected_terms = PROTECTED_TERMS
+        self.backend = backend
+        self.base_url = base_url
+        for directory in (self.download_dir, self.library_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
         
         # 初始化 Chrome 选项
+        self.profile_dir = os.path.abspath(profile_dir) if profile_dir else None
+        self.attach = attach
+        self.user_agent = None
+        self.browser_profile = browser_profile
         self.options = self._initialize_chrome_options(headless)
+        # 每次浏览器启动的耗时记录：(方式, 秒)
+        self.startup_times = []
+        
+        # 自适应请求速率：所有访问 Scholar 的请求都先经过它
+        self.rate = AdaptiveRateController(
+            rate_state_path or os.path.join(self.library_dir, ".rate_state.json")
+        )
+        
+        # 分阶段计时和计数
+        self.metrics = RunMetrics()
+        
+        # 浏览器交互中的刻意停顿，每篇论文有时间预算
+        self.pacer = Pacer(pacing, pacing_budget, self.metrics)
+        
+        # 浏览器在第一次需要时才启动
+        self.driver = None
+        self.wait = None
+        # 结果页的打开方式；浏览器通过首页完成一次搜索（已有 Cookie）后才直接打开结果页
+        self.navigation = navigation
+        self._session_ready = False
+        self.http_backend = ScholarHttpBackend(base_url=base_url, rate=self.rate) if backend == "http" else None
+        # 混合模式中与浏览器共享 Cookie 的 HTTP 会话，第一次使用时创建
+        self.cite_session = None
+        
+        # 引用缓存：命中时无需访问网络
+        self.cache = None
+        if use_cache:
+            self.cache = CitationCache(cache_path or os.path.join(self.library_dir, ".citation_cache.sqlite3"))
+        # 紧凑存储：所有引用追加写入少量段文件，不再每篇论文一个文件
+        self.storage = storage
+        self.store = PackedStore(self.library_dir) if storage == "packed" else None
+        # 引用库标题索引：库中已有几乎相同的记录时跳过检索
+        self.dedup_threshold = dedup_threshold
+        self.title_index = TitleIndex(self.library_dir, self.get_endnote_title, self.matcher,
+                                      store=self.store) if use_index else None
+        
+        # 最近一篇论文的来源："cache"、"library"、"journal"、"http" 或 "browser"，以及失败原因
+        self.last_source = None
+        self.last_error = None
+        
+        # 任务日志，由 download_citations 在运行时打开
+        self.journal = None
+        # 多进程共享的任务队列，使用 --queue 时由 download_citations 打开
+        self.queue = None
+        # 引用库和下载目录的进程锁，由 download_citations 在运行时持有
+        self._locks = []
+        
+        # 后处理流水线，由 download_citations 在运行时启动
+        self.post_workers = post_workers
+        self.pipeline = None
+        # 正在处理的论文及其完成回调，交给后处理线程时使用
+        self._current = (None, None)
+        
+        # 工作线程共用主下载器的缓存和日志，只由主下载器负责关闭
+        self._owns_shared = True
         
     def _initialize_chrome_options(self, headless):
         """
@@ -67,6 +223,12 @@ class CiteDownloader:
         ChromeOptions: 配置好的浏览器选项
         """
         options = uc.ChromeOptions()
+        if self.attach:
+            # 连接已启动的浏览器时只能设置调试地址
+            options.debugger_address = self.attach
+            # 首选项和启动参数对已启动的浏览器不生效，页面加载策略仍然有效
+            configure_options(options, {}, self.browser_profile)
+            return options
         
         # 设置下载和安全相关首选项
         prefs = {
@@ -78,6 +240,7 @@ class CiteDownloader:
             "credentials_enable_service": False,  # 禁用凭据服务
             "profile.password_manager_enabled": False  # 禁用密码管理器
         }
+        configure_options(options, prefs, self.browser_profile)
         options.add_experimental_option("prefs", prefs)
         
         # 配置浏览器选项
@@ -93,6 +256,8 @@ class CiteDownloader:
         options.add_argument('--disable-popup-blocking')  # 禁用弹窗拦截
         options.add_argument('--disable-automation')  # 禁用自动化标志
         options.add_argument('--disable-blink-features=AutomationControlled')  # 禁用自动化控制特征
+        if self.profile_dir:
+            options.add_argument(f'--user-data-dir={self.profile_dir}')  # 复用用户目录，保留 Cookie 和缓存
         
         # 随机选择一个用户代理
         user_agents = [
@@ -100,7 +265,9 @@ class CiteDownloader:
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
         ]
-        options.add_argument(f'--user-agent={random.choice(user_agents)}')
+        # 混合模式的 HTTP 会话使用同一个用户代理
+        self.user_agent = random.choice(user_agents)
+        options.add_argument(f'--user-agent={self.user_agent}')
         
         return options
 
@@ -117,12 +284,18 @@ class CiteDownloader:
         retry_count = 0
         while retry_count < self.max_retries:
             try:
-                # 使用 selenium 原生的 Chrome WebDriver
-                service = Service(ChromeDriverManager().install())
+                start_time = time.perf_counter()
+                # 使用 selenium 原生的 Chrome WebDriver，驱动路径按 Chrome 版本缓存
+                service = Service(DriverPathCache().resolve())
                 driver = webdriver.Chrome(service=service, options=self.options)
                 
-                # 测试连接
-                driver.get("about:blank")
+                # 测试连接（连接已有浏览器时不离开当前页面）
+                if not self.attach:
+                    driver.get("about:blank")
+                elapsed = time.perf_counter() - start_time
+                kind = "连接已启动的浏览器" if self.attach else ("复用用户目录启动" if self.profile_dir else "冷启动")
+                self.startup_times.append((kind, elapsed))
+                print(f"浏览器就绪 ({kind})，耗时 {elapsed:.2f} 秒")
                 return driver
             except (socket.error, urllib3.exceptions.MaxRetryError,
                     urllib3.exceptions.NewConnectionError) as e:
@@ -137,15 +310,133 @@ class CiteDownloader:
                 logger.error(f"WebDriver 初始化时发生未知错误: {str(e)}")
                 raise
 
+    def _ensure_driver(self):
+        """
+        获取当前浏览器，尚未启动时初始化
+        
+        返回：
+        tuple: (WebDriver, WebDriverWait)
+        """
+        if self.driver is None:
+            print("\n初始化浏览器...")
+            with self.metrics.stage("driver_init"):
+                self.driver = self._initialize_driver()
+                self._apply_browser_profile(self.driver)
+            self.wait = WebDriverWait(self.driver, 2)
+            self._session_ready = False
+        return self.driver, self.wait
+
+    def _restart_driver(self):
+        """
+        关闭并重新初始化浏览器，用于连接错误后的恢复
+        """
+        self._close_driver()
+        with self.metrics.stage("driver_init"):
+            self.driver = self._initialize_driver()
+            self._apply_browser_profile(self.driver)
+        self.wait = WebDriverWait(self.driver, 15)
+        self._session_ready = False
+
+    def _apply_browser_profile(self, driver):
+        """
+        lean 配置下为新启动的浏览器开启资源拦截
+        
+        参数：
+        driver (WebDriver): 浏览器驱动
+        """
+        if self.browser_profile == "lean":
+            block_resources(driver)
+
+    def _close_driver(self):
+        """
+        关闭浏览器（如果已启动）
+        """
+        if self.driver:
+            try:
+                if self.attach:
+                    # 只断开连接，保留预先启动的浏览器供下次使用
+                    self.driver.service.stop()
+                else:
+                    self.driver.quit()
+            except:
+                pass
+        self.driver = None
+        self.wait = None
+
+    def clone_for_worker(self, worker_dir):
+        """
+        创建使用独立下载目录、共享引用库目录的下载器，供并行工作线程使用
+        
+        参数：
+        worker_dir (str): 工作线程专属的下载目录
+        
+        返回：
+        CiteDownloader: 新的下载器实例
+        """
+        # 使用 type(self)，子类（例如基准测试中替换了浏览器的下载器）克隆后仍是同一类型
+        worker = type(self)(
+            download_dir=worker_dir,
+            headless=self.headless,
+            max_retries=self.max_retries,
+            backend=self.backend,
+            base_url=self.base_url,
+            library_dir=self.library_dir,
+            use_cache=False,
+            use_index=False,
+            dedup_threshold=self.dedup_threshold,
+            # 同一个用户目录不能同时被多个浏览器使用
+            profile_dir=f"{self.profile_dir}-{os.path.basename(worker_dir)}" if self.profile_dir else None,
+            formats=self.formats,
+            browser_profile=self.browser_profile,
+            pacing=self.pacer.profile,
+            pacing_budget=self.pacer.budget,
+            navigation=self.navigation,
+        )
+        # 所有工作线程共用同一个缓存连接、紧凑存储、标题索引、任务日志、运行指标和请求速率（同一出口 IP）
+        worker.rate = self.rate
+        worker.metrics = self.metrics
+        worker.pacer.metrics = self.metrics
+        if worker.http_backend:
+            worker.http_backend.rate = self.rate
+        worker.cache = self.cache
+        worker.storage, worker.store = self.storage, self.store
+        worker.title_index = self.title_index
+        worker.journal = self.journal
+        worker.queue = self.queue
+        worker.pipeline = self.pipeline
+        worker._owns_shared = False
+        return worker
+
+    def close(self):
+        """
+        释放浏览器和 HTTP 连接池
+        """
+        self._close_driver()
+        if self.http_backend:
+            self.http_backend.close()
+        if self.cite_session:
+            self.cite_session.close()
+            self.cite_session = None
+        if self._owns_shared:
+            self.rate.save()
+            if self.cache:
+                self.cache.close()
+            if self.title_index is not None:
+                self.title_index.close()
+            if self.store:
+                self.store.close()
+            if self.journal:
+                self.journal.close()
+
     def random_sleep(self, min_time=0.1, max_time=0.2):
         """
-        随机等待一段时间，模拟人类操作间隔
+        随机等待一段时间，模拟人类操作间隔（计入本篇论文的刻意停顿预算）
         
         参数：
         min_time (float): 最小等待时间（秒）
         max_time (float): 最大等待时间（秒）
         """
-        time.sleep(random.uniform(min_time, max_time))
+        self.pacer.sleep_between(min_time, max_time)
         
     def simulate_human_typing(self, element, text):
         """
@@ -159,19 +450,9 @@ class CiteDownloader:
         1. 随机的输入速度
         2. 偶尔会输入错误并修正
         3. 在标点符号后停顿较长时间
+        4. 输入速度和打错的概率由节奏配置决定，本篇论文的停顿预算用完后剩余文字一次输入
         """
-        for char in text:
-            if random.random() < 0.05:  # 5% 的概率输入错误
-                typo = random.choice('qwertyuiopasdfghjklzxcvbnm')
-                element.send_keys(typo)
-                time.sleep(random.uniform(0.1, 0.3))
-                element.send_keys(Keys.BACKSPACE)
-                time.sleep(random.uniform(0.1, 0.3))
-            element.send_keys(char)
-            if char in [' ', '.', ',']:
-                time.sleep(random.uniform(0.3, 0.7))  # 标点后停顿较长
-            else:
-                time.sleep(random.uniform(0.1, 0.4))  # 正常输入速度
+        self.pacer.type_keys(element, text)
             
     def add_random_noise(self, text):
         """
@@ -226,18 +507,35 @@ class CiteDownloader:
         1. 分步滚动
         2. 随机的滚动偏移
         3. 每步之间有短暂停顿
+        4. 步数和停顿由节奏配置决定，fast 配置只把元素滚动到可见位置
         """
         location = element.location_once_scrolled_into_view
-        offset = random.randint(-100, 100)
-        current_scroll = driver.execute_script("return window.pageYOffset;")
-        target_scroll = location['y'] + offset
-        steps = random.randint(5, 10)
+        self.pacer.scroll_to(driver, location['y'])
         
-        for i in range(steps):
-            scroll_to = current_scroll + (target_scroll - current_scroll) * (i + 1) / steps
-            driver.execute_script(f"window.scrollTo(0, {scroll_to});")
-            time.sleep(random.uniform(0.1, 0.3))
+    def _acquire_rate(self):
+        """
+        等待请求令牌，等待时间单独计入 rate_wait 阶段
+        """
+        with self.metrics.stage("rate_wait"):
+            self.rate.acquire()
+
+    def _pass_captcha(self, driver):
+        """
+        检查当前页面是否为验证码页面，并据此调整请求速率
         
+        参数：
+        driver (WebDriver): 浏览器驱动
+        
+        返回：
+        bool: 是否可以继续（无验证码或验证成功）
+        """
+        if probe_page(driver).blocked:
+            self.metrics.count("captchas")
+            self.rate.on_captcha()
+            return self.handle_captcha(driver)
+        self.rate.on_success()
+        return True
+
     def handle_captcha(self, driver):
         """
         处理 Google Scholar 的验证码页面
@@ -253,6 +551,28 @@ class CiteDownloader:
         2. 等待用户完成验证
         3. 检查验证结果
         4. 超时处理
+        
+        说明：
+        lean 配置在验证期间暂停资源拦截，验证码的图片和字体可以正常加载，结束后恢复
+        """
+        lean = self.browser_profile == "lean"
+        if lean:
+            block_resources(driver, ())
+        try:
+            return self._wait_for_verification(driver)
+        finally:
+            if lean:
+                block_resources(driver)
+
+    def _wait_for_verification(self, driver):
+        """
+        提示用户完成验证并等待验证码页面消失
+        
+        参数：
+        driver (WebDriver): 浏览器驱动
+        
+        返回：
+        bool: 验证是否成功
         """
         print("\n" + "="*50)
         print("Google Scholar 需要验证")
@@ -266,18 +586,22 @@ class CiteDownloader:
         
         max_wait = 300  # 5 分钟超时
         start_time = time.time()
+        hint = None
         
         while time.time() - start_time < max_wait:
             try:
-                if "sorry" not in driver.page_source.lower():
+                # 每秒只探测一次页面状态，不再拉取整个页面源码
+                state = probe_page(driver)
+                if not state.blocked:
                     print("\n验证成功！继续处理...")
-                    self.random_sleep(2, 3)
+                    self.pacer.pause("after_captcha")
                     return True
                 
-                if '请证明您不是机器人' in driver.page_source:
-                    print('请点击"我不是机器人"复选框...')
-                elif '请选择所有匹配的图片' in driver.page_source:
-                    print('请完成图片验证...')
+                # 提示只在变化时打印一次
+                current = '请完成图片验证...' if state.image_challenge else '请点击"我不是机器人"复选框...'
+                if current != hint:
+                    print(current)
+                    hint = current
                 
                 time.sleep(1)
             except Exception as e:
@@ -305,7 +629,7 @@ class CiteDownloader:
             
             action = ActionChains(driver)
             action.move_to_element(cite_link)
-            action.pause(random.uniform(0.1, 0.3))
+            self.pacer.pause("click")
             action.click()
             action.perform()
             return True
@@ -359,7 +683,7 @@ class CiteDownloader:
                         # 尝试常规点击
                         action = ActionChains(driver)
                         action.move_to_element(endnote_link)
-                        action.pause(0.1)
+                        self.pacer.pause("click")
                         action.click()
                         action.perform()
                     except:
@@ -388,8 +712,11 @@ class CiteDownloader:
         
         返回：
         float: 相似度比率（0-1之间的浮点数）
+        
+        说明：
+        使用 TitleMatcher，忽略大小写、中英文标点和 [PDF]/[HTML] 等前缀
         """
-        return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+        return self.matcher.score(str1, str2)
         
     def perform_search(self, driver, search_box):
         """
@@ -414,7 +741,7 @@ class CiteDownloader:
                 action = ActionChains(driver)
                 action.move_to_element(body)
                 action.perform()
-                self.random_sleep(0.5, 1)
+                self.pacer.pause("before_search")
             
             # 尝试找到搜索按钮
             try:
@@ -427,7 +754,7 @@ class CiteDownloader:
             if visible and random.random() < 0.3:  # 30% 的概率点击按钮
                 action = ActionChains(driver)
                 action.move_to_element(search_button)
-                action.pause(random.uniform(0.1, 0.3))
+                self.pacer.pause("click")
                 action.click()
                 action.perform()
             else:  # 否则按回车键
@@ -451,66 +778,64 @@ class CiteDownloader:
         str: 处理后的搜索查询
         
         特点：
-        1. 保留特殊术语（如 GPT-3, BERT 等）
+        1. 保留特殊术语（self.protected_terms，默认为 GPT-3、BERT 等）
         2. 移除或替换特殊字符
         3. 处理连字符
         4. 添加引号实现精确匹配
-        """
-        # 保护特殊术语
-        special_terms = ["GPT-3", "BERT", "T5", "XL-Net"]
-        preserved_terms = {}
-        for i, term in enumerate(special_terms):
-            if term in title:
-                placeholder = f"__TERM{i}__"
-                preserved_terms[placeholder] = term
-                title = title.replace(term, placeholder)
         
-        # 处理特殊字符
-        cleaned = title
-        for char in [':', '(', ')', '[', ']', '{', '}', '/', '\\']:
-            cleaned = cleaned.replace(char, ' ')
-        
-        # 恢复特殊术语
-        for placeholder, term in preserved_terms.items():
-            cleaned = cleaned.replace(placeholder, term)
+        说明：
+        与缓存键、标题匹配和文件名共用 core.normalize 的规范化
+        """
+        return search_query(title, self.protected_terms)
         
-        # 处理连字符
-        cleaned = ' '.join(word if word in preserved_terms.values() else word.replace('-', ' ')
-                         for word in cleaned.split())
+    def prepare_download(self, driver):
+        """
+        为下一次下载创建独立的临时目录，并让浏览器把文件下载到这里
         
-        # 移除多余空格并修剪
-        cleaned = ' '.join(cleaned.split())
+        参数：
+        driver (WebDriver): 浏览器驱动
         
-        # 添加引号实现精确匹配
-        return f'"{cleaned}"'
+        返回：
+        DownloadWatcher: 需在点击下载链接之前创建的监视器
         
-    def wait_for_download(self, timeout=30):
+        说明：
+        浏览器不支持 CDP 时退回共享下载目录，监视器会忽略目录中已有的文件
+        """
+        download_dir = create_download_dir(self.download_dir)
+        try:
+            driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": download_dir,
+            })
+        except Exception as e:
+            logger.warning(f"无法设置独立下载目录，使用共享下载目录: {str(e)}")
+            shutil.rmtree(download_dir, ignore_errors=True)
+            download_dir = self.download_dir
+        return DownloadWatcher(download_dir)
+
+    def wait_for_download(self, watcher, timeout=30):
         """
         等待下载完成并返回下载文件的路径
         
         参数：
+        watcher (DownloadWatcher): prepare_download 返回的监视器
         timeout (int): 超时时间（秒）
         
         返回：
         str/None: 下载文件的路径，如果超时则返回 None
         
         工作流程：
-        1. 监控下载目录
-        2. 检查新的 .enw 文件
-        3. 返回最新下载的文件路径
+        1. 通过 inotify（或轮询）监视本次下载的独立目录
+        2. 文件写完（.crdownload 消失）后立即返回，无需固定等待
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            # 查找 .enw 文件
-            files = glob.glob(os.path.join(self.download_dir, "*.enw"))
-            if files:
-                # 获取最新修改的文件
-                latest_file = max(files, key=os.path.getmtime)
-                # 等待文件完全下载
-                time.sleep(1)
-                return latest_file
-            time.sleep(0.5)
-        return None
+        return watcher.wait(timeout)
+
+    def _discard_download(self, watcher):
+        """
+        删除本次下载的临时目录（共享下载目录除外）
+        """
+        if watcher.directory != self.download_dir:
+            shutil.rmtree(watcher.directory, ignore_errors=True)
 
     def sanitize_filename(self, filename):
         """
@@ -527,16 +852,7 @@ class CiteDownloader:
         2. 移除首尾空格和点号
         3. 限制文件名长度
         """
-        # 替换非法字符
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '_')
-        # 移除首尾空格和点号
-        filename = filename.strip('. ')
-        # 限制长度
-        if len(filename) > 200:
-            filename = filename[:197] + '...'
-        return filename
+        return sanitize_filename(filename)
 
     def get_endnote_title(self, file_path):
         """
@@ -548,17 +864,7 @@ class CiteDownloader:
         返回：
         str/None: 论文标题，如果提取失败则返回 None
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # 查找以 %T 开头的行
-                for line in content.split('\n'):
-                    if line.startswith('%T'):
-                        return line[2:].strip()
-            return None
-        except Exception as e:
-            print(f"读取 EndNote 文件时出错: {str(e)}")
-            return None
+        return get_endnote_title(file_path)
 
     def rename_downloaded_file(self, old_path, search_title):
         """
@@ -569,7 +875,7 @@ class CiteDownloader:
         search_title (str): 搜索时使用的标题
         
         返回：
-        str/None: 新文件路径，如果重命名失败则返回原路径
+        str/None: 新文件路径，如果重命名失败则返回 None
         
         工作流程：
         1. 从 EndNote 文件中提取标题
@@ -581,6 +887,12 @@ class CiteDownloader:
             return None
 
         try:
+            if self.store:
+                with open(old_path, 'r', encoding=detect_encoding(old_path), errors='replace') as f:
+                    new_path = self._pack(f.read(), search_title)
+                os.remove(old_path)
+                return new_path
+
             # 获取实际标题
             actual_title = self.get_endnote_title(old_path)
             if not actual_title:
@@ -590,283 +902,879 @@ class CiteDownloader:
             # 生成安全的文件名
             safe_title = self.sanitize_filename(actual_title)
             new_filename = f"{safe_title}.enw"
-            new_path = os.path.join(self.download_dir, new_filename)
-
-            # 处理文件名冲突
-            counter = 1
-            base_path = new_path
-            while os.path.exists(new_path):
-                name, ext = os.path.splitext(base_path)
-                new_path = f"{name}_{counter}{ext}"
-                counter += 1
-
-            # 重命名文件
-            shutil.move(old_path, new_path)
+            new_path = os.path.join(self.library_dir, new_filename)
+
+            with self._rename_lock:
+                # 处理文件名冲突
+                counter = 1
+                base_path = new_path
+                while os.path.exists(new_path):
+                    name, ext = os.path.splitext(base_path)
+                    new_path = f"{name}_{counter}{ext}"
+                    counter += 1
+
+                # 重命名文件
+                shutil.move(old_path, new_path)
+            if self.title_index is not None:
+                self.title_index.add(actual_title, new_path)
             print(f"EndNote 文件中的标题: {actual_title}")
             return new_path
         except Exception as e:
             print(f"重命名文件时出错: {str(e)}")
-            return old_path
+            return None
 
-    def download_citations(self, titles_file):
+    def _pack(self, enw_text, search_title):
         """
-        下载论文引用信息的主方法
+        把引用内容写入紧凑存储（内容完全相同的记录只保存一份）
+        
+        返回：
+        str: 引用路径
+        """
+        actual_title = next((record.title for record in iter_lines_records(enw_text.splitlines())), None)
+        if not actual_title:
+            print(f"警告：无法从 EndNote 内容中提取标题，使用搜索标题: {search_title}")
+            actual_title = search_title
+        new_path = self.store.put(enw_text, actual_title)
+        if self.title_index is not None:
+            self.title_index.add(actual_title, new_path)
+        print(f"EndNote 文件中的标题: {actual_title}")
+        return new_path
+
+    def save_enw_text(self, enw_text, search_title):
+        """
+        将内存中的 EndNote 引用内容保存到下载目录，并按实际标题命名
         
         参数：
-        titles_file (str): 包含论文标题的文件路径
+        enw_text (str): EndNote 引用内容
+        search_title (str): 搜索时使用的标题
         
-        工作流程：
-        1. 读取论文标题列表
-        2. 初始化浏览器
-        3. 对每个标题：
-           - 访问 Google Scholar
-           - 搜索论文
-           - 处理验证码（如果出现）
-           - 查找最佳匹配结果
-           - 下载引用
-           - 重命名文件
-        4. 处理异常情况
+        返回：
+        str/None: 保存后的文件路径（使用紧凑存储时为引用路径）
         """
-        # 读取论文标题
-        with open(titles_file, 'r', encoding='utf-8') as f:
-            titles = [line.strip() for line in f if line.strip()]
+        if self.store:
+            return self._pack(enw_text, search_title)
+        temp_path = os.path.join(self.download_dir, f".incoming-{os.getpid()}-{time.time_ns()}.enw")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(enw_text)
+        new_path = self.rename_downloaded_file(temp_path, search_title)
+        if not new_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return new_path
+
+    def save_formats(self, enw_path, texts):
+        """
+        把 enw 以外的引用格式保存在 .enw 文件旁边（同名，扩展名对应格式）
         
-        driver = None
-        try:
-            # 初始化 WebDriver
-            print("\n初始化浏览器...")
-            driver = self._initialize_driver()
-            wait = WebDriverWait(driver, 2)
-            
-            # 处理每篇论文
-            for i, title in enumerate(titles, 1):
-                retry_count = 0
-                while retry_count < self.max_retries:
-                    try:
-                        print(f"\n处理第 {i}/{len(titles)} 篇论文: {title}")
+        参数：
+        enw_path (str): 已保存的 .enw 文件路径（或紧凑存储的引用路径）
+        texts (dict): 格式到引用内容的映射
+        """
+        if self.store and self.store.owns(enw_path):
+            for fmt in self.store.put_formats(enw_path, texts):
+                print(f"已保存 {fmt} 格式")
+            return
+        for fmt, text in texts.items():
+            if fmt == "enw":
+                continue
+            path = format_path(enw_path, fmt)
+            temp_path = os.path.join(os.path.dirname(path), f".incoming-{os.getpid()}-{time.time_ns()}{FORMAT_EXTENSIONS[fmt]}")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, path)
+            print(f"已保存 {fmt} 格式: {os.path.basename(path)}")
+
+    def _store_citation(self, texts, search_title, matched_title, score):
+        """
+        保存内存中的引用内容并写入缓存
+        
+        参数：
+        texts (dict): 格式到引用内容的映射，必须包含 enw
+        search_title (str): 搜索时使用的标题
+        matched_title (str): 匹配到的标题
+        score (float): 相似度
+        
+        返回：
+        str/None: 保存后的 .enw 文件路径
+        """
+        # 只是补齐缺少的格式时，引用库中已有完全相同的 .enw，不再另存一份
+        new_path = self._existing_record(texts["enw"], matched_title or search_title) \
+            or self.save_enw_text(texts["enw"], search_title)
+        if new_path:
+            self.save_formats(new_path, texts)
+            if self.cache:
+                self.cache.put_hit(search_title, matched_title, score, texts["enw"], texts)
+        return new_path
+
+    def _saved_formats(self, enw_path):
+        """
+        引用库中的记录已保存的格式（只检查需要的格式）
+        """
+        if self.store and self.store.owns(enw_path):
+            return self.store.formats(enw_path)
+        return {fmt for fmt in self.formats if os.path.exists(format_path(enw_path, fmt))}
+
+    def _has_formats(self, enw_path):
+        """
+        引用库中的记录是否已有全部需要的格式
+        """
+        return set(self.formats) <= self._saved_formats(enw_path)
+
+    def _session_backend(self, driver):
+        """
+        返回与浏览器共享 Cookie 的 HTTP 后端（混合模式）
+        
+        参数：
+        driver (WebDriver): 已通过验证码的浏览器
+        
+        返回：
+        ScholarHttpBackend: 使用浏览器当前站点地址和 Cookie 的 HTTP 后端
+        """
+        if self.cite_session is None:
+            self.cite_session = build_session(self.user_agent)
+        # 每次都同步一遍，浏览器通过验证码后会拿到新的 Cookie
+        for cookie in driver.get_cookies():
+            self.cite_session.cookies.set(cookie["name"], cookie["value"],
+                                          domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        # Scholar 可能按地区跳转到其他域名，此时以浏览器当前所在的站点为准
+        current_url = driver.current_url
+        base_url = self.base_url
+        if current_url.startswith("http") and not current_url.startswith(self.base_url):
+            base_url = urljoin(current_url, "/")
+        return ScholarHttpBackend(base_url=base_url, session=self.cite_session, rate=self.rate)
+
+    def _fetch_in_session(self, driver, result, search_title, matched_title, score):
+        """
+        混合模式：用结果中的引用 id，通过共享 Cookie 的 HTTP 会话直接获取 ENW 内容
+        
+        参数：
+        driver (WebDriver): 浏览器驱动
+        result (dict): RESULTS_SCRIPT 读出的最佳匹配结果（cid、rp、enw）
+        search_title (str): 搜索使用的论文标题
+        matched_title (str): 匹配到的标题
+        score (float): 相似度
+        
+        返回：
+        str/None: 保存后的引用文件路径；无法直接获取时返回 None，由调用方改用引用弹窗
+        
+        特点：
+        不打开引用弹窗、不下载文件，省去两次最慢的等待
+        """
+        with self.metrics.stage("enw_fetch"):
+            try:
+                if not result.get("cid") and not result.get("enw"):
+                    print("结果中没有引用 id")
+                    return None
+                backend = self._session_backend(driver)
+                print(f"通过共享会话获取引用 ({', '.join(self.formats)})...")
+                urls = backend.find_citation_urls({"cid": result.get("cid"), "rp": result.get("rp") or "0",
+                                                   "enw_href": result.get("enw")}, self.formats)
+                if "enw" not in urls:
+                    print("引用信息中没有 EndNote 链接")
+                    return None
+                texts = backend.fetch_texts(urls)
+            except CaptchaDetected as e:
+                self.metrics.count("captchas")
+                print(f"直接获取引用时遇到验证码 ({e})")
+                return None
+            except (requests.RequestException, WebDriverException) as e:
+                print(f"直接获取引用失败: {str(e)}")
+                return None
+        if not texts["enw"].lstrip().startswith("%"):
+            print("返回的内容不是 EndNote 格式")
+            return None
+        return self._post(self._store_in_stage, texts, search_title, matched_title, score)
+
+    def _store_in_stage(self, texts, search_title, matched_title, score):
+        """
+        在 rename 阶段计时内保存引用内容
+        """
+        with self.metrics.stage("rename"):
+            return self._store_citation(texts, search_title, matched_title, score)
+
+    def _fetch_extra_formats(self, backend, urls):
+        """
+        通过共享浏览器 Cookie 的会话并发获取引用弹窗中其他格式的内容
+        
+        参数：
+        backend (ScholarHttpBackend): _session_backend 返回的 HTTP 后端
+        urls (dict): 格式到链接地址的映射
+        
+        返回：
+        dict: 成功获取的格式到内容的映射
+        """
+        if not urls:
+            return {}
+        with self.metrics.stage("formats_fetch"):
+            try:
+                return backend.fetch_texts(urls, required=())
+            except (CaptchaDetected, requests.RequestException) as e:
+                print(f"获取其他引用格式失败: {str(e)}")
+                return {}
+
+    def _finish_download(self, watcher, downloaded_file, title, matched_title, score, backend, extra_urls):
+        """
+        整理浏览器下载的 ENW 文件：重命名、获取其他格式、写入缓存
+        
+        参数：
+        watcher (DownloadWatcher): 本次下载的监视器
+        downloaded_file (str): 下载完成的文件路径
+        title (str): 搜索使用的论文标题
+        matched_title (str): 匹配到的标题
+        score (float): 相似度
+        backend (ScholarHttpBackend/None): 获取其他格式用的共享会话
+        extra_urls (dict): 其他格式的链接地址
+        
+        返回：
+        str/None: 重命名后的文件路径
+        """
+        with self.metrics.stage("rename"):
+            with open(downloaded_file, 'r', encoding='utf-8', errors='replace') as f:
+                enw_text = f.read()
+            # 只是补齐缺少的格式时，引用库中已有完全相同的 .enw，不再另存一份
+            new_path = self._existing_record(enw_text, matched_title or title) \
+                or self.rename_downloaded_file(downloaded_file, title)
+            self._discard_download(watcher)
+            if not new_path:
+                # 临时目录中的文件已删除，不能把它的路径写入缓存和任务日志
+                print("下载成功但重命名失败")
+                return None
+        texts = {"enw": enw_text}
+        texts.update(self._fetch_extra_formats(backend, extra_urls))
+        self.save_formats(new_path, texts)
+        if self.cache:
+            self.cache.put_hit(title, matched_title, score, enw_text, texts)
+        return new_path
+
+    def _post(self, func, *args):
+        """
+        执行下载后的整理工作（func 返回引用文件路径，失败时返回 None）
+        
+        返回：
+        str/None: 直接执行时的结果；交给后处理线程时返回 DEFERRED，
+                  完成后由后处理线程调用 _finish_title
+        
+        说明：
+        启用后处理流水线时，浏览器线程提交后立即开始下一篇论文；
+        这篇论文的计时记录随任务一起交给后处理线程
+        """
+        if self.pipeline is None:
+            new_path = func(*args)
+            if not new_path:
+                self.last_error = "重命名失败"
+            return new_path
+        (title, done), source = self._current, self.last_source
+        record = self.metrics.detach_title()
+        
+        def job():
+            self.metrics.attach_title(record)
+            error = None
+            try:
+                new_path = func(*args)
+            except Exception as e:
+                logger.error(f"后处理时发生错误: {str(e)}")
+                new_path, error = None, f"后处理失败: {str(e)}"
+            self._finish_title(title, new_path, source, error or "重命名失败", done)
+        
+        self.pipeline.submit(job)
+        return DEFERRED
+
+    def _existing_record(self, enw_text, fallback_title):
+        """
+        查找引用库中内容完全相同的 .enw 文件
+        
+        参数：
+        enw_text (str): EndNote 引用内容
+        fallback_title (str): 引用内容中没有标题时用来推断文件名的标题
+        
+        返回：
+        str/None: 已有文件的路径（使用紧凑存储时按内容摘要查找）
+        """
+        if self.store:
+            return self.store.find(enw_text)
+        actual_title = next((record.title for record in iter_lines_records(enw_text.splitlines())), None)
+        existing = os.path.join(self.library_dir, f"{self.sanitize_filename(actual_title or fallback_title)}.enw")
+        if os.path.exists(existing):
+            with open(existing, 'r', encoding='utf-8', errors='replace') as f:
+                if f.read() == enw_text:
+                    return existing
+        return None
+
+    def _restore_from_cache(self, entry, search_title):
+        """
+        使用缓存中的引用内容，引用库中已有相同文件时直接复用
+        
+        参数：
+        entry (dict): 缓存记录
+        search_title (str): 搜索时使用的标题
+        
+        返回：
+        str/None: 引用文件路径
+        """
+        existing = self._existing_record(entry["enw"], entry["matched_title"] or search_title)
+        if existing:
+            # 只补齐缺少的格式，已有的内容不再重写
+            saved = self._saved_formats(existing)
+            self.save_formats(existing, {fmt: entry["formats"][fmt] for fmt in self.formats if fmt not in saved})
+            return existing
+        new_path = self.save_enw_text(entry["enw"], search_title)
+        if new_path:
+            self.save_formats(new_path, {fmt: entry["formats"][fmt] for fmt in self.formats})
+        return new_path
+
+    def _download_via_http(self, title):
+        """
+        使用 HTTP 后端下载单篇论文的引用
+        
+        参数：
+        title (str): 论文标题
+        
+        返回：
+        str/None: 保存后的引用文件路径，失败时返回 None
+        
+        异常：
+        CaptchaDetected: 遇到验证码时抛出，由调用方切换到浏览器流程
+        """
+        retry_count = 0
+        while retry_count < self.max_retries:
+            try:
+                print("通过 HTTP 检索论文...")
+                with self.metrics.stage("http_fetch"):
+                    # 与浏览器直接打开结果页时使用相同的搜索词
+                    citation = self.http_backend.fetch_citation(title, self.matcher, self.formats,
+                                                                query=self.clean_search_query(title))
+                if not citation:
+                    # 没有搜索结果或 EndNote 链接：可能是软封禁，交给浏览器流程（会重试），不写入缓存
+                    print("HTTP 检索没有得到引用，切换到浏览器处理...")
+                    self.last_source = "browser"
+                    return self._download_via_browser(title)
+                if citation["enw"] is None:
+                    self.metrics.count("no_match")
+                    self.last_error = f"未找到匹配度足够高的论文 (最高相似度: {citation['score']:.2f})"
+                    if self.cache:
+                        self.cache.put_miss(title, citation["matched_title"], citation["score"])
+                    return None
+                print(f"找到最佳匹配论文 (相似度: {citation['score']:.2f})")
+                return self._post(self._store_citation, citation["formats"], title,
+                                  citation["matched_title"], citation["score"])
+            except CaptchaDetected:
+                raise
+            except requests.RequestException as e:
+                retry_count += 1
+                self.metrics.count("retries")
+                logger.warning(f"HTTP 请求失败 (尝试 {retry_count}/{self.max_retries}): {str(e)}")
+                if retry_count < self.max_retries:
+                    time.sleep(2 ** retry_count)
+                self.last_error = f"HTTP 请求失败: {str(e)}"
+        logger.error(f"处理论文失败，已达到最大重试次数: {title}")
+        return None
+
+    def _download_via_browser(self, title):
+        """
+        使用浏览器流程下载单篇论文的引用
+        
+        参数：
+        title (str): 论文标题
+        
+        返回：
+        str/None: 保存后的引用文件路径，失败时返回 None
+        """
+        retry_count = 0
+        while retry_count < self.max_retries:
+            if retry_count:
+                self.metrics.count("retries")
+            try:
+                driver, wait = self._ensure_driver()
+                
+                # 浏览器已有 Cookie 时直接打开结果页，省去首页的加载、查找搜索框和输入
+                direct = self.navigation == "direct" and self._session_ready
+                if direct:
+                    with self.metrics.stage("search"):
+                        search_query = self.clean_search_query(title)
+                        print(f"打开搜索结果页: {search_query}")
+                        self.pacer.pause("before_search")
+                        self._acquire_rate()
+                        driver.get(build_search_url(self.base_url, search_query))
                         
-                        # 访问 Google Scholar
+                        if not self._pass_captcha(driver):
+                            self.last_error = "验证码验证超时"
+                            return None
+                else:
+                    # 访问 Google Scholar
+                    with self.metrics.stage("homepage"):
                         print("访问 Google Scholar...")
-                        driver.get("https://scholar.google.com/")
-                        
+                        self._acquire_rate()
+                        driver.get(self.base_url)
+                
                         # 处理验证码
-                        if "sorry" in driver.page_source.lower() or "请证明您不是机器人" in driver.page_source:
-                            if not self.handle_captcha(driver):
-                                break
-                                
-                        # 搜索论文
+                        if not self._pass_captcha(driver):
+                            self.last_error = "验证码验证超时"
+                            return None
+                        
+                    # 搜索论文
+                    with self.metrics.stage("search"):
                         print("搜索论文...")
                         search_box = self.wait_and_find_element(
                             driver, wait, By.NAME, "q"
                         )
                         if not search_box:
                             print("找不到搜索框")
+                            self.last_error = "找不到搜索框"
+                            retry_count += 1
                             continue
-                        
-                        # 输入搜索词
-                        search_box.clear()
+                
+                        # 输入搜索词：按节奏配置逐字输入，或一次性填写
                         search_query = title
                         print(f"输入搜索词: {search_query}")
-                        driver.execute_script("arguments[0].value = arguments[1];", search_box, search_query)
-                        
-                        # 执行搜索
+                        self.pacer.type_text(driver, search_box, search_query)
+                
+                        # 执行搜索（停顿在等待令牌之前，令牌在停顿期间照常积累）
+                        self.pacer.pause("before_search")
+                        self._acquire_rate()
                         search_box.send_keys(Keys.RETURN)
-                        
+                
                         # Check for CAPTCHA again
-                        if "sorry" in driver.page_source.lower() or "请证明您不是机器人" in driver.page_source:
-                            if not self.handle_captcha(driver):
-                                break
-                        
-                        # Print page source for debugging
+                        if not self._pass_captcha(driver):
+                            self.last_error = "验证码验证超时"
+                            return None
+                
+                        # 调试信息只输出探测结果，不再打印页面源码
                         print("\n调试信息：")
-                        print("页面标题:", driver.title)
-                        print("当前URL:", driver.current_url)
-                        print("页面内容片段:", driver.page_source[:500])
-                        
-                        # Try different selectors for search results
-                        results = []
-                        selectors = [
-                            (By.CLASS_NAME, "gs_ri"),  # 标准结果容器
-                            (By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl"),  # 替代结果容器
-                            (By.CSS_SELECTOR, "div[data-aid]"),  # 基于数据属性
-                            (By.CSS_SELECTOR, "div.gs_or")  # 最简单的选择器
-                        ]
-                        
-                        for selector in selectors:
-                            try:
-                                elements = wait.until(EC.presence_of_all_elements_located(selector))
-                                if elements:
-                                    print(f"使用选择器 {selector[1]} 找到结果")
-                                    results.extend(elements)
-                                    break
-                            except:
-                                continue
-                        
-                        if not results:
-                            print("未找到搜索结果")
-                            continue
-                            
-                        print(f"找到 {len(results)} 个结果")
-                        
-                        # Find best match
-                        best_match = None
-                        best_ratio = 0
-                        for result in results:
-                            try:
-                                result_title = result.find_element(By.CLASS_NAME, "gs_rt").text
-                                ratio = self.similarity_ratio(title, result_title)
-                                print(f"比较: {result_title} (相似度: {ratio:.2f})")
-                                if ratio > best_ratio:
-                                    best_ratio = ratio
-                                    best_match = result
-                            except:
-                                continue
-                        
-                        if not best_match or best_ratio < 0.5:
-                            print("未找到匹配度足够高的论文")
-                            continue
-                            
-                        print(f"找到最佳匹配论文 (相似度: {best_ratio:.2f})")
-                        
-                        # Find cite button
-                        cite_button = None
-                        cite_selectors = [
-                            (By.CLASS_NAME, "gs_or_cit"),
-                            (By.CSS_SELECTOR, "a.gs_or_cit"),
-                            (By.XPATH, "//a[contains(@onclick, 'gs_ocit')]"),
-                            (By.XPATH, "//a[contains(text(), 'Cite')]")
-                        ]
-                        
-                        print("查找引用按钮...")
-                        for selector in cite_selectors:
-                            try:
-                                cite_button = best_match.find_element(*selector)
-                                if cite_button:
-                                    print(f"使用选择器 {selector[1]} 找到引用按钮")
-                                    break
-                            except:
-                                continue
-                        
-                        if not cite_button:
-                            print("未找到引用按钮")
-                            continue
-                        
-                        # Click cite button
-                        print("点击引用按钮...")
-                        try:
-                            driver.execute_script("arguments[0].click();", cite_button)
-                        except:
-                            action = ActionChains(driver)
-                            action.move_to_element(cite_button)
-                            action.click()
-                            action.perform()
-                        
-                        # Find EndNote link
-                        print("查找 EndNote 链接...")
-                        try:
-                            endnote_link = wait.until(
-                                EC.element_to_be_clickable(
-                                    (By.CSS_SELECTOR, "a[href*='citation?format=enw']")
-                                )
-                            )
-                        except:
-                            try:
-                                endnote_link = wait.until(
-                                    EC.element_to_be_clickable(
-                                        (By.XPATH, "//a[contains(text(), 'EndNote')]")
-                                    )
-                                )
-                            except:
-                                print("未找到 EndNote 链接")
-                                continue
-                        
-                        # Click EndNote link
-                        print("下载 EndNote 格式引用...")
-                        try:
-                            driver.execute_script("arguments[0].click();", endnote_link)
-                        except:
-                            action = ActionChains(driver)
-                            action.move_to_element(endnote_link)
-                            action.click()
-                            action.perform()
-                        
-                        # Wait for download to complete and rename the file
-                        print("等待下载完成...")
-                        downloaded_file = self.wait_for_download()
-                        if downloaded_file:
-                            new_path = self.rename_downloaded_file(downloaded_file, title)
-                            if new_path:
-                                print(f"成功下载并重命名引用文件: {os.path.basename(new_path)}")
-                            else:
-                                print("下载成功但重命名失败")
-                        else:
-                            print("下载超时")
-                            continue
-                        
-                        break  # 如果成功处理，跳出重试循环
-                    except (socket.error, urllib3.exceptions.MaxRetryError,
-                            urllib3.exceptions.NewConnectionError) as e:
+                        print("页面状态:", probe_page(driver))
+                
+                # 一次 execute_script 读出全部结果的标题、引用 id 和链接，匹配只处理返回的数据
+                with self.metrics.stage("extract"):
+                    try:
+                        extracted = wait.until(
+                            lambda d: d.execute_script(RESULTS_SCRIPT, list(RESULT_SELECTORS)))
+                    except TimeoutException:
+                        extracted = None
+                
+                    if not extracted:
+                        print("未找到搜索结果")
+                        self.last_error = "未找到搜索结果"
+                        if direct:
+                            # 例如验证后被带回了首页：重试时先访问首页再输入搜索词
+                            self._session_ready = False
                         retry_count += 1
-                        logger.warning(f"处理论文时发生连接错误 (尝试 {retry_count}/{self.max_retries}): {str(e)}")
-                        if retry_count < self.max_retries:
-                            # 重新初始化 WebDriver
-                            if driver:
-                                try:
-                                    driver.quit()
-                                except:
-                                    pass
-                            time.sleep(2 ** retry_count)
-                            driver = self._initialize_driver()
-                            wait = WebDriverWait(driver, 15)
-                            continue
-                        else:
-                            logger.error(f"处理论文失败，已达到最大重试次数: {title}")
-                            break
-                    except Exception as e:
-                        logger.error(f"处理论文时发生未知错误: {str(e)}")
-                        break
+                        continue
+                    # 通过首页完成过一次搜索，之后的论文可以直接打开结果页
+                    self._session_ready = True
+                    
+                    results = extracted["results"]
+                    print(f"使用选择器 {extracted['selector']} 找到 {len(results)} 个结果")
+                with self.metrics.stage("match"):
+                    best_index, best_ratio, scores = self.matcher.rank(title, [result["title"] for result in results])
+                    for result, ratio in zip(results, scores):
+                        print(f"比较: {result['title']} (相似度: {ratio:.2f})")
+                    best_match = results[best_index] if best_index is not None else None
+                    best_title = best_match["title"] if best_match else None
                 
-                # Add longer delay between papers
-                if i < len(titles):
-                    print(f"\n等待处理下一篇论文...")
-                    self.random_sleep(5, 10)
+                if not best_match or best_ratio < self.matcher.min_ratio:
+                    # 结果已经拿到，重试也不会得到更好的匹配
+                    print("未找到匹配度足够高的论文")
+                    self.metrics.count("no_match")
+                    self.last_error = f"未找到匹配度足够高的论文 (最高相似度: {best_ratio:.2f})"
+                    if self.cache:
+                        self.cache.put_miss(title, best_title, best_ratio)
+                    return None
                     
-        finally:
-            if driver:
+                print(f"找到最佳匹配论文 (相似度: {best_ratio:.2f})")
+                
+                if self.backend == "hybrid":
+                    new_path = self._fetch_in_session(driver, best_match, title, best_title, best_ratio)
+                    if new_path:
+                        return new_path
+                    print("改用引用弹窗下载...")
+                
+                # 只有选中的结果需要再次访问页面元素：在浏览器中查找并点击它的引用按钮
+                with self.metrics.stage("cite_click"):
+                    print("点击引用按钮...")
+                    clicked = False
+                    if best_match["cite"]:
+                        self.pacer.scroll_to(driver, best_match.get("top"))
+                        self.pacer.pause("before_cite")
+                        self._acquire_rate()
+                        clicked = driver.execute_script(CLICK_CITE_SCRIPT, extracted["selector"], best_match["index"])
+                    if not clicked:
+                        print("未找到引用按钮")
+                        self.last_error = "未找到引用按钮"
+                        retry_count += 1
+                        continue
+                
+                    # 等待引用弹窗加载，每次轮询用一个脚本同时按地址和文字查找 EndNote 链接
+                    print("查找 EndNote 链接...")
+                    try:
+                        endnote_link = wait.until(lambda d: d.execute_script(ENDNOTE_LINK_SCRIPT))
+                    except TimeoutException:
+                        print("未找到 EndNote 链接")
+                        self.last_error = "未找到 EndNote 链接"
+                        retry_count += 1
+                        continue
+                
+                # 引用弹窗已打开，一次读出其他格式的链接，下载完 ENW 后通过共享会话获取
+                extra_urls = {}
+                backend = None
+                if len(self.formats) > 1:
+                    for href, text in driver.execute_script(CITE_LINKS_SCRIPT) or []:
+                        fmt = citation_format(href, text)
+                        if fmt in self.formats and fmt != "enw":
+                            extra_urls.setdefault(fmt, href)
+                    if extra_urls:
+                        # Cookie 要在浏览器线程中读取，请求本身在后处理时发出
+                        backend = self._session_backend(driver)
+                
+                # Click EndNote link
+                with self.metrics.stage("enw_wait"):
+                    print("下载 EndNote 格式引用...")
+                    watcher = self.prepare_download(driver)
+                    self.pacer.pause("before_endnote")
+                    self._acquire_rate()
+                    try:
+                        driver.execute_script("arguments[0].click();", endnote_link)
+                    except:
+                        action = ActionChains(driver)
+                        action.move_to_element(endnote_link)
+                        action.click()
+                        action.perform()
+                
+                    # Wait for download to complete and rename the file
+                    print("等待下载完成...")
+                    downloaded_file = self.wait_for_download(watcher)
+                    if not downloaded_file:
+                        print("下载超时")
+                        self.last_error = "下载超时"
+                        self._discard_download(watcher)
+                        retry_count += 1
+                        continue
+                self._journal(title, journal.DOWNLOADED, path=downloaded_file)
+                return self._post(self._finish_download, watcher, downloaded_file, title,
+                                  best_title, best_ratio, backend, extra_urls)
+            except (socket.error, urllib3.exceptions.MaxRetryError,
+                    urllib3.exceptions.NewConnectionError) as e:
+                self.rate.on_error()
+                retry_count += 1
+                logger.warning(f"处理论文时发生连接错误 (尝试 {retry_count}/{self.max_retries}): {str(e)}")
+                if retry_count < self.max_retries:
+                    # 重新初始化 WebDriver
+                    time.sleep(2 ** retry_count)
+                    self._restart_driver()
+                    continue
+                logger.error(f"处理论文失败，已达到最大重试次数: {title}")
+                self.last_error = f"连接错误: {str(e)}"
+                return None
+            except Exception as e:
+                logger.error(f"处理论文时发生未知错误: {str(e)}")
+                self.last_error = f"未知错误: {str(e)}"
+                return None
+        return None
+
+    def _journal(self, title, state, **info):
+        """
+        记录任务状态（未启用任务日志时忽略）
+        """
+        if self.journal:
+            self.journal.record(title, state, **info)
+
+    def _resume_downloaded(self, title):
+        """
+        恢复上次已下载但尚未重命名的文件
+        
+        返回：
+        str/None: 重命名后的文件路径；文件已不存在时返回 None
+        """
+        entry = self.journal.entries.get(title) if self.journal else None
+        if not entry or entry["state"] != journal.DOWNLOADED:
+            return None
+        path = entry.get("path")
+        if not path or not os.path.exists(path):
+            return None
+        print(f"恢复上次已下载的文件: {os.path.basename(path)}")
+        return self.rename_downloaded_file(path, title)
+
+    def download_title(self, title, done=None):
+        """
+        按当前后端下载单篇论文的引用，并在任务日志中记录每次状态变化
+        
+        参数：
+        title (str): 论文标题
+        done (callable): 完成回调 done(title, new_path, source)
+        
+        返回：
+        str/None: 保存后的引用文件路径，失败时返回 None；
+                  整理工作交给后处理流水线时返回 None，结果通过 done 回调给出
+        
+        说明：
+        处理来源记录在 self.last_source 中，不访问网络的来源见 OFFLINE_SOURCES；
+        失败原因记录在 self.last_error 中
+        """
+        self.last_error = None
+        self.metrics.begin_title(title)
+        self.pacer.begin_title()
+        self._current = (title, done)
+        new_path = self._resume_downloaded(title)
+        if new_path:
+            self.last_source = "journal"
+        else:
+            self._journal(title, journal.SEARCHING)
+            new_path = self._download_title(title)
+        if new_path is DEFERRED:
+            return None
+        return self._finish_title(title, new_path, self.last_source, self.last_error, done)
+
+    def _finish_title(self, title, new_path, source, error, done):
+        """
+        记录单篇论文的最终结果（任务日志、运行指标），并调用完成回调
+        
+        返回：
+        str/None: new_path
+        """
+        if new_path:
+            self._journal(title, journal.RENAMED, path=new_path)
+        else:
+            self._journal(title, journal.FAILED, reason=error or "未知原因")
+        if self.queue and not self.queue.finish(title, new_path, error):
+            logger.warning(f"租约已过期，处理结果没有写回任务队列（论文会由其他进程重新处理）: {title}")
+        self.metrics.end_title("ok" if new_path else "failed", source)
+        if done:
+            done(title, new_path, source)
+        return new_path
+
+    def _download_title(self, title):
+        """
+        依次尝试缓存、HTTP 后端和浏览器下载单篇论文的引用
+        """
+        if self.cache:
+            with self.metrics.stage("cache_lookup"):
+                entry = self.cache.get(title)
+            missing = [fmt for fmt in self.formats if fmt not in entry["formats"]] if entry and entry["enw"] else []
+            if missing:
+                print(f"缓存中没有 {', '.join(missing)} 格式，重新检索")
+            elif entry:
+                self.last_source = "cache"
+                if entry["enw"] is None:
+                    print(f"缓存记录：此前未找到匹配度足够高的论文 (最高相似度: {entry['score'] or 0:.2f})")
+                    self.last_error = "缓存记录：未找到匹配度足够高的论文"
+                    return None
+                print(f"命中缓存: {entry['matched_title']} (相似度: {entry['score']:.2f})")
+                return self._restore_from_cache(entry, title)
+        
+        if self.title_index is not None:
+            with self.metrics.stage("index_lookup"):
+                # 紧凑存储按规范化标题建有索引，完全相同的标题无需 n-gram 打分
+                paths = self.store.lookup(title) if self.store else []
+                match = (title, paths[0], 1.0) if paths else self.title_index.closest(title)
+            if match and match[2] >= self.dedup_threshold and not self.matcher.same_work(title, match[0]):
+                # 相似度高但编号或年份不同：续作、分册或不同年份的版本，不能复用对方的记录
+                print(f"引用库中的相似记录编号或年份不同，不视为同一篇论文: {match[0]}")
+                match = None
+            if match and match[2] >= self.dedup_threshold and self._has_formats(match[1]):
+                self.last_source = "library"
+                print(f"引用库中已有该论文: {os.path.basename(match[1])} (相似度: {match[2]:.2f})，跳过检索")
+                return match[1]
+        
+        if self.http_backend:
+            self.last_source = "http"
+            try:
+                return self._download_via_http(title)
+            except CaptchaDetected as e:
+                self.metrics.count("captchas")
+                print(f"HTTP 请求遇到验证码 ({e})，切换到浏览器处理...")
+        self.last_source = "browser"
+        return self._download_via_browser(title)
+
+    def download_citations(self, titles_file, workers=1, resume=False, journal_path=None,
+                           metrics_path=None, prometheus_path=None, input_format=None, column=None,
+                           queue_path=None, lease_seconds=None):
+        """
+        下载论文引用信息的主方法
+        
+        参数：
+        titles_file (str): 论文标题来源：纯文本、CSV、.bib 或 .enw 文件，"-" 表示标准输入；
+                           使用任务队列时先登记到队列中，为 None 时只处理队列中已有的论文
+        workers (int): 并行浏览器数量，大于 1 时启用工作池模式
+        resume (bool): 是否根据任务日志跳过已完成的论文，从上次中断处继续
+        journal_path (str): 任务日志路径，默认为引用库目录下的 .journal-<来源名称>.jsonl
+        input_format (str): 输入格式（text、csv、bib、enw），默认按扩展名推断
+        column (str/int): CSV 的标题列名或从 1 开始的列号
+        metrics_path (str): 运行结束时写入分阶段耗时和计数的 JSON 文件
+        prometheus_path (str): 运行结束时写入 Prometheus textfile 格式指标的文件
+        queue_path (str): 共享任务队列的数据库路径；设置后论文从队列中逐篇领取，
+                          可以有任意多个进程（包括其他主机上通过共享文件系统）同时处理同一个队列；
+                          每个进程需要使用不同的引用库目录，引用库已被其他进程使用时抛出 RuntimeError
+        lease_seconds (float): 队列租约时长（秒），默认见 work_queue.DEFAULT_LEASE
+        
+        工作流程：
+        1. 打开任务日志，边读取边处理论文标题（跳过注释和重复标题，不预先读入整个列表），
+           每读入一批先在任务日志中登记为 pending；
+           使用任务队列时先登记标题，再从队列中逐篇领取，处理结果写回队列
+        2. 对每个标题：
+           - 恢复模式下跳过已完成的论文
+           - 先查询引用缓存和引用库标题索引，命中时不访问网络
+           - 使用 HTTP 后端检索并直接获取引用（如果启用）
+           - 否则（或遇到验证码时）启动浏览器：访问 Google Scholar、
+             搜索论文、处理验证码、查找最佳匹配结果、下载引用
+           - 重命名文件
+           - 每次状态变化写入任务日志
+        3. 处理异常情况
+        4. 打印运行总结和各阶段耗时，导出指标文件（中断时也会导出）
+        
+        返回：
+        RunStats: 运行统计
+        """
+        # 标题按需读取，总数未知
+        source = TitleStream(titles_file, input_format, column) if titles_file else None
+        # 同一个引用库只允许一个进程写入，共用任务队列的进程各自使用不同的引用库
+        self._lock_directories()
+        try:
+            if queue_path:
+                self.queue = WorkQueue(queue_path, **({"lease_seconds": lease_seconds} if lease_seconds else {}))
+                if source is not None:
+                    added = self.queue.add(source)
+                    print(f"向任务队列登记了 {added} 篇新论文")
+                counts = self.queue.counts()
+                print(f"任务队列 {queue_path}: 待处理 {counts['pending']} 篇，处理中 {counts['leased']} 篇"
+                      f"（其中租约已过期 {counts['expired']} 篇），已完成 {counts['done']} 篇，失败 {counts['failed']} 篇")
+                self.queue.start_heartbeat()
+        
+            # 打开任务日志
+            if journal_path is None:
+                name = source.name if source is not None else os.path.splitext(os.path.basename(queue_path))[0]
+                journal_path = os.path.join(self.library_dir, f".journal-{name}.jsonl")
+            self.journal = JobJournal(journal_path, resume=resume)
+            if not resume:
+                # 恢复模式下保留上次已下载但未重命名的临时文件
+                cleanup_download_dirs(self.download_dir)
+            skipped = [0]
+        
+            def pending_titles():
+                for title in (self.queue.titles() if self.queue else registered_titles()):
+                    if resume and self.journal.is_complete(title):
+                        skipped[0] += 1
+                        if self.queue:
+                            self.queue.finish(title, self.journal.entries[title].get("path"))
+                        continue
+                    yield title
+
+            def registered_titles():
+                # 每读入一批标题，先把没有记录的登记为 pending 再逐篇处理；
+                # 队列模式下不预读（会提前领取租约），待处理状态由队列记录；
+                # 标准输入可能由其他程序逐行写入，不等待凑满一批
+                stream = iter(source)
+                size = 1 if source.source == "-" else journal.PENDING_BATCH
+                while True:
+                    batch = list(itertools.islice(stream, size))
+                    if not batch:
+                        return
+                    self.journal.record_many([title for title in batch if self.journal.state(title) is None],
+                                             journal.PENDING)
+                    yield from batch
+        
+            titles = pending_titles()
+        
+            def report_input():
+                if skipped[0]:
+                    print(f"根据任务日志跳过了 {skipped[0]} 篇已完成的论文")
+                if source is not None and source.duplicates:
+                    print(f"跳过了 {source.duplicates} 个重复的标题")
+        
+
+            # 重命名、其他格式、缓存和索引在后台线程中完成，与下一篇论文的检索重叠
+            self.pipeline = PostProcessor(self.post_workers) if self.post_workers > 0 else None
+            if workers > 1:
                 try:
+                    return BrowserWorkerPool(self, workers).run(titles)
+                finally:
+                    self._close_pipeline()
+                    self.close()
+                    report_input()
+            
+            stats = RunStats()
+            
+            def finished(title, new_path, source):
+                stats.record(title, bool(new_path))
+                if new_path and source != "library":
+                    print(f"成功下载并重命名引用文件: {os.path.basename(new_path)}")
+            
+            try:
+                # 处理每篇论文
+                for i, title in enumerate(titles, 1):
+                    print(f"\n处理第 {i} 篇论文 [{self.rate.describe()}]: {title}")
+                    self.download_title(title, done=finished)
+                    # 论文之间不再固定等待，请求间隔由 self.rate 自适应控制，等待与上一篇的后处理重叠
+            finally:
+                self._close_pipeline()
+                if self.driver:
                     print("\n关闭浏览器...")
-                    driver.quit()
-                except:
-                    pass
+                self.close()
+            report_input()
+            stats.print_summary()
+            return stats
+        finally:
+            self._close_queue()
+            self.report_metrics(metrics_path, prometheus_path)
+            self._unlock_directories()
+
+    def _lock_directories(self):
+        """
+        为引用库和下载目录加进程锁，已被其他进程使用时抛出 RuntimeError
+        """
+        for directory in dict.fromkeys((self.library_dir, self.download_dir)):
+            try:
+                self._locks.append(lock_directory(directory))
+            except RuntimeError:
+                self._unlock_directories()
+                raise
+
+    def _unlock_directories(self):
+        """
+        释放引用库和下载目录的进程锁
+        """
+        while self._locks:
+            unlock(self._locks.pop())
+
+    def _close_queue(self):
+        """
+        停止任务队列的心跳，把已领取但未完成的论文放回队列
+        """
+        if self.queue:
+            released = self.queue.close()
+            if released:
+                print(f"已把 {released} 篇未完成的论文放回任务队列")
+            self.queue = None
+
+    def _close_pipeline(self):
+        """
+        等待后处理流水线完成剩余任务并停止后台线程
+        """
+        if self.pipeline:
+            self.pipeline.close()
+            self.pipeline = None
+
+    def report_metrics(self, metrics_path=None, prometheus_path=None):
+        """
+        打印各阶段耗时的 p50/p95，并按需导出指标文件
+        
+        参数：
+        metrics_path (str): JSON 文件路径
+        prometheus_path (str): Prometheus textfile 路径
+        """
+        self.metrics.print_summary()
+        if metrics_path:
+            self.metrics.write_json(metrics_path)
+            print(f"运行指标已写入 {metrics_path}")
+        if prometheus_path:
+            self.metrics.write_prometheus(prometheus_path)
+            print(f"Prometheus 指标已写入 {prometheus_path}")
+
 
 def main():
     """
     主函数，程序入口点
     
-    功能：
-    1. 显示程序信息和使用说明
-    2. 初始化下载器
-    3. 执行下载任务
-    4. 处理异常情况
+    兼容直接运行本文件的旧用法，等同于 python -m citescholareasy download ...
     """
-    print("\nCiteScholarEasy - Google Scholar 引用下载工具")
-    print("="*50)
-    print("提示：")
-    print("1. 程序会自动打开浏览器并访问 Google Scholar")
-    print("2. 如果遇到验证码，会提示您手动完成验证")
-    print("3. 验证完成后，程序会自动继续运行")
-    print("4. 引用文件将保存在 downloads 目录中")
-    print("="*50)
-    
-    try:
-        downloader = CiteDownloader(headless=False)  # 使用有界面模式
-        downloader.download_citations("title.txt")
-    except KeyboardInterrupt:
-        print("\n\n程序被用户中断。")
-    except Exception as e:
-        print(f"\n\n程序出错: {str(e)}")
-    finally:
-        print("\n程序结束。")
+    from citescholareasy.cli import main as cli_main
+    cli_main()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,393 @@
+"""
+CiteScholarEasy 命令行入口
+
+用法：
+    python -m citescholareasy download [title.txt] [--resume] ...
+    python -m citescholareasy export {enw,ris,bib,files} [-o 输出文件或目录]
+    python -m citescholareasy dedup [--titles title.txt]
+    python -m citescholareasy stats
+    python -m citescholareasy compact
+    python -m citescholareasy queue {add,status,retry} 队列路径 [title.txt]
+    python -m citescholareasy start-browser [--port 9222]
+
+只有 download 子命令会导入 selenium 等浏览器相关的库，其余子命令离线运行，启动很快。
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_LIBRARY = "downloads"
+COMMANDS = ("download", "export", "dedup", "stats", "compact", "queue", "start-browser")
+
+
+def _configure_logging():
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _formats(value):
+    """
+    解析 --formats 参数
+    """
+    from citescholareasy.core.files import FORMAT_EXTENSIONS
+
+    formats = tuple(fmt.strip().lower() for fmt in value.split(",") if fmt.strip())
+    unknown = [fmt for fmt in formats if fmt not in FORMAT_EXTENSIONS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"可选格式: {', '.join(FORMAT_EXTENSIONS)}")
+    return formats
+
+
+def run_download(args):
+    """
+    下载论文引用（导入浏览器相关的库）
+    """
+    from citescholareasy.cite_downloader import CiteDownloader
+    from citescholareasy.core.http_backend import DEFAULT_BASE_URL
+
+    print("\nCiteScholarEasy - Google Scholar 引用下载工具")
+    print("="*50)
+    print("提示：")
+    print("1. 程序会自动打开浏览器并访问 Google Scholar")
+    print("2. 如果遇到验证码，会提示您手动完成验证")
+    print("3. 验证完成后，程序会自动继续运行")
+    print(f"4. 引用文件将保存在 {args.library} 目录中")
+    print("5. 程序中断后可使用 --resume 参数从中断处继续")
+    if args.queue:
+        print(f"6. 论文从任务队列 {args.queue} 中领取，可在其他终端或主机上同时运行"
+              "（每个进程使用不同的 --library 目录）")
+    print("="*50)
+
+    try:
+        downloader = CiteDownloader(
+            download_dir=args.library,
+            headless=args.headless,
+            backend=args.backend,
+            use_cache=not args.no_cache,
+            use_index=not args.no_index,
+            profile_dir=args.profile_dir,
+            attach=args.attach,
+            formats=args.formats,
+            post_workers=args.post_workers,
+            storage=args.storage,
+            browser_profile=args.browser_profile,
+            pacing=args.pacing,
+            pacing_budget=args.pacing_budget,
+            navigation=args.navigation,
+            base_url=args.base_url or DEFAULT_BASE_URL,
+        )
+        titles_file = args.titles_file or (None if args.queue else "title.txt")
+        downloader.download_citations(titles_file, workers=args.workers,
+                                      resume=args.resume, journal_path=args.journal,
+                                      metrics_path=args.metrics_json,
+                                      prometheus_path=args.metrics_prom,
+                                      input_format=args.input_format, column=args.column,
+                                      queue_path=args.queue, lease_seconds=args.lease)
+    except KeyboardInterrupt:
+        print("\n\n程序被用户中断。可使用 --resume 参数从中断处继续。")
+    except Exception as e:
+        print(f"\n\n程序出错: {str(e)}")
+    finally:
+        print("\n程序结束。")
+
+
+def run_export(args):
+    """
+    把引用库合并导出为单个文件，或按每条记录一个文件导出到目录
+    """
+    from citescholareasy.core.export import export_files, export_library
+
+    if args.format == "files":
+        output = args.output or "library_files"
+        count = export_files(args.library, output)
+        print(f"已导出 {count} 条引用到目录 {output}")
+        return
+    # 默认输出到当前目录，避免下次导出时把合并文件本身也读进去
+    output = args.output or f"library.{args.format}"
+    count = export_library(args.library, output, args.format)
+    print(f"已导出 {count} 条引用到 {output}")
+
+
+def run_dedup(args):
+    """
+    查找引用库中几乎相同的记录；指定 --titles 时改为筛掉标题列表中引用库已有的论文
+    """
+    from citescholareasy.core.files import get_endnote_title
+    from citescholareasy.core.inputs import TitleStream
+    from citescholareasy.core.store import open_store
+    from citescholareasy.core.title_index import TitleIndex
+
+    store = open_store(args.library)
+    index = TitleIndex(args.library, get_endnote_title, store=store)
+    try:
+        if args.titles:
+            titles = TitleStream(args.titles, args.input_format, args.column)
+            out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+            covered = 0
+            for title in titles:
+                match = index.closest(title)
+                if match and match[2] >= args.threshold and index.matcher.same_work(title, match[0]):
+                    covered += 1
+                    print(f"已有: {title} -> {os.path.basename(match[1])} ({match[2]:.2f})", file=sys.stderr)
+                else:
+                    out.write(title + "\n")
+            if args.output:
+                out.close()
+            print(f"共 {titles.count} 篇，引用库已有 {covered} 篇", file=sys.stderr)
+            return
+
+        reported = set()
+        groups = 0
+        for filename, title in index.items():
+            if filename in reported:
+                continue
+            match = index.closest(title, exclude=filename)
+            if match and match[2] >= args.threshold and index.matcher.same_work(title, match[0]):
+                other = os.path.relpath(match[1], index.library_dir)
+                reported.update((filename, other))
+                groups += 1
+                print(f"{match[2]:.2f}  {filename}\n      {other}")
+        print(f"发现 {groups} 组相似记录（相似度 ≥ {args.threshold}）")
+    finally:
+        index.close()
+        if store is not None:
+            store.close()
+
+
+def run_stats(args):
+    """
+    显示引用库、任务日志、缓存和请求速率的统计信息
+    """
+    from citescholareasy.core.export import iter_library
+    from citescholareasy.core.journal import load_entries
+    from citescholareasy.core.store import open_store
+
+    library = os.path.abspath(args.library)
+    if not os.path.isdir(library):
+        print(f"引用库目录不存在: {library}")
+        return
+    files = set()
+    records = 0
+    for path, _ in iter_library(library):
+        files.add(path)
+        records += 1
+    print(f"引用库: {library}")
+    print(f"  文件: {len(files)} 个，记录: {records} 条")
+
+    store = open_store(library)
+    if store is not None:
+        info = store.stats()
+        store.close()
+        garbage = 1 - info["live"] / info["size"] if info["size"] else 0
+        print(f"紧凑存储: {info['records']} 条记录，{info['segments']} 个段文件，"
+              f"{info['size'] / 1024 / 1024:.1f} MB（可回收 {garbage:.0%}）")
+
+    for journal_path in sorted(glob.glob(os.path.join(library, ".journal-*.jsonl"))):
+        counts = {}
+        for entry in load_entries(journal_path).values():
+            counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+        summary = "，".join(f"{state} {count}" for state, count in sorted(counts.items()))
+        print(f"任务日志 {os.path.basename(journal_path)}: {summary}")
+
+    cache_path = os.path.join(library, ".citation_cache.sqlite3")
+    if os.path.exists(cache_path):
+        conn = sqlite3.connect(cache_path)
+        try:
+            hits, misses = conn.execute(
+                "SELECT SUM(enw IS NOT NULL), SUM(enw IS NULL) FROM citations"
+            ).fetchone()
+        finally:
+            conn.close()
+        print(f"引用缓存: 命中记录 {hits or 0} 条，未匹配记录 {misses or 0} 条")
+
+    rate_path = os.path.join(library, ".rate_state.json")
+    if os.path.exists(rate_path):
+        with open(rate_path, 'r', encoding='utf-8') as f:
+            print(f"请求速率: {json.load(f)['rate']:.1f} 次/分钟")
+
+
+def run_compact(args):
+    """
+    回收紧凑存储中被替换的内容
+    """
+    from citescholareasy.core.store import open_store
+
+    store = open_store(args.library)
+    if store is None:
+        print(f"引用库中没有紧凑存储: {os.path.abspath(args.library)}")
+        return
+    try:
+        before, after = store.compact()
+    finally:
+        store.close()
+    print(f"紧凑存储: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB")
+
+
+def run_queue(args):
+    """
+    管理共享任务队列：登记标题、查看进度、重新排队失败的论文
+    """
+    from citescholareasy.core.work_queue import WorkQueue
+
+    if args.action != "add" and not os.path.exists(args.queue):
+        print(f"任务队列不存在: {os.path.abspath(args.queue)}")
+        return
+    queue = WorkQueue(args.queue)
+    try:
+        if args.action == "add":
+            from citescholareasy.core.inputs import TitleStream
+
+            if not args.titles_file:
+                print("请指定标题来源")
+                return
+            titles = TitleStream(args.titles_file, args.input_format, args.column)
+            added = queue.add(titles)
+            print(f"读取 {titles.count} 篇，新登记 {added} 篇")
+        elif args.action == "retry":
+            print(f"已把 {queue.retry_failed()} 篇失败的论文重新放回队列")
+
+        counts = queue.counts()
+        total = sum(counts[state] for state in ("pending", "leased", "done", "failed"))
+        print(f"任务队列: {os.path.abspath(args.queue)}")
+        print(f"  共 {total} 篇：待处理 {counts['pending']}，处理中 {counts['leased']}"
+              f"（租约已过期 {counts['expired']}），已完成 {counts['done']}，失败 {counts['failed']}")
+        if args.action == "status":
+            now = time.time()
+            for owner, last_seen, held in queue.workers():
+                print(f"  进程 {owner}: 持有 {held} 篇，{now - last_seen:.0f} 秒前心跳")
+            failures = queue.failures()
+            if failures:
+                print("  最近失败的论文：")
+                for title, reason in failures:
+                    print(f"    - {title}: {reason}")
+    finally:
+        # 管理命令不领取论文，关闭时没有需要归还的租约
+        queue.close()
+
+
+def run_start_browser(args):
+    """
+    启动一个开启远程调试端口的浏览器
+    """
+    from citescholareasy.core.driver_startup import launch_warm_browser
+
+    address = launch_warm_browser(args.port, args.profile_dir, args.headless)
+    print(f"浏览器已启动，之后可使用 download --attach {address} 连接")
+
+
+def build_parser():
+    """
+    构造命令行参数解析器
+    """
+    parser = argparse.ArgumentParser(prog="citescholareasy",
+                                     description="CiteScholarEasy - Google Scholar 引用下载工具")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY, help="引用库目录（默认 downloads）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    download = commands.add_parser("download", help="从 Google Scholar 下载引用")
+    download.add_argument("titles_file", nargs="?",
+                          help="论文标题来源：纯文本、CSV、.bib 或 .enw 文件，- 表示标准输入（默认 title.txt；"
+                               "使用 --queue 时登记到队列中，省略则只处理队列中已有的论文）")
+    download.add_argument("--input-format", choices=("text", "csv", "bib", "enw"),
+                          help="输入格式，默认按扩展名推断（标准输入为纯文本）")
+    download.add_argument("--column", help="CSV 中的标题列名或从 1 开始的列号（默认自动识别 title 等列名）")
+    download.add_argument("--resume", action="store_true", help="根据任务日志从上次中断处继续")
+    download.add_argument("--journal", help="任务日志路径（默认保存在引用库目录中）")
+    download.add_argument("--workers", type=int, default=1, help="并行浏览器数量")
+    download.add_argument("--queue", metavar="PATH",
+                          help="共享任务队列（SQLite 文件，多台机器使用时放在共享文件系统上）："
+                               "论文从队列中逐篇领取，多个进程可同时处理同一个队列（每个进程使用不同的 --library 目录），"
+                               "进程退出后未完成的论文自动回到队列")
+    download.add_argument("--lease", type=float, metavar="SECONDS",
+                          help="任务队列的租约时长，超过这段时间没有心跳的进程持有的论文会被重新领取（默认 300）")
+    download.add_argument("--backend", choices=("browser", "http", "hybrid"), default="browser",
+                          help="检索后端：browser 使用浏览器，http 直接发送请求，hybrid 用浏览器检索并通过共享 Cookie 的会话获取引用")
+    download.add_argument("--headless", action="store_true", help="使用无头模式")
+    download.add_argument("--no-cache", action="store_true", help="不使用引用缓存")
+    download.add_argument("--no-index", action="store_true", help="不在检索前查找引用库中已有的论文")
+    download.add_argument("--profile-dir", help="持久化的浏览器用户目录，保留 Cookie 和缓存")
+    download.add_argument("--attach", metavar="HOST:PORT", help="连接已启动的浏览器，跳过冷启动")
+    download.add_argument("--formats", type=_formats, default=("enw",), metavar="enw,bib,ris,refworks",
+                          help="需要的引用格式，逗号分隔；其他格式与 .enw 文件同名并列保存（默认 enw）")
+    download.add_argument("--post-workers", type=int, default=2,
+                          help="重命名、其他格式、缓存等后处理的后台线程数量，0 表示不使用流水线（默认 2）")
+    download.add_argument("--storage", choices=("files", "packed"), default="files",
+                          help="引用库的保存方式：files 每篇论文一个 .enw 文件，packed 追加写入紧凑存储，"
+                               "适合很大的引用库，可用 export files 导出为单独的文件（默认 files）")
+    download.add_argument("--browser-profile", choices=("full", "lean"), default="full",
+                          help="浏览器资源配置：lean 拦截图片、字体和统计脚本，页面在 DOM 就绪后即返回，"
+                               "节省带宽和等待时间；遇到验证码时暂停拦截（默认 full）")
+    download.add_argument("--pacing", choices=("fast", "balanced", "stealth"), default="fast",
+                          help="浏览器交互的节奏：fast 不做刻意停顿，balanced 在搜索和点击前短暂停顿，"
+                               "stealth 逐字输入、分步滚动（默认 fast）")
+    download.add_argument("--pacing-budget", type=float, metavar="SECONDS",
+                          help="每篇论文刻意停顿的时间上限，用完后跳过其余停顿、输入改为一次性填写"
+                               "（默认 fast 0、balanced 3、stealth 20）")
+    download.add_argument("--navigation", choices=("direct", "homepage"), default="direct",
+                          help="打开搜索结果的方式：direct 直接打开结果页地址，只在浏览器刚启动或"
+                               "没有搜索结果时访问首页；homepage 每篇论文都从首页输入搜索词（默认 direct）")
+    download.add_argument("--base-url", metavar="URL",
+                          help="Scholar 根地址，例如镜像站点或本地测试服务器（默认 https://scholar.google.com/）")
+    download.add_argument("--metrics-json", metavar="PATH", help="运行结束时把各阶段耗时和计数写入 JSON 文件")
+    download.add_argument("--metrics-prom", metavar="PATH", help="运行结束时写入 Prometheus textfile 格式的指标")
+    download.set_defaults(func=run_download)
+
+    export = commands.add_parser("export", help="把引用库合并导出为单个文件，或按记录导出为单独的文件")
+    export.add_argument("format", choices=("enw", "ris", "bib", "files"),
+                        help="导出格式；files 表示每条记录一个 .enw 文件（以及已保存的其他格式）")
+    export.add_argument("-o", "--output",
+                        help="导出文件路径（默认为当前目录下的 library.<格式>；files 格式为目录，默认 library_files）")
+    export.set_defaults(func=run_export)
+
+    dedup = commands.add_parser("dedup", help="查找引用库中的重复记录")
+    dedup.add_argument("--titles", help="改为筛选标题来源（格式同 download），只输出引用库中还没有的论文")
+    dedup.add_argument("--input-format", choices=("text", "csv", "bib", "enw"), help="标题来源的格式")
+    dedup.add_argument("--column", help="CSV 中的标题列名或列号")
+    dedup.add_argument("-o", "--output", help="筛选结果的输出文件（默认标准输出）")
+    dedup.add_argument("--threshold", type=float, default=0.95, help="认为重复的最低相似度")
+    dedup.set_defaults(func=run_dedup)
+
+    stats = commands.add_parser("stats", help="显示引用库和运行状态统计")
+    stats.set_defaults(func=run_stats)
+
+    compact = commands.add_parser("compact", help="回收紧凑存储中被替换的内容")
+    compact.set_defaults(func=run_compact)
+
+    queue = commands.add_parser("queue", help="管理多进程、多主机共享的任务队列")
+    queue.add_argument("action", choices=("add", "status", "retry"),
+                       help="add 登记标题，status 查看进度和正在处理的进程，retry 把失败的论文重新放回队列")
+    queue.add_argument("queue", help="任务队列路径")
+    queue.add_argument("titles_file", nargs="?", help="add 时的标题来源（格式同 download）")
+    queue.add_argument("--input-format", choices=("text", "csv", "bib", "enw"), help="标题来源的格式")
+    queue.add_argument("--column", help="CSV 中的标题列名或列号")
+    queue.set_defaults(func=run_queue)
+
+    start_browser = commands.add_parser("start-browser", help="启动一个供 --attach 连接的浏览器")
+    start_browser.add_argument("--port", type=int, default=9222, help="远程调试端口")
+    start_browser.add_argument("--profile-dir", help="浏览器用户目录")
+    start_browser.add_argument("--headless", action="store_true", help="使用无头模式")
+    start_browser.set_defaults(func=run_start_browser)
+    return parser
+
+
+def main(argv=None):
+    """
+    命令行入口；没有给出子命令时按 download 处理，兼容旧的用法
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not any(arg in COMMANDS for arg in argv) and not {"-h", "--help"} & set(argv):
+        # 全局选项 --library 之后插入 download
+        position = 2 if argv[:1] == ["--library"] else 0
+        argv.insert(position, "download")
+    _configure_logging()
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+浏览器资源配置
+
+full 按默认方式加载页面的全部资源；lean 只加载检索和引用弹窗需要的部分：
+1. 页面加载策略为 eager，driver.get 在 DOM 就绪后返回，不再等待图片、字体和异步脚本
+2. 通过 CDP Network.setBlockedURLs 拦截图片、字体、媒体和统计脚本
+3. 关闭通知、定位、网络预测（预连接和预取）等与检索无关的功能
+
+脚本和样式表不拦截：引用弹窗由 Scholar 自己的脚本加载，验证码页面也需要样式才能正常显示。
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+BROWSER_PROFILES = ("full", "lean")
+
+# Network.setBlockedURLs 的匹配模式，* 匹配任意字符
+BLOCKED_URL_PATTERNS = (
+    # 图片
+    "*.png", "*.png?*", "*.jpg", "*.jpg?*", "*.jpeg", "*.jpeg?*", "*.gif", "*.gif?*",
+    "*.webp", "*.webp?*", "*.svg", "*.svg?*", "*.ico", "*.ico?*",
+    # 字体
+    "*.woff", "*.woff?*", "*.woff2", "*.woff2?*", "*.ttf", "*.ttf?*", "*.otf", "*.otf?*",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    # 音视频
+    "*.mp4", "*.webm", "*.mp3",
+    # 统计和广告
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*/gtag/js*", "*/g/collect*", "*/gen_204*",
+)
+
+# lean 配置额外设置的首选项（2 表示禁止）
+LEAN_PREFS = {
+    "profile.default_content_setting_values.notifications": 2,  # 禁止通知
+    "profile.default_content_setting_values.geolocation": 2,  # 禁止定位
+    "profile.default_content_setting_values.media_stream": 2,  # 禁止摄像头和麦克风
+    "net.network_prediction_options": 2,  # 不预连接、不预取链接
+}
+
+# lean 配置额外的启动参数
+LEAN_ARGUMENTS = (
+    "--disable-background-networking",  # 不在后台检查更新、同步等
+    "--disable-component-update",  # 不下载组件更新
+)
+
+
+def _pattern_regex(patterns):
+    return re.compile("|".join("(?:" + ".*".join(map(re.escape, pattern.split("*"))) + ")"
+                               for pattern in patterns))
+
+
+_BLOCKED_RE = _pattern_regex(BLOCKED_URL_PATTERNS)
+
+
+def is_blocked(url, patterns=BLOCKED_URL_PATTERNS):
+    """
+    判断地址是否匹配拦截模式（与 Chrome 的匹配规则相同：* 匹配任意字符，整个地址需匹配）
+
+    参数：
+    url (str): 资源地址
+    patterns (tuple): 拦截模式
+
+    返回：
+    bool: 是否会被拦截
+    """
+    regex = _BLOCKED_RE if patterns is BLOCKED_URL_PATTERNS else _pattern_regex(patterns)
+    return bool(patterns) and regex.fullmatch(url) is not None
+
+
+def configure_options(options, prefs, profile):
+    """
+    按资源配置调整浏览器选项
+
+    参数：
+    options (ChromeOptions): 浏览器选项
+    prefs (dict): 将要设置的首选项，lean 配置会向其中添加条目
+    profile (str): "full" 或 "lean"
+    """
+    if profile != "lean":
+        return
+    options.page_load_strategy = "eager"
+    prefs.update(LEAN_PREFS)
+    for argument in LEAN_ARGUMENTS:
+        options.add_argument(argument)
+
+
+def block_resources(driver, patterns=BLOCKED_URL_PATTERNS):
+    """
+    开始拦截匹配的资源，传入空元组则取消拦截
+
+    参数：
+    driver (WebDriver): 浏览器驱动
+    patterns (tuple): 拦截模式
+
+    返回：
+    bool: 是否设置成功（浏览器不支持 CDP 时返回 False）
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+        return True
+    except Exception as e:
+        logger.warning(f"无法设置资源拦截: {str(e)}")
+        return False
@@ -0,0 +1,166 @@
+"""
+持久化的引用缓存
+
+以规范化后的搜索标题为键，保存匹配到的 Scholar 标题、相似度和 EndNote 原文；
+BibTeX、RIS 等其他格式以同一个键保存在 formats 表中。
+未找到匹配的结果也会记录，并在 TTL 过期后重新检索。
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from citescholareasy.core.normalize import normalize_title
+
+# 未找到匹配的记录默认保留 7 天
+DEFAULT_NEGATIVE_TTL = 7 * 24 * 3600
+
+
+# 缓存键的版本，记录在 PRAGMA user_version 中；键的规范化方式改变时递增，打开旧缓存时重新计算
+KEY_VERSION = 2
+
+
+def normalize_title_key(title):
+    """
+    生成缓存键：与标题匹配使用相同的规范化（NFKC、折叠全角和中日韩标点、忽略大小写和标点，保留 C++、C# 中的 + 和 #）
+
+    参数：
+    title (str): 论文标题
+
+    返回：
+    str: 规范化后的标题
+    """
+    return normalize_title(title)
+
+
+class CitationCache:
+    """
+    基于 SQLite 的引用缓存，可在多个线程间共享
+    """
+
+    def __init__(self, path, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        """
+        参数：
+        path (str): SQLite 数据库文件路径
+        negative_ttl (float): 未匹配记录的有效期（秒）
+        """
+        self.path = os.path.abspath(path)
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS citations (
+                    key TEXT PRIMARY KEY,
+                    search_title TEXT NOT NULL,
+                    matched_title TEXT,
+                    score REAL,
+                    enw TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS formats (
+                    key TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    PRIMARY KEY (key, format)
+                )
+            """)
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < KEY_VERSION:
+                self._rekey()
+            self._conn.commit()
+
+    def _rekey(self):
+        """
+        按当前的规范化方式重新计算已有记录的键；多条记录得到相同的键时保留最新的一条
+        """
+        rows = self._conn.execute("SELECT key, search_title FROM citations ORDER BY created_at").fetchall()
+        for key, search_title in rows:
+            new_key = normalize_title_key(search_title)
+            if new_key != key:
+                # 较新的记录替换掉键相同的旧记录，旧记录的其他格式一并删除
+                self._conn.execute("DELETE FROM formats WHERE key = ?", (new_key,))
+                self._conn.execute("UPDATE OR REPLACE citations SET key = ? WHERE key = ?", (new_key, key))
+                self._conn.execute("UPDATE formats SET key = ? WHERE key = ?", (new_key, key))
+        self._conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+    def get(self, title):
+        """
+        查询缓存
+
+        参数：
+        title (str): 搜索标题
+
+        返回：
+        dict/None: 缓存记录；enw 为 None 表示此前未找到匹配。没有记录或未匹配记录已过期时返回 None；
+                   formats 为格式到内容的映射（包括 enw）
+        """
+        key = normalize_title_key(title)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT search_title, matched_title, score, enw, created_at "
+                "FROM citations WHERE key = ?",
+                (key,),
+            ).fetchone()
+            formats = dict(self._conn.execute(
+                "SELECT format, body FROM formats WHERE key = ?", (key,)
+            ).fetchall()) if row else {}
+        if row is None:
+            return None
+        entry = dict(zip(("search_title", "matched_title", "score", "enw", "created_at"), row))
+        if entry["enw"] is None and time.time() - entry["created_at"] > self.negative_ttl:
+            return None
+        if entry["enw"] is not None:
+            formats["enw"] = entry["enw"]
+        entry["formats"] = formats
+        return entry
+
+    def _put(self, title, matched_title, score, enw, formats=None):
+        key = normalize_title_key(title)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO citations "
+                "(key, search_title, matched_title, score, enw, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, title, matched_title, score, enw, time.time()),
+            )
+            if enw is None:
+                self._conn.execute("DELETE FROM formats WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO formats (key, format, body) VALUES (?, ?, ?)",
+                [(key, fmt, body) for fmt, body in (formats or {}).items() if fmt != "enw"],
+            )
+            self._conn.commit()
+
+    def put_hit(self, title, matched_title, score, enw, formats=None):
+        """
+        记录成功匹配的引用
+
+        参数：
+        title (str): 搜索标题
+        matched_title (str): Scholar 上匹配到的标题
+        score (float): 相似度
+        enw (str): EndNote 原文
+        formats (dict): 其他格式的引用内容，格式到内容的映射
+        """
+        self._put(title, matched_title, score, enw, formats)
+
+    def put_miss(self, title, best_title=None, best_score=None):
+        """
+        记录未找到足够匹配的结果
+
+        参数：
+        title (str): 搜索标题
+        best_title (str): 相似度最高的结果标题（如果有）
+        best_score (float): 最高相似度（如果有）
+        """
+        self._put(title, best_title, best_score, None)
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
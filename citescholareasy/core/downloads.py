@@ -0,0 +1,147 @@
+"""
+下载完成检测
+
+每次下载使用独立的临时目录，Linux 上通过 inotify 等待文件写完，
+其他平台退化为轮询这个只含一个文件的小目录，等待 .crdownload 消失。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import sys
+import tempfile
+import time
+
+# 浏览器写入中的临时文件后缀
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp")
+
+# inotify 常量（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_libc = None
+
+
+def _load_libc():
+    """
+    加载提供 inotify 的 libc，不支持时返回 None
+    """
+    global _libc
+    if _libc is None:
+        _libc = False
+        if sys.platform.startswith("linux"):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc or None
+
+
+def create_download_dir(parent):
+    """
+    在 parent 下创建本次下载专用的隐藏临时目录
+
+    返回：
+    str: 临时目录路径
+    """
+    return tempfile.mkdtemp(prefix=".dl-", dir=parent)
+
+
+def cleanup_download_dirs(parent):
+    """
+    删除 parent 下残留的下载临时目录
+    """
+    if not os.path.isdir(parent):
+        return
+    for name in os.listdir(parent):
+        if name.startswith(".dl-"):
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+class DownloadWatcher:
+    """
+    等待目录中出现一个下载完成的文件
+
+    使用方法：在触发下载之前创建，触发之后调用 wait()。
+    创建时目录中已有的文件会被忽略，因此也可以用于共享目录。
+    """
+
+    def __init__(self, directory):
+        """
+        参数：
+        directory (str): 浏览器的下载目录
+        """
+        self.directory = directory
+        self.baseline = set(os.listdir(directory))
+        self._fd = None
+        libc = _load_libc()
+        if libc:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                wd = libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+                if wd >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+
+    def _completed_file(self):
+        """
+        返回已下载完成的新文件路径，没有时返回 None
+        """
+        names = set(os.listdir(self.directory)) - self.baseline
+        for name in names:
+            if name.startswith(".") or name.endswith(PARTIAL_SUFFIXES):
+                continue
+            # Chrome 先写 .crdownload，完成后改名；伴随文件还在说明仍在写入
+            if any(f"{name}{suffix}" in names for suffix in PARTIAL_SUFFIXES):
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def wait(self, timeout=30, poll_interval=0.05):
+        """
+        等待下载完成
+
+        参数：
+        timeout (float): 超时时间（秒）
+        poll_interval (float): 不支持 inotify 时的轮询间隔（秒）
+
+        返回：
+        str/None: 下载文件的路径，超时返回 None
+        """
+        deadline = time.time() + timeout
+        try:
+            while True:
+                path = self._completed_file()
+                if path:
+                    return path
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                if self._fd is not None:
+                    # 阻塞到有文件关闭或改名事件
+                    readable, _, _ = select.select([self._fd], [], [], remaining)
+                    if readable:
+                        try:
+                            os.read(self._fd, 4096)
+                        except BlockingIOError:
+                            pass
+                else:
+                    time.sleep(min(poll_interval, remaining))
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        释放 inotify 句柄
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,166 @@
+"""
+浏览器启动加速
+
+1. 按 Chrome 版本缓存 ChromeDriver 路径，避免每次初始化都让 webdriver_manager 解析版本
+2. 支持持久化的浏览器用户目录，保留 Cookie 和缓存
+3. 支持预先启动一个开启远程调试端口的浏览器，之后的运行直接连接，跳过冷启动
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "citescholareasy")
+
+# 常见的 Chrome 可执行文件
+CHROME_CANDIDATES = (
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+)
+
+
+def find_chrome():
+    """
+    查找 Chrome 可执行文件
+
+    返回：
+    str/None: 可执行文件路径
+    """
+    for candidate in CHROME_CANDIDATES:
+        path = shutil.which(candidate) or (candidate if os.path.isfile(candidate) else None)
+        if path:
+            return path
+    return None
+
+
+def detect_chrome_version(chrome=None):
+    """
+    获取本机 Chrome 版本号
+
+    参数：
+    chrome (str): Chrome 可执行文件路径，默认自动查找
+
+    返回：
+    str/None: 版本号，例如 "122.0.6261.94"
+    """
+    if sys.platform == "win32":
+        try:
+            output = subprocess.run(
+                ["reg", "query", r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon", "/v", "version"],
+                capture_output=True, text=True, timeout=5,
+            ).stdout
+            return output.split()[-1] if "version" in output else None
+        except (OSError, subprocess.SubprocessError):
+            return None
+    chrome = chrome or find_chrome()
+    if not chrome:
+        return None
+    try:
+        output = subprocess.run([chrome, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    for part in output.split():
+        if part[:1].isdigit() and "." in part:
+            return part
+    return None
+
+
+class DriverPathCache:
+    """
+    ChromeDriver 路径缓存
+
+    同一进程内只解析一次；跨进程按 Chrome 版本保存在 drivers.json 中，
+    只有 Chrome 升级后才会重新调用 ChromeDriverManager。
+    """
+
+    _resolved = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cache_file=None):
+        """
+        参数：
+        cache_file (str): 缓存文件路径，默认 ~/.cache/citescholareasy/drivers.json
+        """
+        self.cache_file = cache_file or os.path.join(CACHE_DIR, "drivers.json")
+
+    def _read(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        temp_path = self.cache_file + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, self.cache_file)
+
+    def resolve(self):
+        """
+        返回与本机 Chrome 匹配的 ChromeDriver 路径
+
+        返回：
+        str: ChromeDriver 可执行文件路径
+        """
+        with self._lock:
+            if self.cache_file in self._resolved:
+                return self._resolved[self.cache_file]
+
+            version = detect_chrome_version()
+            entries = self._read()
+            path = entries.get(version) if version else None
+            if path and os.path.exists(path):
+                logger.info(f"使用缓存的 ChromeDriver (Chrome {version}): {path}")
+            else:
+                from webdriver_manager.chrome import ChromeDriverManager
+                path = ChromeDriverManager().install()
+                if version:
+                    entries[version] = path
+                    self._write(entries)
+            self._resolved[self.cache_file] = path
+            return path
+
+
+def launch_warm_browser(port=9222, profile_dir=None, headless=False):
+    """
+    启动一个开启远程调试端口的 Chrome，供之后的运行直接连接
+
+    参数：
+    port (int): 远程调试端口
+    profile_dir (str): 浏览器用户目录，默认 ~/.cache/citescholareasy/warm-profile
+    headless (bool): 是否使用无头模式
+
+    返回：
+    str: 可传给 CiteDownloader(attach=...) 的调试地址
+    """
+    chrome = find_chrome()
+    if not chrome:
+        raise RuntimeError("找不到 Chrome 浏览器")
+    profile_dir = os.path.abspath(profile_dir or os.path.join(CACHE_DIR, "warm-profile"))
+    os.makedirs(profile_dir, exist_ok=True)
+    args = [
+        chrome,
+        f"--remote-debugging-port={port}",
+        f"--user-data-dir={profile_dir}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-blink-features=AutomationControlled",
+    ]
+    if headless:
+        args.append("--headless=new")
+    # 与当前进程脱离，程序退出后浏览器继续运行
+    subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+    return f"127.0.0.1:{port}"
@@ -0,0 +1,164 @@
+"""
+EndNote (.enw) 流式解析
+
+逐行读取、逐条产出记录，不把整个文件读入内存。支持：
+1. 跨行字段（如较长的 %X 摘要）
+2. 重复字段（多个 %A 作者）
+3. 编码检测（BOM、UTF-8、GB18030，最后退回 Latin-1）
+"""
+import codecs
+import os
+import re
+
+_FIELD_RE = re.compile(r"^%(\S)(?: (.*))?$")
+
+# 编码检测读取的字节数
+SNIFF_BYTES = 64 * 1024
+
+
+def detect_encoding(path):
+    """
+    检测 EndNote 文件的编码
+
+    参数：
+    path (str): 文件路径
+
+    返回：
+    str: 编码名称
+    """
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    for encoding in ("utf-8", "gb18030"):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            # final=False：容忍截断在多字节字符中间
+            decoder.decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+class EnwRecord:
+    """
+    一条 EndNote 记录，按原始顺序保存 (标记, 值) 列表
+    """
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields=None):
+        self.fields = fields or []
+
+    def get(self, tag, default=None):
+        """
+        返回第一个指定标记的值
+        """
+        for field_tag, value in self.fields:
+            if field_tag == tag:
+                return value
+        return default
+
+    def get_all(self, tag):
+        """
+        返回所有指定标记的值（例如全部 %A 作者）
+        """
+        return [value for field_tag, value in self.fields if field_tag == tag]
+
+    @property
+    def type(self):
+        return self.get("0", "Generic")
+
+    @property
+    def title(self):
+        return self.get("T")
+
+    def to_enw(self):
+        """
+        序列化为 EndNote 文本
+        """
+        return "".join(f"%{tag} {value}\n" for tag, value in self.fields)
+
+    def __repr__(self):
+        return f"EnwRecord({self.type!r}, {self.title!r})"
+
+
+def iter_lines_records(lines):
+    """
+    从文本行中逐条解析记录
+
+    参数：
+    lines (iterable): 文本行
+
+    返回：
+    generator: EnwRecord
+    """
+    fields = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = _FIELD_RE.match(line)
+        if match:
+            tag, value = match.group(1), (match.group(2) or "").strip()
+            if tag == "0" and fields:
+                yield EnwRecord(fields)
+                fields = []
+            fields.append((tag, value))
+        elif not line.strip():
+            # 空行分隔记录
+            if fields:
+                yield EnwRecord(fields)
+                fields = []
+        elif fields:
+            # 跨行字段的续行
+            tag, value = fields[-1]
+            fields[-1] = (tag, f"{value}\n{line.strip()}")
+    if fields:
+        yield EnwRecord(fields)
+
+
+def iter_records(path, encoding=None):
+    """
+    逐条读取 EndNote 文件中的记录
+
+    参数：
+    path (str): 文件路径
+    encoding (str): 文件编码，默认自动检测
+
+    返回：
+    generator: EnwRecord
+    """
+    encoding = encoding or detect_encoding(path)
+    with open(path, 'r', encoding=encoding, errors='replace') as f:
+        yield from iter_lines_records(f)
+
+
+def iter_directory(directory):
+    """
+    逐条读取目录中所有 .enw 文件的记录（不预先列出或加载全部文件）
+
+    参数：
+    directory (str): 目录路径
+
+    返回：
+    generator: (文件路径, EnwRecord)
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".enw") and not entry.name.startswith("."):
+                for record in iter_records(entry.path):
+                    yield entry.path, record
+
+
+def read_title(path):
+    """
+    读取 EndNote 文件中第一条记录的 %T 标题，读到即停止
+
+    返回：
+    str/None: 标题
+    """
+    for record in iter_records(path):
+        return record.title
+    return None
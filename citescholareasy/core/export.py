@@ -0,0 +1,241 @@
+"""
+导出引用库
+
+把目录中的全部 .enw 记录（包括紧凑存储中的记录）合并为一个 EndNote、RIS 或 BibTeX 文件，
+或者按每条记录一个文件导出（export_files）。
+每次只读取并写出一条记录，内存占用与记录数量无关。
+"""
+import os
+import re
+import shutil
+
+from citescholareasy.core.enw import iter_directory
+from citescholareasy.core.files import FORMAT_EXTENSIONS, format_path
+from citescholareasy.core.normalize import sanitize_filename
+from citescholareasy.core.store import open_store
+
+FORMATS = ("enw", "ris", "bib")
+
+# EndNote 类型到 RIS 类型
+RIS_TYPES = {
+    "Journal Article": "JOUR",
+    "Book": "BOOK",
+    "Book Section": "CHAP",
+    "Conference Proceedings": "CONF",
+    "Conference Paper": "CPAPER",
+    "Thesis": "THES",
+    "Report": "RPRT",
+    "Patent": "PAT",
+    "Newspaper Article": "NEWS",
+    "Web Page": "ELEC",
+}
+
+# EndNote 类型到 BibTeX 条目类型
+BIBTEX_TYPES = {
+    "Journal Article": "article",
+    "Book": "book",
+    "Book Section": "incollection",
+    "Conference Proceedings": "inproceedings",
+    "Conference Paper": "inproceedings",
+    "Thesis": "phdthesis",
+    "Report": "techreport",
+}
+
+# EndNote 标记到 RIS 标记（类型、作者、页码单独处理）
+RIS_FIELDS = (
+    ("T", "TI"), ("J", "JO"), ("B", "T2"), ("D", "PY"), ("V", "VL"), ("N", "IS"),
+    ("I", "PB"), ("C", "CY"), ("R", "DO"), ("U", "UR"), ("X", "AB"), ("@", "SN"),
+)
+
+# EndNote 标记到 BibTeX 字段（作者、页码、期刊/书名单独处理）
+BIBTEX_FIELDS = (
+    ("T", "title"), ("D", "year"), ("V", "volume"), ("N", "number"), ("I", "publisher"),
+    ("C", "address"), ("R", "doi"), ("U", "url"), ("X", "abstract"),
+)
+
+
+def to_ris(record):
+    """
+    把一条 EndNote 记录转换为 RIS 文本
+    """
+    lines = [f"TY  - {RIS_TYPES.get(record.type, 'GEN')}"]
+    for author in record.get_all("A"):
+        lines.append(f"AU  - {author}")
+    for editor in record.get_all("E"):
+        lines.append(f"ED  - {editor}")
+    for tag, ris_tag in RIS_FIELDS:
+        for value in record.get_all(tag):
+            lines.append(f"{ris_tag}  - {' '.join(value.split())}")
+    pages = record.get("P")
+    if pages:
+        start, _, end = pages.partition("-")
+        lines.append(f"SP  - {start.strip()}")
+        if end.strip("- "):
+            lines.append(f"EP  - {end.strip('- ')}")
+    for keyword in record.get_all("K"):
+        for word in keyword.split("\n"):
+            lines.append(f"KW  - {word.strip()}")
+    lines.append("ER  - ")
+    return "\n".join(lines) + "\n\n"
+
+
+# LaTeX 特殊字符：% 会注释掉字段的其余部分，& # _ $ 会导致编译错误
+_BIBTEX_SPECIAL_RE = re.compile(r"[{}&%#_$]")
+# 由 \url 原样排版的字段只转义花括号，转义其他字符会改变链接
+VERBATIM_FIELDS = ("doi", "url")
+
+
+def _bibtex_escape(value, verbatim=False):
+    value = " ".join(value.split())
+    if verbatim:
+        return value.replace("{", "\\{").replace("}", "\\}")
+    return _BIBTEX_SPECIAL_RE.sub(lambda match: "\\" + match.group(), value)
+
+
+def bibtex_key(record):
+    """
+    生成 BibTeX 引用键：第一作者姓氏 + 年份 + 标题第一个英文词
+    """
+    authors = record.get_all("A")
+    surname = re.sub(r"[^A-Za-z]", "", authors[0].split(",")[0]) if authors else ""
+    year = re.sub(r"\D", "", record.get("D", ""))[:4]
+    words = re.findall(r"[A-Za-z0-9]+", record.title or "")
+    # 引用键只使用 ASCII 字符，中文作者和标题不参与
+    parts = [surname.lower() or "anon", year, words[0].lower() if words else ""]
+    return "".join(parts)
+
+
+def to_bibtex(record, key):
+    """
+    把一条 EndNote 记录转换为 BibTeX 文本
+
+    参数：
+    record (EnwRecord): EndNote 记录
+    key (str): 引用键
+    """
+    entry_type = BIBTEX_TYPES.get(record.type, "misc")
+    fields = []
+    authors = record.get_all("A")
+    if authors:
+        fields.append(("author", " and ".join(authors)))
+    editors = record.get_all("E")
+    if editors:
+        fields.append(("editor", " and ".join(editors)))
+    for tag, name in BIBTEX_FIELDS:
+        value = record.get(tag)
+        if value:
+            fields.append((name, value))
+    container = record.get("J") or record.get("B")
+    if container:
+        fields.append(("journal" if entry_type == "article" else "booktitle", container))
+    pages = record.get("P")
+    if pages:
+        fields.append(("pages", "--".join(part.strip() for part in pages.split("-") if part.strip())))
+    isbn = record.get("@")
+    if isbn:
+        fields.append(("isbn" if entry_type in ("book", "incollection") else "issn", isbn))
+    body = ",\n".join(f"  {name} = {{{_bibtex_escape(value, name in VERBATIM_FIELDS)}}}" for name, value in fields)
+    return f"@{entry_type}{{{key},\n{body}\n}}\n\n"
+
+
+def iter_library(library_dir):
+    """
+    逐条读取引用库中的记录：先是目录中的 .enw 文件，再是紧凑存储中的记录
+
+    参数：
+    library_dir (str): 引用库目录
+
+    返回：
+    generator: (文件路径或引用路径, EnwRecord)
+    """
+    yield from iter_directory(library_dir)
+    store = open_store(library_dir)
+    if store is not None:
+        try:
+            yield from store.iter_records()
+        finally:
+            store.close()
+
+
+def _unique_path(directory, name, used):
+    """
+    返回输出目录中还没有使用的 .enw 路径，重名时依次加上 _1、_2
+    """
+    base = name or "untitled"
+    name, counter = base, 1
+    while name.casefold() in used or os.path.exists(os.path.join(directory, name + ".enw")):
+        name = f"{base}_{counter}"
+        counter += 1
+    used.add(name.casefold())
+    return os.path.join(directory, name + ".enw")
+
+
+def export_files(library_dir, output_dir):
+    """
+    按每条记录一个 .enw 文件导出引用库（其他已保存的格式同名并列），与按文件保存的引用库形式相同
+
+    参数：
+    library_dir (str): 引用库目录
+    output_dir (str): 输出目录
+
+    返回：
+    int: 导出的记录数量
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    used = set()
+    count = 0
+    with os.scandir(library_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".enw") and not entry.name.startswith("."):
+                path = _unique_path(output_dir, entry.name[:-len(".enw")], used)
+                shutil.copyfile(entry.path, path)
+                for fmt in FORMAT_EXTENSIONS:
+                    if fmt != "enw" and os.path.exists(format_path(entry.path, fmt)):
+                        shutil.copyfile(format_path(entry.path, fmt), format_path(path, fmt))
+                count += 1
+    store = open_store(library_dir)
+    if store is not None:
+        try:
+            for _, title, texts in store.iter_texts():
+                path = _unique_path(output_dir, sanitize_filename(title or ""), used)
+                for fmt, text in texts.items():
+                    with open(format_path(path, fmt), 'w', encoding='utf-8') as f:
+                        f.write(text)
+                count += 1
+        finally:
+            store.close()
+    return count
+
+
+def export_library(source_dir, output_path, fmt="enw"):
+    """
+    将引用库中的全部记录合并导出为单个文件
+
+    参数：
+    source_dir (str): 引用库目录
+    output_path (str): 输出文件路径
+    fmt (str): 输出格式，"enw"、"ris" 或 "bib"
+
+    返回：
+    int: 导出的记录数量
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}，可选: {', '.join(FORMATS)}")
+    count = 0
+    used_keys = set()
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for _, record in iter_library(source_dir):
+            if fmt == "enw":
+                out.write(record.to_enw() + "\n")
+            elif fmt == "ris":
+                out.write(to_ris(record))
+            else:
+                key = base_key = bibtex_key(record)
+                suffix = 0
+                while key in used_keys:
+                    suffix += 1
+                    key = f"{base_key}{chr(ord('a') + suffix - 1) if suffix <= 26 else suffix}"
+                used_keys.add(key)
+                out.write(to_bibtex(record, key))
+            count += 1
+    return count
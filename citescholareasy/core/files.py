@@ -0,0 +1,49 @@
+"""
+引用文件的命名与读取
+
+这些函数不依赖浏览器相关的库，离线工具可以直接使用。
+"""
+import os
+
+from citescholareasy.core.enw import read_title
+from citescholareasy.core.normalize import sanitize_filename  # noqa: F401  兼容原来的导入位置
+
+# 各引用格式在引用库中的扩展名；同一篇论文的各格式文件与 .enw 文件同名并列保存
+FORMAT_EXTENSIONS = {
+    "enw": ".enw",
+    "bib": ".bib",
+    "ris": ".ris",
+    "refworks": ".rfw",
+}
+
+
+def format_path(enw_path, fmt):
+    """
+    返回与 .enw 文件并列保存的其他格式文件路径
+
+    参数：
+    enw_path (str): EndNote 文件路径
+    fmt (str): 引用格式
+
+    返回：
+    str: 同名、扩展名对应格式的文件路径
+    """
+    return os.path.splitext(enw_path)[0] + FORMAT_EXTENSIONS[fmt]
+
+
+def get_endnote_title(file_path):
+    """
+    从 EndNote 文件中提取论文标题
+
+    参数：
+    file_path (str): EndNote 文件路径
+
+    返回：
+    str/None: 论文标题，如果提取失败则返回 None
+    """
+    try:
+        # 流式读取，读到第一条记录的 %T 即停止，并自动检测编码
+        return read_title(file_path)
+    except Exception as e:
+        print(f"读取 EndNote 文件时出错: {str(e)}")
+        return None
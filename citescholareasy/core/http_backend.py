@@ -0,0 +1,407 @@
+"""
+基于 requests + BeautifulSoup 的 Google Scholar HTTP 后端
+
+不启动浏览器，直接请求搜索结果页、解析结果并把 EndNote 引用内容读入内存。
+遇到验证码时抛出 CaptchaDetected，由调用方切换回浏览器流程。
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from citescholareasy.core.page_state import CAPTCHA_SELECTOR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://scholar.google.com/"
+# 界面语言参数
+DEFAULT_HL = "zh-CN"
+
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
+
+
+# 引用弹窗中各格式链接的文字和地址特征
+CITATION_FORMATS = {
+    "enw": ("EndNote", ("scholar.enw", "format=enw")),
+    "bib": ("BibTeX", ("scholar.bib", "format=bibtex")),
+    "ris": ("RefMan", ("scholar.ris", "format=ris")),
+    "refworks": ("RefWorks", ("scholar.rfw", "format=refworks")),
+}
+
+
+class CaptchaDetected(Exception):
+    """Google Scholar 返回了验证码或封禁页面"""
+
+
+def build_session(user_agent=None, pool_size=10, retries=2):
+    """
+    创建带连接池和 keep-alive 的 requests 会话
+
+    参数：
+    user_agent (str): 请求使用的 User-Agent
+    pool_size (int): 连接池大小
+    retries (int): 连接错误和 5xx 响应的重试次数
+
+    返回：
+    requests.Session: 配置好的会话
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5,
+                  status_forcelist=(500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": user_agent or DEFAULT_USER_AGENT,
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+def build_search_url(base_url, query, hl=DEFAULT_HL):
+    """
+    构造搜索结果页地址，浏览器直接打开它即可跳过首页
+
+    参数：
+    base_url (str): Scholar 根地址，可指向本地替身服务器
+    query (str): 搜索词
+    hl (str): 界面语言参数
+
+    返回：
+    str: 例如 https://scholar.google.com/scholar?q=...&hl=zh-CN
+    """
+    base_url = base_url if base_url.endswith("/") else base_url + "/"
+    return urljoin(base_url, "scholar") + "?" + urlencode({"q": query, "hl": hl})
+
+
+def is_captcha_page(url, text, content_type=""):
+    """
+    判断响应是否为验证码或封禁页面
+
+    参数：
+    url (str): 最终响应地址
+    text (str): 响应内容
+    content_type (str): 响应的 Content-Type，不是 HTML 时（例如 .enw 引用内容）只看地址
+
+    返回：
+    bool: 是否为验证码页面
+
+    说明：
+    只根据 /sorry/ 地址和验证表单、reCAPTCHA 控件等元素判断，不匹配文字：
+    结果页会重复搜索词，标题中含有 "unusual traffic" 的论文不能被当成验证码。
+    """
+    if "/sorry/" in url:
+        return True
+    if content_type and "html" not in content_type:
+        return False
+    # 先做一次便宜的子串检查，多数页面不需要再解析
+    if "captcha" not in text:
+        return False
+    return BeautifulSoup(text, "html.parser").select_one(CAPTCHA_SELECTOR) is not None
+
+
+def is_enw_link(href, text=""):
+    """
+    判断链接是否指向 EndNote 格式的引用
+    """
+    return "format=enw" in href or "scholar.enw" in href or "EndNote" in text
+
+
+def citation_format(href, text=""):
+    """
+    判断链接对应的引用格式
+
+    参数：
+    href (str): 链接地址
+    text (str): 链接文字
+
+    返回：
+    str/None: "enw"、"bib"、"ris"、"refworks"，不是引用链接时返回 None
+    """
+    for fmt, (label, patterns) in CITATION_FORMATS.items():
+        if any(pattern in href for pattern in patterns) or label in text:
+            return fmt
+    return None
+
+
+def parse_results(html):
+    """
+    解析搜索结果页
+
+    参数：
+    html (str): 搜索结果页 HTML
+
+    返回：
+    list: 每个结果一个字典，包含 index、title、cid、rp 和 enw_href（结果中直接带有 EndNote 链接时）
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    containers = soup.select("div.gs_r.gs_or") or soup.select("div[data-cid]")
+    results = []
+    for index, container in enumerate(containers):
+        heading = container.select_one(".gs_rt")
+        if heading is None:
+            continue
+        # 去掉 [PDF]、[HTML] 等类型前缀
+        for tag in heading.select("span.gs_ctc, span.gs_ct1, span.gs_ct2"):
+            tag.decompose()
+        enw_href = None
+        for link in container.find_all("a", href=True):
+            if is_enw_link(link["href"], link.get_text()):
+                enw_href = link["href"]
+                break
+        results.append({
+            "index": index,
+            "title": heading.get_text(" ", strip=True),
+            "cid": container.get("data-cid") or container.get("data-aid"),
+            "rp": container.get("data-rp", str(index)),
+            "enw_href": enw_href,
+        })
+    return results
+
+
+def parse_cite_links(html):
+    """
+    解析引用弹窗内容中的各格式链接
+
+    参数：
+    html (str): 引用弹窗 HTML
+
+    返回：
+    dict: 链接文字到链接地址的映射
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    links = {}
+    for link in soup.find_all("a", href=True):
+        label = link.get_text(strip=True)
+        if label:
+            links[label] = link["href"]
+    return links
+
+
+class ScholarHttpBackend:
+    """
+    Google Scholar HTTP 后端
+
+    主要功能：
+    1. 复用 keep-alive 连接池请求搜索结果页
+    2. 解析结果并选出最佳匹配
+    3. 直接获取 EndNote 引用内容，不经过文件下载
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, hl=DEFAULT_HL, timeout=15, session=None, rate=None):
+        """
+        初始化 HTTP 后端
+
+        参数：
+        base_url (str): Scholar 根地址，可指向本地替身服务器
+        hl (str): 界面语言参数
+        timeout (int): 单次请求超时时间（秒）
+        session (requests.Session): 可选的共享会话
+        rate (AdaptiveRateController): 可选的请求速率控制器
+        """
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.hl = hl
+        self.timeout = timeout
+        self.session = session or build_session()
+        self.rate = rate
+
+    def _get(self, url, params=None, paced=True):
+        """
+        发送 GET 请求并检查验证码
+
+        参数：
+        url (str): 请求地址
+        params (dict): 查询参数
+        paced (bool): 是否先向速率控制器申请令牌（同一次引用弹窗的多个格式只申请一次）
+
+        返回：
+        requests.Response: 响应对象
+
+        异常：
+        CaptchaDetected: 遇到验证码或限流时抛出
+        """
+        if self.rate and paced:
+            self.rate.acquire()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if self.rate:
+                self.rate.on_error()
+            raise
+        if response.status_code in (403, 429) or (
+                response.ok and is_captcha_page(response.url, response.text,
+                                                response.headers.get("Content-Type", ""))):
+            if self.rate:
+                self.rate.on_captcha()
+            raise CaptchaDetected(f"HTTP {response.status_code}: {response.url}")
+        response.raise_for_status()
+        if self.rate:
+            self.rate.on_success()
+        return response
+
+    def search_url(self, query):
+        """
+        构造搜索结果页地址
+        """
+        return build_search_url(self.base_url, query, self.hl)
+
+    def search(self, query):
+        """
+        搜索论文并返回解析后的结果列表
+        """
+        response = self._get(self.search_url(query))
+        return parse_results(response.text)
+
+    def find_citation_urls(self, result, formats=("enw",)):
+        """
+        获取某个搜索结果各引用格式的链接
+
+        参数：
+        result (dict): parse_results 返回的单个结果
+        formats (tuple): 需要的格式
+
+        返回：
+        dict: 格式到链接绝对地址的映射，只包含找到的格式
+
+        说明：
+        结果中直接带有 EndNote 链接且只需要 enw 时不请求引用弹窗；
+        其他情况请求一次引用弹窗，所有格式的链接都从中读取
+        """
+        urls = {}
+        if result.get("enw_href") and "enw" in formats:
+            urls["enw"] = urljoin(self.base_url, result["enw_href"])
+        if all(fmt in urls for fmt in formats) or not result.get("cid"):
+            return urls
+        cite_url = urljoin(self.base_url, "scholar") + "?" + urlencode({
+            "q": f"info:{result['cid']}:scholar.google.com/",
+            "output": "cite",
+            "scirp": result["rp"],
+            "hl": self.hl,
+        })
+        links = parse_cite_links(self._get(cite_url).text)
+        for label, href in links.items():
+            fmt = citation_format(href, label)
+            if fmt in formats and fmt not in urls:
+                urls[fmt] = urljoin(self.base_url, href)
+        return urls
+
+    def find_enw_url(self, result):
+        """
+        获取某个搜索结果的 EndNote 链接
+
+        参数：
+        result (dict): parse_results 返回的单个结果
+
+        返回：
+        str/None: EndNote 链接的绝对地址
+        """
+        return self.find_citation_urls(result).get("enw")
+
+    def fetch_text(self, url):
+        """
+        获取引用内容文本
+        """
+        response = self._get(url)
+        response.encoding = response.encoding or "utf-8"
+        return response.text
+
+    def fetch_texts(self, urls, required=("enw",)):
+        """
+        并发获取同一篇论文多个格式的引用内容
+
+        参数：
+        urls (dict): 格式到链接地址的映射
+        required (tuple): 必须成功的格式，其余格式失败时只记录警告
+
+        返回：
+        dict: 格式到引用内容的映射
+
+        说明：
+        这些链接来自同一次引用弹窗，相当于用户的一次操作，只向速率控制器申请一个令牌
+        """
+        if not urls:
+            return {}
+        if self.rate:
+            self.rate.acquire()
+
+        def fetch(url):
+            response = self._get(url, paced=False)
+            response.encoding = response.encoding or "utf-8"
+            return response.text
+
+        texts = {}
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            futures = {fmt: pool.submit(fetch, url) for fmt, url in urls.items()}
+            for fmt, future in futures.items():
+                try:
+                    texts[fmt] = future.result()
+                except (requests.RequestException, CaptchaDetected) as e:
+                    if fmt in required:
+                        raise
+                    logger.warning(f"获取 {fmt} 格式引用失败: {str(e)}")
+        return texts
+
+    def fetch_citation(self, title, matcher, formats=("enw",), query=None):
+        """
+        搜索标题、选出最佳匹配并获取 EndNote 引用内容
+
+        参数：
+        title (str): 论文标题
+        matcher (TitleMatcher): 标题匹配器，其 min_ratio 为接受匹配的最低相似度
+        formats (tuple): 需要的引用格式，enw 总是会获取
+        query (str): 搜索词，默认为标题本身；匹配总是与 title 比较
+
+        返回：
+        dict/None: 包含 matched_title、score、enw 和 formats（格式到内容的映射）的字典；
+                   有搜索结果但没有足够匹配时 enw 为 None；
+                   没有搜索结果（也可能是软封禁）或找不到 EndNote 链接时返回 None
+
+        异常：
+        CaptchaDetected: 遇到验证码时抛出
+        """
+        results = self.search(query or title)
+        if not results:
+            # 空结果页不能当作"没有这篇论文"缓存下来，由调用方重试或改用浏览器
+            print("未找到搜索结果")
+            return None
+
+        candidates = [result["title"] for result in results]
+        best_index, best_ratio, scores = matcher.rank(title, candidates)
+        for candidate, ratio in zip(candidates, scores):
+            print(f"比较: {candidate} (相似度: {ratio:.2f})")
+        best_match = results[best_index] if best_index is not None else None
+
+        if not best_match or best_ratio < matcher.min_ratio:
+            print("未找到匹配度足够高的论文")
+            return {
+                "matched_title": best_match["title"] if best_match else None,
+                "score": best_ratio,
+                "enw": None,
+            }
+
+        urls = self.find_citation_urls(best_match, formats)
+        if "enw" not in urls:
+            print("未找到 EndNote 链接")
+            return None
+
+        texts = self.fetch_texts(urls)
+        return {
+            "matched_title": best_match["title"],
+            "score": best_ratio,
+            "enw": texts["enw"],
+            "formats": texts,
+        }
+
+    def close(self):
+        """
+        关闭连接池
+        """
+        self.session.close()
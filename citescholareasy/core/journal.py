@@ -0,0 +1,146 @@
+"""
+任务日志：记录每篇论文的处理状态，用于中断后恢复
+
+日志为追加写入的 JSON Lines 文件，每次状态变化都会 fsync，
+进程崩溃或被中断时最多丢失正在写入的那一行。
+
+标题按需读取，每读入一批（PENDING_BATCH 篇）就把其中没有记录的论文登记为 pending（一批只 fsync 一次），
+因此中断后能区分“已读入但还没开始”和“还没读到”的论文。
+每篇论文开始处理时记为 searching，浏览器下载完成、尚未整理时记为 downloaded（保存临时文件路径），
+最后记为 renamed 或 failed。使用共享任务队列时待处理状态由队列记录，日志中不登记 pending。
+"""
+import json
+import os
+import threading
+import time
+
+PENDING = "pending"
+SEARCHING = "searching"
+DOWNLOADED = "downloaded"
+RENAMED = "renamed"
+FAILED = "failed"
+
+STATES = (PENDING, SEARCHING, DOWNLOADED, RENAMED, FAILED)
+
+# 每批登记为 pending 的标题数
+PENDING_BATCH = 1000
+
+
+def load_entries(path):
+    """
+    读取日志文件（只读）
+
+    参数：
+    path (str): 日志文件路径
+
+    返回：
+    dict: 标题到最后一条记录的映射
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 崩溃时写了一半的行
+                continue
+            if entry.get("state") not in STATES:
+                # 未知的状态，与没有记录相同
+                continue
+            entries[entry["title"]] = entry
+    return entries
+
+
+class JobJournal:
+    """
+    追加写入的任务日志
+
+    特点：
+    1. 每次状态变化写入一行并 fsync
+    2. 读取时以每个标题的最后一条记录为准
+    3. 忽略崩溃时写了一半的最后一行
+    """
+
+    def __init__(self, path, resume=False):
+        """
+        参数：
+        path (str): 日志文件路径
+        resume (bool): 是否保留已有日志继续记录；为 False 时清空重新开始
+        """
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self.entries = load_entries(self.path) if resume else {}
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def state(self, title):
+        """
+        返回标题的最后状态，没有记录时返回 None
+        """
+        entry = self.entries.get(title)
+        return entry["state"] if entry else None
+
+    def is_complete(self, title):
+        """
+        判断标题是否已经处理完成（已重命名）
+        """
+        return self.state(title) == RENAMED
+
+    def record(self, title, state, **info):
+        """
+        记录一次状态变化
+
+        参数：
+        title (str): 论文标题
+        state (str): 新状态，取值见 STATES
+        **info: 附加信息，例如 path（文件路径）、reason（失败原因）
+        """
+        if state not in STATES:
+            raise ValueError(f"未知的任务状态: {state}")
+        entry = {"title": title, "state": state, "ts": time.time()}
+        entry.update(info)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.entries[title] = entry
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record_many(self, titles, state):
+        """
+        批量记录状态，只 fsync 一次（用于登记刚读入的待处理标题）
+
+        参数：
+        titles (iterable): 论文标题
+        state (str): 新状态
+        """
+        if state not in STATES:
+            raise ValueError(f"未知的任务状态: {state}")
+        now = time.time()
+        with self._lock:
+            for title in titles:
+                entry = {"title": title, "state": state, "ts": now}
+                self.entries[title] = entry
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def summary(self):
+        """
+        统计各状态的标题数量
+
+        返回：
+        dict: 状态到数量的映射
+        """
+        counts = {state: 0 for state in STATES}
+        for entry in self.entries.values():
+            counts[entry["state"]] += 1
+        return counts
+
+    def close(self):
+        """
+        关闭日志文件
+        """
+        with self._lock:
+            self._file.close()
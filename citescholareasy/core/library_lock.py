@@ -0,0 +1,67 @@
+"""
+引用库的进程锁
+
+同一个引用库（以及下载目录）同一时间只能由一个 download 进程使用：任务日志、下载临时目录、
+.worker-N 目录、标题索引的快照和紧凑存储的段文件都假定只有本进程在写入。
+共用任务队列的多个进程需要各自使用不同的引用库目录。
+
+锁由操作系统持有，进程退出（包括崩溃）时自动释放，残留的锁文件不影响下次运行。
+"""
+import os
+import socket
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_NAME = ".lock"
+
+
+def lock_directory(directory):
+    """
+    为目录加进程锁
+
+    参数：
+    directory (str): 引用库或下载目录
+
+    返回：
+    file: 锁文件，关闭即释放锁
+
+    说明：
+    目录已被其他进程使用时抛出 RuntimeError，错误信息中包含持有锁的主机名和进程号。
+    """
+    os.makedirs(directory, exist_ok=True)
+    lock_file = open(os.path.join(directory, LOCK_NAME), 'a+', encoding='utf-8')
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        try:
+            lock_file.seek(0)
+            owner = lock_file.read().strip() or "未知进程"
+        except OSError:
+            # Windows 上被锁定的字节不能读取
+            owner = "未知进程"
+        lock_file.close()
+        raise RuntimeError(f"目录 {directory} 正在被其他进程使用（{owner}）；"
+                           f"多个进程共用任务队列时，每个进程需要使用不同的 --library 目录")
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(f"{socket.gethostname()}:{os.getpid()}")
+    lock_file.flush()
+    return lock_file
+
+
+def unlock(lock_file):
+    """
+    释放 lock_directory 返回的锁
+    """
+    if fcntl is None:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    lock_file.close()
@@ -0,0 +1,184 @@
+"""
+论文标题匹配
+
+先用 core.normalize 规范化标题（NFKC、忽略大小写、去掉 [PDF]/[HTML] 等前缀和中英文标点），
+再用字符二元组的 Dice 系数打分。打分与标题长度成线性关系，
+对没有空格分词的中文标题同样有效；规范化后完全相同时直接返回 1.0。
+
+Dice 系数对只差一个编号的标题打分很高（"...: Part 1" 与 "...: Part 2" 约 0.97），
+判断引用库中是否已有同一篇论文时还要用 same_work 比较编号、年份等区分续作和版本的标记。
+"""
+import re
+from functools import lru_cache
+
+from citescholareasy.core.normalize import normalize_many, normalize_title
+
+
+def _bigrams(normalized):
+    """
+    规范化标题（去掉空格后）的字符二元组集合
+    """
+    compact = normalized.replace(" ", "")
+    if len(compact) < 2:
+        return frozenset([compact]) if compact else frozenset()
+    return frozenset(compact[i:i + 2] for i in range(len(compact) - 1))
+
+
+@lru_cache(maxsize=65536)
+def _profile(title):
+    """
+    计算标题的比较特征：规范化文本和字符二元组集合
+    """
+    normalized = normalize_title(title)
+    return normalized, _bigrams(normalized)
+
+
+# 紧跟在这些词后面的词是同一系列中不同论文的编号（Part I、Volume A、Chapter one）
+SERIES_WORDS = frozenset(("part", "vol", "volume", "book", "chapter", "edition", "section", "phase"))
+# 中文标题的分册标记：（上）（中）（下）单独成词，第一部分、第二卷中的"第X"
+CJK_VOLUME_WORDS = frozenset(("上", "中", "下"))
+_NUMBER_RE = re.compile(r"\d+")
+_CJK_ORDINAL_RE = re.compile(r"第[一二三四五六七八九十百]+")
+
+
+@lru_cache(maxsize=65536)
+def edition_marks(title):
+    """
+    提取标题中区分续作、分册和版本的标记
+
+    参数：
+    title (str): 原始标题
+
+    返回：
+    tuple: 排好序的标记：全部数字（卷号、年份、版本号，去掉前导零）、
+           part/volume 等词后面的编号、中文的"第X"和单独的上/中/下
+    """
+    normalized = normalize_title(title)
+    words = normalized.split()
+    marks = [str(int(number)) for number in _NUMBER_RE.findall(normalized)]
+    marks += [word for previous, word in zip(words, words[1:])
+              if previous in SERIES_WORDS and not _NUMBER_RE.search(word)]
+    marks += _CJK_ORDINAL_RE.findall(normalized)
+    marks += [word for word in words if word in CJK_VOLUME_WORDS]
+    return tuple(sorted(marks))
+
+
+def _dice(grams1, grams2):
+    if not grams1 or not grams2:
+        return 0.0
+    return 2.0 * len(grams1 & grams2) / (len(grams1) + len(grams2))
+
+
+class TitleMatcher:
+    """
+    标题匹配器
+
+    主要功能：
+    1. score：两个标题的相似度（0-1）
+    2. score_many：一次为全部候选打分
+    3. best_match：选出最佳候选，遇到规范化后完全相同的标题时提前结束
+    """
+
+    def __init__(self, min_ratio=0.5):
+        """
+        参数：
+        min_ratio (float): best_match 接受匹配的最低相似度
+        """
+        self.min_ratio = min_ratio
+
+    def grams(self, title):
+        """
+        返回标题规范化后的字符二元组集合，供倒排索引使用
+        """
+        return _profile(title)[1]
+
+    def grams_many(self, titles):
+        """
+        批量计算字符二元组集合（建立索引时使用，不占用逐个标题的 LRU 缓存）
+
+        返回：
+        list: 与 titles 顺序一致的二元组集合
+        """
+        return [_bigrams(normalized) for normalized in normalize_many(titles)]
+
+    def score(self, title1, title2):
+        """
+        计算两个标题的相似度
+
+        返回：
+        float: 相似度（0-1 之间的浮点数）
+        """
+        normalized1, grams1 = _profile(title1)
+        normalized2, grams2 = _profile(title2)
+        if normalized1 == normalized2:
+            return 1.0 if normalized1 else 0.0
+        return _dice(grams1, grams2)
+
+    def same_work(self, title1, title2):
+        """
+        两个相似的标题是否可能是同一篇论文：编号、年份等标记必须完全一致，
+        续作（Part 1 / Part 2）、不同年份的报告和不同版本不会被当成同一篇
+
+        返回：
+        bool: 标记是否一致
+        """
+        return edition_marks(title1) == edition_marks(title2)
+
+    def score_many(self, query, candidates):
+        """
+        为所有候选标题打分
+
+        参数：
+        query (str): 搜索标题
+        candidates (list): 候选标题列表
+
+        返回：
+        list: 与 candidates 顺序一致的相似度列表
+        """
+        normalized, grams = _profile(query)
+        scores = []
+        for candidate in candidates:
+            candidate_normalized, candidate_grams = _profile(candidate)
+            if candidate_normalized == normalized:
+                scores.append(1.0 if normalized else 0.0)
+            else:
+                scores.append(_dice(grams, candidate_grams))
+        return scores
+
+    def rank(self, query, candidates):
+        """
+        为所有候选打分并选出最佳候选（需要展示每个候选得分时使用）
+
+        返回：
+        tuple: (最佳候选下标, 最高相似度, 全部相似度列表)；没有候选时下标为 None
+        """
+        scores = self.score_many(query, candidates)
+        if not scores:
+            return None, 0.0, scores
+        best_index = max(range(len(scores)), key=scores.__getitem__)
+        return best_index, scores[best_index], scores
+
+    def best_match(self, query, candidates):
+        """
+        选出与搜索标题最相似的候选
+
+        参数：
+        query (str): 搜索标题
+        candidates (list): 候选标题列表
+
+        返回：
+        tuple: (候选下标, 相似度)；没有候选时下标为 None
+        """
+        normalized, grams = _profile(query)
+        best_index, best_score = None, 0.0
+        for index, candidate in enumerate(candidates):
+            candidate_normalized, candidate_grams = _profile(candidate)
+            if normalized and candidate_normalized == normalized:
+                return index, 1.0
+            score = _dice(grams, candidate_grams)
+            if best_index is None or score > best_score:
+                best_index, best_score = index, score
+        return best_index, best_score
+
+
+default_matcher = TitleMatcher()
@@ -0,0 +1,249 @@
+"""
+分阶段计时与运行指标
+
+记录每篇论文在各个阶段（浏览器启动、打开首页、提交搜索、提取结果、匹配、点击引用、
+等待 ENW 下载、重命名）的耗时，以及重试、验证码、未匹配等计数。
+运行结束时打印各阶段的 p50/p95，并可导出为 JSON 文件或 Prometheus 文本文件。
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# 浏览器流程的阶段，按发生顺序排列
+STAGES = (
+    "driver_init",   # 启动或连接浏览器
+    "homepage",      # 打开首页并检查验证码
+    "search",        # 输入并提交搜索
+    "extract",       # 提取搜索结果
+    "match",         # 标题匹配
+    "cite_click",    # 点击引用按钮并查找 EndNote 链接
+    "enw_wait",      # 点击 EndNote 链接并等待下载完成
+    "rename",        # 重命名并写入缓存
+)
+# 其他阶段：请求速率等待、HTTP 后端获取引用（含其中的速率等待）、
+# 通过共享会话获取 ENW（混合模式）和其他引用格式（在后处理线程中）、查询缓存、查询引用库标题索引、
+# 节奏配置安排的刻意停顿（不计入所在的阶段）
+EXTRA_STAGES = ("rate_wait", "http_fetch", "enw_fetch", "formats_fetch", "cache_lookup", "index_lookup", "pacing")
+
+PROMETHEUS_PREFIX = "citescholareasy"
+
+
+def percentile(values, q):
+    """
+    计算百分位数（线性插值）
+
+    参数：
+    values (list): 数值列表
+    q (float): 0 到 1 之间的分位
+
+    返回：
+    float/None: 百分位数，列表为空时返回 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class RunMetrics:
+    """
+    线程安全的运行指标，可在多个工作线程间共享
+
+    用法：
+        metrics.begin_title(title)
+        with metrics.stage("homepage"):
+            ...
+        metrics.count("captchas")
+        metrics.end_title("ok", source="browser")
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(list)   # 阶段 -> 每次耗时（秒）
+        self.counters = defaultdict(int)     # 计数器名称 -> 次数
+        self.titles = []                     # 每篇论文的记录
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin_title(self, title):
+        """
+        开始记录一篇论文，之后的阶段耗时都归到这篇论文
+        """
+        self._local.current = {"title": title, "stages": {}, "start": time.perf_counter()}
+
+    def detach_title(self):
+        """
+        把当前论文的记录从本线程取出，交给后处理线程继续记录
+
+        返回：
+        dict/None: 论文记录，传给 attach_title
+        """
+        current = getattr(self._local, "current", None)
+        self._local.current = None
+        return current
+
+    def attach_title(self, record):
+        """
+        在本线程继续记录 detach_title 取出的论文
+        """
+        self._local.current = record
+
+    def end_title(self, outcome, source=None):
+        """
+        结束当前论文的记录
+
+        参数：
+        outcome (str): 处理结果，例如 "ok"、"failed"
+        source (str): 处理来源（cache、library、journal、http、browser）
+        """
+        current = getattr(self._local, "current", None)
+        if current is None:
+            return
+        self._local.current = None
+        record = {
+            "title": current["title"],
+            "outcome": outcome,
+            "source": source,
+            "seconds": round(time.perf_counter() - current["start"], 4),
+            "stages": {name: round(value, 4) for name, value in current["stages"].items()},
+        }
+        with self._lock:
+            self.titles.append(record)
+            self.counters[f"titles_{outcome}"] += 1
+
+    def observe(self, name, seconds):
+        """
+        记录一次阶段耗时
+
+        参数：
+        name (str): 阶段名称
+        seconds (float): 耗时（秒）
+        """
+        with self._lock:
+            self.durations[name].append(seconds)
+        current = getattr(self._local, "current", None)
+        if current is not None:
+            # 重试时同一阶段会出现多次，按论文累计
+            current["stages"][name] = current["stages"].get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """
+        计时上下文，离开时（包括异常和 continue）记录耗时
+
+        嵌套的阶段（例如阶段内的请求速率等待）单独记录，不计入外层阶段
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.observe(name, elapsed - nested)
+
+    def count(self, name, n=1):
+        """
+        增加计数器，例如 retries、captchas、no_match
+        """
+        with self._lock:
+            self.counters[name] += n
+
+    def summary(self):
+        """
+        汇总各阶段的耗时分布和计数器
+
+        返回：
+        dict: 可直接序列化为 JSON 的汇总
+        """
+        with self._lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+            counters = dict(self.counters)
+            titles = list(self.titles)
+        order = [name for name in STAGES + EXTRA_STAGES if name in durations]
+        order += sorted(name for name in durations if name not in order)
+        stages = {}
+        for name in order:
+            values = durations[name]
+            stages[name] = {
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": max(values),
+            }
+        return {
+            "started_at": self.start_time,
+            "elapsed": time.time() - self.start_time,
+            "stages": stages,
+            "counters": counters,
+            "titles": titles,
+        }
+
+    def print_summary(self):
+        """
+        打印各阶段的耗时分布
+        """
+        summary = self.summary()
+        if not summary["stages"]:
+            return
+        print(f"\n{'阶段':<14}{'次数':>6}{'p50(秒)':>10}{'p95(秒)':>10}{'合计(秒)':>10}")
+        for name, stage in summary["stages"].items():
+            print(f"{name:<14}{stage['count']:>6}{stage['p50']:>10.2f}{stage['p95']:>10.2f}{stage['total']:>10.1f}")
+        pacing = summary["stages"].get("pacing")
+        busy = sum(record["seconds"] for record in summary["titles"])
+        if pacing and busy:
+            print(f"刻意停顿 {pacing['total']:.1f} 秒，占论文处理时间的 {pacing['total'] / busy:.0%}，"
+                  f"其余 {busy - pacing['total']:.1f} 秒为实际工作和请求速率等待")
+        if summary["counters"]:
+            print("计数: " + "，".join(f"{name} {value}" for name, value in sorted(summary["counters"].items())))
+
+    def write_json(self, path):
+        """
+        把汇总和每篇论文的记录写入 JSON 文件
+        """
+        self._write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """
+        写入 Prometheus textfile collector 格式的指标文件
+        """
+        summary = self.summary()
+        stage_metric = f"{PROMETHEUS_PREFIX}_stage_duration_seconds"
+        event_metric = f"{PROMETHEUS_PREFIX}_events_total"
+        lines = [
+            f"# HELP {stage_metric} Duration of each download stage.",
+            f"# TYPE {stage_metric} summary",
+        ]
+        for name, stage in summary["stages"].items():
+            for quantile in ("p50", "p95"):
+                lines.append(f'{stage_metric}{{stage="{name}",quantile="0.{quantile[1:]}"}} {stage[quantile]:.6f}')
+            lines.append(f'{stage_metric}_sum{{stage="{name}"}} {stage["total"]:.6f}')
+            lines.append(f'{stage_metric}_count{{stage="{name}"}} {stage["count"]}')
+        lines += [
+            f"# HELP {event_metric} Retries, captchas, no-match outcomes and per-title results.",
+            f"# TYPE {event_metric} counter",
+        ]
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f'{event_metric}{{event="{name}"}} {value}')
+        self._write_atomic(path, "\n".join(lines) + "\n")
+
+    def _write_atomic(self, path, text):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 先写临时文件再替换，避免采集程序读到写了一半的文件
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
@@ -0,0 +1,180 @@
+"""
+标题规范化
+
+缓存键、标题匹配、输入去重、搜索词和文件名都从这里取规范化结果，保证彼此一致：
+1. NFKC：全角字母数字和全角空格折叠为半角，兼容字符（如连字 ﬁ）展开
+2. 中日韩标点折叠为对应的 ASCII 标点（NFKC 不处理 。、「」《》 等）
+3. 比较用的形式再去掉 [PDF]/[HTML] 等前缀、忽略大小写、标点视为分隔符；
+   紧跟在单词后的 + 和 # 保留（C++、C#、F# 与 C、F 是不同的论文）
+
+字符替换都使用预先编译的正则，纯 ASCII 的标题跳过 NFKC 和中日韩标点的处理。
+批量运行中的标题几乎不重复，只有匹配时反复比较的 normalize_title 和 fold 带 LRU 缓存；
+搜索词和文件名每个标题只生成一两次，缓存未命中的开销比重新计算还大，不加缓存。
+normalize_many 批量处理时绕过缓存，不会挤掉常用的标题（例如载入标题索引快照时）。
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# 全角 ASCII 字符和全角空格：中文标题中最常见的非 NFKC 字符（：，（）等），
+# 先用正则换成半角，多数标题就不必再做一次完整的 NFKC（unicodedata.normalize 比正则替换慢得多）
+FULLWIDTH = {chr(code): chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)}
+FULLWIDTH["\u3000"] = " "
+_FULLWIDTH_RE = re.compile("[\uff01-\uff5e\u3000]")
+
+# 中日韩标点到 ASCII 标点的折叠（全角 ASCII 标点已由 NFKC 处理）
+CJK_PUNCTUATION = {
+    "。": ".", "、": ",", "〃": '"', "「": '"', "」": '"', "『": '"', "』": '"',
+    "《": '"', "》": '"', "〈": "<", "〉": ">", "【": "[", "】": "]", "〔": "(", "〕": ")",
+    "〖": "[", "〗": "]", "“": '"', "”": '"', "‘": "'", "’": "'", "—": "-", "–": "-",
+    "‐": "-", "‑": "-", "―": "-", "…": "...", "·": " ", "・": " ", "〜": "~",
+}
+# 只在出现这些标点时才替换，多数标题不含
+_CJK_RE = re.compile("[" + "".join(CJK_PUNCTUATION) + "]")
+
+# Google Scholar 在 gs_rt 中加入的类型前缀
+_PREFIX_RE = re.compile(
+    r"^\s*(?:\[(?:pdf|html|book|b|citation|c|doc|ps|引用|图书|書籍)\]\s*)+",
+    re.IGNORECASE,
+)
+# 比较用的词：字母、数字和中日韩文字（\w 去掉下划线），带上紧跟的 + 和 #；其余字符都是分隔符
+_WORD_RE = re.compile(r"[^\W_]+[+#]*")
+# 纯 ASCII 字符串中与 _WORD_RE 等价，字符类更简单，匹配更快
+_ASCII_WORD_RE = re.compile(r"[A-Za-z0-9]+[+#]*")
+
+# 生成搜索词时不拆开连字符的术语，可通过 search_query 的参数替换
+PROTECTED_TERMS = ("GPT-3", "BERT", "T5", "XL-Net")
+# 搜索词中替换为空格的字符（str.translate 处理非 ASCII 字符串很慢，这里用正则）；
+# 双引号也替换掉，否则标题中的引号（包括折叠后的《》“”「」）会把外层的精确匹配引号拆成几段
+_QUERY_RE = re.compile(r'[:()\[\]{}/\\"]')
+
+# 文件名中不允许出现的字符（Windows 最严格）
+_FILENAME_RE = re.compile(r'[<>:"/\\|?*]')
+MAX_FILENAME_LENGTH = 200
+
+CACHE_SIZE = 65536
+
+
+def _nfkc(text):
+    # ASCII 字符串总是 NFKC 形式；大多数其他标题也已经是 NFKC 形式，检查比规范化快一个数量级。
+    # 不是时先折叠全角字符，通常这样就够了；全角字符的兼容分解就是对应的半角字符，结果与直接 NFKC 相同
+    if text.isascii() or unicodedata.is_normalized("NFKC", text):
+        return text
+    text = _FULLWIDTH_RE.sub(lambda match: FULLWIDTH[match.group()], text)
+    return text if unicodedata.is_normalized("NFKC", text) else unicodedata.normalize("NFKC", text)
+
+
+def _fold_punctuation(text):
+    # NFKC 之后折叠中日韩标点，不合并空白
+    if text.isascii():
+        return text
+    text = _nfkc(text)
+    if _CJK_RE.search(text):
+        text = _CJK_RE.sub(lambda match: CJK_PUNCTUATION[match.group()], text)
+    return text
+
+
+def _fold(text):
+    return " ".join(_fold_punctuation(text).split())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fold(text):
+    """
+    NFKC 规范化并折叠中日韩标点，保留大小写，合并空白
+
+    参数：
+    text (str): 原始文本
+
+    返回：
+    str: 折叠后的文本
+    """
+    return _fold(text)
+
+
+def _normalize(title):
+    if title.isascii():
+        if "[" in title:
+            title = _PREFIX_RE.sub("", title)
+        return " ".join(_ASCII_WORD_RE.findall(title.lower()))
+    title = _nfkc(title)
+    if "[" in title:
+        title = _PREFIX_RE.sub("", title)
+    # 中日韩标点和其他标点一样都成为分隔符，这里不需要先折叠
+    return " ".join(_WORD_RE.findall(title.casefold()))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_title(title):
+    """
+    规范化标题用于比较和作为缓存键
+
+    参数：
+    title (str): 原始标题
+
+    返回：
+    str: 规范化后的标题（小写、单个空格分隔，除词尾的 + 和 # 外不含标点）
+    """
+    return _normalize(title)
+
+
+def normalize_many(titles):
+    """
+    批量规范化标题，结果与逐个调用 normalize_title 相同
+
+    参数：
+    titles (iterable): 原始标题
+
+    返回：
+    list: 与输入顺序一致的规范化标题
+
+    说明：
+    不经过 LRU 缓存，一次性处理大量只用一次的标题时不会挤掉常用的标题。
+    （把整批标题拼成一个字符串再做一次正则替换并不更快，正则本身是主要开销）
+    """
+    return [_normalize(title) for title in titles]
+
+
+def search_query(title, protected_terms=PROTECTED_TERMS):
+    """
+    生成精确匹配的搜索词
+
+    参数：
+    title (str): 原始论文标题
+    protected_terms (tuple): 保留连字符的术语（也可以是列表或集合）
+
+    返回：
+    str: 加引号的搜索词
+
+    特点：
+    1. 保留特殊术语（如 GPT-3、XL-Net）中的连字符
+    2. 冒号、括号、斜杠、引号（包括《》“”「」）等替换为空格，其余连字符拆开
+    3. 添加引号实现精确匹配
+    """
+    text = _QUERY_RE.sub(" ", _fold_punctuation(title))
+    if "-" not in text:
+        return '"' + " ".join(text.split()) + '"'
+    words = text.split()
+    return '"' + " ".join(word if word in protected_terms else word.replace("-", " ") for word in words) + '"'
+
+
+def sanitize_filename(filename):
+    """
+    清理文件名，移除非法字符
+
+    参数：
+    filename (str): 原始文件名
+
+    返回：
+    str: 处理后的合法文件名
+
+    处理内容：
+    1. NFKC 规范化（全角字符与标题比较时的形式一致）
+    2. 替换非法字符
+    3. 移除首尾空格和点号
+    4. 限制文件名长度
+    """
+    filename = _FILENAME_RE.sub("_", _nfkc(filename)).strip(". ")
+    if len(filename) > MAX_FILENAME_LENGTH:
+        filename = filename[:MAX_FILENAME_LENGTH - 3] + "..."
+    return filename
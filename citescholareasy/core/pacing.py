@@ -0,0 +1,213 @@
+"""
+交互节奏控制
+
+浏览器流程中所有刻意的停顿（模拟输入、分步滚动、点击前的停顿、验证后的等待）都由 Pacer 统一安排：
+1. 按名称选择节奏配置：fast 不做任何刻意停顿，balanced 只在关键操作前短暂停顿，
+   stealth 逐字输入（偶尔打错再删除）并分步滚动
+2. 每篇论文有刻意停顿的时间预算，用完后其余停顿全部跳过，输入改为一次性填写
+3. 停顿计入运行指标的 pacing 阶段（嵌套在其他阶段中时不计入外层阶段），
+   运行结束时可以看到刻意停顿与实际工作各占多少时间
+
+请求之间的间隔由 AdaptiveRateController 控制，不属于这里的刻意停顿；
+提交搜索前的停顿发生在等待请求令牌之前，令牌在停顿期间照常积累，限速时这段停顿基本不增加总耗时。
+"""
+import random
+import time
+
+# 每个配置：budget 为每篇论文刻意停顿的上限（秒）；typing 为逐字输入时每个字符的停顿范围，
+# None 表示直接填写输入框；scroll_steps 为分步滚动的步数范围，None 表示不滚动；
+# pauses 为各个操作前的停顿范围，未列出的操作不停顿
+PACING_PROFILES = {
+    "fast": {
+        "budget": 0.0,
+        "typing": None,
+        "punctuation": None,
+        "typo_rate": 0.0,
+        "scroll_steps": None,
+        "scroll_pause": None,
+        "pauses": {},
+    },
+    "balanced": {
+        "budget": 3.0,
+        "typing": None,
+        "punctuation": None,
+        "typo_rate": 0.0,
+        "scroll_steps": (2, 3),
+        "scroll_pause": (0.05, 0.15),
+        "pauses": {
+            "before_search": (0.3, 0.8),
+            "before_cite": (0.2, 0.6),
+            "before_endnote": (0.1, 0.3),
+            "click": (0.05, 0.15),
+            "after_captcha": (1.0, 2.0),
+        },
+    },
+    "stealth": {
+        "budget": 20.0,
+        "typing": (0.05, 0.2),
+        "punctuation": (0.2, 0.5),
+        "typo_rate": 0.03,
+        "scroll_steps": (5, 10),
+        "scroll_pause": (0.1, 0.3),
+        "pauses": {
+            "before_search": (0.5, 1.5),
+            "before_cite": (0.5, 1.5),
+            "before_endnote": (0.3, 0.8),
+            "click": (0.1, 0.3),
+            "after_captcha": (2.0, 3.0),
+        },
+    },
+}
+
+DEFAULT_PACING = "fast"
+
+# 逐字输入时视为标点、停顿较长的字符
+PUNCTUATION = " .,:;，。：；、"
+TYPO_KEYS = "qwertyuiopasdfghjklzxcvbnm"
+
+# 与 selenium 的 Keys.BACKSPACE 相同，不在这里导入 selenium
+BACKSPACE = "\ue003"
+
+
+class Pacer:
+    """
+    按节奏配置安排刻意停顿，每个下载器（每个浏览器线程）一个实例
+
+    用法：
+        pacer.begin_title()
+        pacer.type_text(driver, search_box, title)
+        pacer.pause("before_search")
+    """
+
+    def __init__(self, profile=DEFAULT_PACING, budget=None, metrics=None):
+        """
+        参数：
+        profile (str): 节奏配置名称，取值见 PACING_PROFILES
+        budget (float): 每篇论文刻意停顿的上限（秒），默认使用配置中的值
+        metrics (RunMetrics): 记录 pacing 阶段的运行指标，None 表示不记录
+        """
+        if profile not in PACING_PROFILES:
+            raise ValueError(f"不支持的节奏配置: {profile}，可选: {', '.join(PACING_PROFILES)}")
+        self.profile = profile
+        self.settings = PACING_PROFILES[profile]
+        self.budget = self.settings["budget"] if budget is None else budget
+        self.metrics = metrics
+        self.spent = 0.0
+
+    def begin_title(self):
+        """
+        开始一篇新论文，重置刻意停顿的预算
+        """
+        self.spent = 0.0
+
+    @property
+    def remaining(self):
+        """
+        本篇论文剩余的刻意停顿预算（秒）
+        """
+        return max(self.budget - self.spent, 0.0)
+
+    def sleep(self, seconds):
+        """
+        刻意停顿，超出预算的部分跳过
+
+        参数：
+        seconds (float): 期望的停顿时间（秒）
+
+        返回：
+        float: 实际停顿的时间（秒）
+        """
+        seconds = min(seconds, self.remaining)
+        if seconds <= 0:
+            return 0.0
+        self.spent += seconds
+        if self.metrics is None:
+            time.sleep(seconds)
+        else:
+            with self.metrics.stage("pacing"):
+                time.sleep(seconds)
+        return seconds
+
+    def sleep_between(self, low, high):
+        """
+        在 low 到 high 秒之间随机停顿，超出预算的部分跳过
+        """
+        return self.sleep(random.uniform(low, high))
+
+    def pause(self, name):
+        """
+        执行名为 name 的操作前停顿，当前配置没有定义这个操作时不停顿
+
+        参数：
+        name (str): 操作名称，例如 before_search、before_cite、before_endnote、click、after_captcha
+        """
+        span = self.settings["pauses"].get(name)
+        return self.sleep_between(*span) if span else 0.0
+
+    def type_text(self, driver, element, text):
+        """
+        填写输入框：配置要求逐字输入且预算足够时模拟人类输入，否则一次性填写
+
+        参数：
+        driver (WebDriver): 浏览器驱动
+        element (WebElement): 输入框
+        text (str): 要输入的文字
+        """
+        element.clear()
+        typing = self.settings["typing"]
+        if typing and self._typing_estimate(text) <= self.remaining:
+            self.type_keys(element, text)
+        else:
+            driver.execute_script("arguments[0].value = arguments[1];", element, text)
+
+    def type_keys(self, element, text):
+        """
+        逐字输入：随机的输入速度，偶尔打错再删除，标点后停顿较长；
+        预算用完后剩余的文字一次输入
+
+        参数：
+        element (WebElement): 输入框
+        text (str): 要输入的文字
+        """
+        typing = self.settings["typing"] or (0.1, 0.4)
+        punctuation = self.settings["punctuation"] or typing
+        for position, char in enumerate(text):
+            if self.remaining <= 0:
+                element.send_keys(text[position:])
+                return
+            if random.random() < self.settings["typo_rate"]:
+                element.send_keys(random.choice(TYPO_KEYS))
+                self.sleep_between(*typing)
+                element.send_keys(BACKSPACE)
+                self.sleep_between(*typing)
+            element.send_keys(char)
+            self.sleep_between(*(punctuation if char in PUNCTUATION else typing))
+
+    def _typing_estimate(self, text):
+        typing = self.settings["typing"]
+        punctuation = self.settings["punctuation"] or typing
+        marks = sum(1 for char in text if char in PUNCTUATION)
+        per_char = (sum(typing) / 2) * (1 + 2 * self.settings["typo_rate"])
+        return (len(text) - marks) * per_char + marks * sum(punctuation) / 2
+
+    def scroll_to(self, driver, target_y):
+        """
+        分步滚动到页面上的纵坐标 target_y（带随机偏移），配置不要求滚动时直接返回
+
+        参数：
+        driver (WebDriver): 浏览器驱动
+        target_y (float): 目标位置的纵坐标（像素）
+        """
+        steps = self.settings["scroll_steps"]
+        if not steps or target_y is None or self.remaining <= 0:
+            return
+        current = driver.execute_script("return window.pageYOffset;") or 0
+        target = target_y + random.randint(-100, 100)
+        count = random.randint(*steps)
+        for i in range(count):
+            position = current + (target - current) * (i + 1) / count
+            driver.execute_script(f"window.scrollTo(0, {position});")
+            if not self.sleep_between(*self.settings["scroll_pause"]):
+                # 预算用完，直接滚动到目标位置
+                driver.execute_script(f"window.scrollTo(0, {target});")
+                return
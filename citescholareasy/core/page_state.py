@@ -0,0 +1,192 @@
+"""
+页面状态探测
+
+用一次很小的 execute_script 判断当前页面是搜索结果、验证码、sorry 封禁页还是首页，
+只返回几个字段，不再通过 driver.page_source 把整个 DOM 传回来。
+RESULTS_SCRIPT 同样一次读出全部搜索结果的标题、引用 id 和链接，匹配只在 Python 中处理这些数据，
+不再为每个结果分别调用 find_element；ENDNOTE_LINK_SCRIPT 和 CITE_LINKS_SCRIPT 一次读出引用弹窗中的链接。
+"""
+
+RESULTS = "results"
+CAPTCHA = "captcha"
+SORRY = "sorry"
+HOMEPAGE = "homepage"
+UNKNOWN = "unknown"
+
+# 验证码页面的结构特征：Scholar 的验证表单、reCAPTCHA 控件或其 iframe，HTTP 后端检查响应时也使用。
+# 只按元素判断，不匹配页面文字：结果页的标题栏和搜索框会重复搜索词，
+# 标题中含有 "unusual traffic"、"recaptcha" 等字样的论文不能被当成验证码
+CAPTCHA_SELECTOR = "#gs_captcha_f, .g-recaptcha, iframe[src*='recaptcha']"
+
+# 图片验证的 iframe，未弹出图片验证时它处于隐藏状态
+IMAGE_CHALLENGE_SELECTOR = "iframe[src*='recaptcha/api2/bframe'], iframe[title*='challenge']"
+
+RESULT_SELECTOR = ".gs_ri, div.gs_r.gs_or.gs_scl, div[data-aid]"
+
+# 在浏览器中完成判断，只返回一个小对象
+PROBE_SCRIPT = """
+var captchaSelector = arguments[0], challengeSelector = arguments[1], resultSelector = arguments[2];
+var challenge = document.querySelector(challengeSelector);
+return {
+    url: location.href,
+    title: document.title,
+    results: document.querySelectorAll(resultSelector).length,
+    search_box: !!document.querySelector("input[name='q']"),
+    captcha: !!document.querySelector(captchaSelector),
+    image_challenge: !!challenge && getComputedStyle(challenge).visibility === "visible"
+};
+"""
+
+
+# 依次尝试的搜索结果选择器，使用第一个有结果的
+RESULT_SELECTORS = (".gs_ri", "div.gs_r.gs_or.gs_scl", "div[data-aid]", "div.gs_or")
+
+# 在结果中查找引用按钮，依次尝试类名、onclick 和按钮文字
+_FIND_CITE = """
+function findCite(box) {
+    var cite = box.querySelector(".gs_or_cit, a[onclick*='gs_ocit']");
+    if (cite) { return cite; }
+    var links = box.querySelectorAll("a");
+    for (var i = 0; i < links.length; i++) {
+        var text = links[i].textContent.trim();
+        if (text === "Cite" || text === "引用") { return links[i]; }
+    }
+    return null;
+}
+"""
+
+# 一次读出全部搜索结果：[{index, title, cid, rp, enw, cite, top}, ...]，top 为结果在页面上的纵坐标（分步滚动用）
+# index 为结果在所用选择器中的序号，之后只有选中的结果需要再次访问页面元素（CLICK_CITE_SCRIPT）
+RESULTS_SCRIPT = _FIND_CITE + """
+var selectors = arguments[0];
+for (var s = 0; s < selectors.length; s++) {
+    var nodes = document.querySelectorAll(selectors[s]);
+    if (!nodes.length) { continue; }
+    var results = [];
+    for (var i = 0; i < nodes.length; i++) {
+        var heading = nodes[i].querySelector(".gs_rt");
+        if (!heading) { continue; }
+        var box = nodes[i].closest("[data-cid]") || nodes[i];
+        var enw = null;
+        var links = box.querySelectorAll("a[href]");
+        for (var j = 0; j < links.length; j++) {
+            if (/format=enw|scholar\\.enw/.test(links[j].href) || links[j].textContent.indexOf("EndNote") !== -1) {
+                enw = links[j].href;
+                break;
+            }
+        }
+        var cite = findCite(box);
+        var match = cite && /gs_ocit\\(event,\\s*'([^']*)',\\s*'([^']*)'/.exec(cite.getAttribute("onclick") || "");
+        results.push({
+            index: i,
+            title: (heading.innerText || heading.textContent).trim(),
+            cid: box.getAttribute("data-cid") || (match && match[1]) || null,
+            rp: box.getAttribute("data-rp") || (match && match[2]) || "0",
+            enw: enw,
+            cite: !!cite,
+            top: Math.round(box.getBoundingClientRect().top + window.pageYOffset)
+        });
+    }
+    return {selector: selectors[s], results: results};
+}
+return null;
+"""
+
+# 点击 RESULTS_SCRIPT 返回的某个结果中的引用按钮，找不到时返回 false
+CLICK_CITE_SCRIPT = _FIND_CITE + """
+var node = document.querySelectorAll(arguments[0])[arguments[1]];
+var cite = node && findCite(node.closest("[data-cid]") || node);
+if (!cite) { return false; }
+cite.scrollIntoView({block: "center"});
+cite.click();
+return true;
+"""
+
+# 在已打开的引用弹窗中查找 EndNote 链接（按地址或文字），返回链接元素，弹窗尚未加载时返回 null
+ENDNOTE_LINK_SCRIPT = """
+var links = document.querySelectorAll("#gs_citi a[href], #gs_cit a[href]");
+for (var i = 0; i < links.length; i++) {
+    if (/format=enw|scholar\\.enw/.test(links[i].href) || links[i].textContent.indexOf("EndNote") !== -1) {
+        return links[i];
+    }
+}
+return null;
+"""
+
+# 读取已打开的引用弹窗中全部格式的链接：[[地址, 文字], ...]
+CITE_LINKS_SCRIPT = """
+var links = document.querySelectorAll("#gs_citi a[href], #gs_cit a[href]");
+var found = [];
+for (var i = 0; i < links.length; i++) {
+    found.push([links[i].href, links[i].textContent]);
+}
+return found;
+"""
+
+
+class PageState:
+    """
+    一次探测的结果
+
+    属性：
+    state (str): RESULTS / CAPTCHA / SORRY / HOMEPAGE / UNKNOWN
+    url (str): 当前地址
+    title (str): 页面标题
+    results (int): 搜索结果数量
+    image_challenge (bool): 是否出现图片验证
+    """
+
+    def __init__(self, state, url="", title="", results=0, image_challenge=False):
+        self.state = state
+        self.url = url
+        self.title = title
+        self.results = results
+        self.image_challenge = image_challenge
+
+    @property
+    def blocked(self):
+        """是否需要人工验证"""
+        return self.state in (CAPTCHA, SORRY)
+
+    def __repr__(self):
+        return (f"PageState({self.state}, results={self.results}, "
+                f"title={self.title!r}, url={self.url!r})")
+
+
+def classify(info):
+    """
+    根据探测脚本返回的字段判断页面状态
+
+    参数：
+    info (dict): PROBE_SCRIPT 的返回值
+
+    返回：
+    PageState: 页面状态
+    """
+    url = info.get("url") or ""
+    if "/sorry/" in url:
+        state = SORRY
+    elif info.get("captcha"):
+        state = CAPTCHA
+    elif info.get("results"):
+        state = RESULTS
+    elif info.get("search_box"):
+        state = HOMEPAGE
+    else:
+        state = UNKNOWN
+    return PageState(state, url, info.get("title") or "", info.get("results") or 0,
+                     bool(info.get("image_challenge")))
+
+
+def probe_page(driver):
+    """
+    探测浏览器当前页面的状态
+
+    参数：
+    driver (WebDriver): 浏览器驱动
+
+    返回：
+    PageState: 页面状态
+    """
+    info = driver.execute_script(PROBE_SCRIPT, CAPTCHA_SELECTOR, IMAGE_CHALLENGE_SELECTOR, RESULT_SELECTOR)
+    return classify(info or {})
@@ -0,0 +1,81 @@
+"""
+下载后处理流水线
+
+浏览器线程只负责检索和下载（受页面和请求速率限制的部分），
+读取 ENW、重命名、获取其他格式、写入缓存和标题索引交给后台线程，
+浏览器线程立即开始下一篇论文，论文之间的速率等待也与后处理重叠。
+队列有上限，后处理跟不上时浏览器线程会等待，不会无限堆积。
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 结果已交给后处理线程，稍后通过回调给出
+DEFERRED = object()
+
+
+class PostProcessor:
+    """
+    有界队列加固定数量的后台线程
+
+    用法：
+        pipeline = PostProcessor(workers=2)
+        pipeline.submit(job)     # 队列已满时阻塞
+        pipeline.join()          # 等待已提交的任务全部完成
+        pipeline.close()         # 完成剩余任务并停止线程
+    """
+
+    def __init__(self, workers=2, max_pending=None):
+        """
+        参数：
+        workers (int): 后台线程数量
+        max_pending (int): 队列中最多等待的任务数，默认为线程数量的两倍
+        """
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=max_pending or self.workers * 2)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"cite-post-{n}", daemon=True)
+            for n in range(1, self.workers + 1)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                job()
+            except Exception as e:
+                # 任务自己负责记录失败，这里只保证线程不退出
+                logger.error(f"后处理任务出错: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, job):
+        """
+        提交一个无参数的任务
+
+        参数：
+        job (callable): 在后台线程中执行的任务
+        """
+        self._queue.put(job)
+
+    def join(self):
+        """
+        等待已提交的任务全部完成
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        完成剩余任务后停止所有后台线程
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
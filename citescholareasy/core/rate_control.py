@@ -0,0 +1,140 @@
+"""
+自适应请求速率控制
+
+令牌桶限制向 Google Scholar 发出请求的速率，速率按 AIMD 调整：
+每次正常响应加性提高，遇到验证码或 sorry 页面时减半，连接错误时小幅降低。
+学到的速率保存到文件中，下次运行从这个速率开始。
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateController:
+    """
+    令牌桶 + AIMD 速率控制器，可在多个工作线程间共享
+
+    特点：
+    1. acquire() 在发出请求前调用，必要时等待令牌
+    2. on_success()/on_captcha()/on_error() 根据响应调整速率
+    3. 等待时间带有随机抖动，避免固定节奏
+    """
+
+    def __init__(self, state_path=None, initial_rate=20.0, min_rate=2.0, max_rate=60.0,
+                 increase=1.0, captcha_factor=0.5, error_factor=0.8, burst=1.0, jitter=0.2):
+        """
+        参数：
+        state_path (str): 保存速率的 JSON 文件路径，None 表示不保存
+        initial_rate (float): 没有保存记录时的初始速率（次/分钟）
+        min_rate (float): 最低速率（次/分钟）
+        max_rate (float): 最高速率（次/分钟）
+        increase (float): 每次正常响应提高的速率（次/分钟）
+        captcha_factor (float): 遇到验证码时速率乘以的系数
+        error_factor (float): 连接错误时速率乘以的系数
+        burst (float): 令牌桶容量
+        jitter (float): 等待时间的随机抖动比例
+        """
+        self.state_path = state_path
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.captcha_factor = captcha_factor
+        self.error_factor = error_factor
+        self.burst = burst
+        self.jitter = jitter
+        self.rate = self._load_rate(initial_rate)
+        self.captchas = 0
+        self.errors = 0
+        self.waited = 0.0
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _load_rate(self, initial_rate):
+        if self.state_path and os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    rate = float(json.load(f)["rate"])
+                logger.info(f"使用上次学到的请求速率: {rate:.1f} 次/分钟")
+                return min(self.max_rate, max(self.min_rate, rate))
+            except (ValueError, KeyError, OSError):
+                pass
+        return initial_rate
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate / 60.0)
+        self._updated = now
+
+    def acquire(self):
+        """
+        在发出请求前调用，等待到允许发出请求为止
+
+        返回：
+        float: 实际等待的秒数
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            # 令牌不足时预订下一个令牌，多个线程按顺序排队
+            self._tokens -= 1
+            wait = -self._tokens * 60.0 / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            time.sleep(wait)
+            with self._lock:
+                self.waited += wait
+        return wait
+
+    def _set_rate(self, rate):
+        self._refill(time.monotonic())
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    def on_success(self):
+        """
+        正常响应：加性提高速率
+        """
+        with self._lock:
+            self._set_rate(self.rate + self.increase)
+
+    def on_captcha(self):
+        """
+        遇到验证码、sorry 页面或限流：速率减半并清空令牌
+        """
+        with self._lock:
+            self.captchas += 1
+            self._set_rate(self.rate * self.captcha_factor)
+            self._tokens = min(self._tokens, 0.0)
+            self._save_locked()
+
+    def on_error(self):
+        """
+        连接错误：小幅降低速率
+        """
+        with self._lock:
+            self.errors += 1
+            self._set_rate(self.rate * self.error_factor)
+
+    def describe(self):
+        """
+        返回当前速率的简短描述，用于进度输出
+        """
+        return f"速率 {self.rate:.1f} 次/分钟"
+
+    def save(self):
+        """
+        保存当前速率
+        """
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        if not self.state_path:
+            return
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"rate": self.rate, "updated_at": time.time()}, f)
+        os.replace(temp_path, self.state_path)
@@ -0,0 +1,490 @@
+"""
+紧凑的引用库存储
+
+按文件保存时每篇论文占用一个 .enw 文件（以及各格式的并列文件），几十万篇论文意味着几十万个 inode，
+目录扫描和文件名冲突检测都很慢。这里改为把所有引用追加写入少量段文件（.store/segment-*.dat），
+另用 SQLite 保存偏移索引：
+1. 按规范化标题或内容摘要查找记录都只需一次索引查询
+2. 内容完全相同的引用只保存一份
+3. 替换掉的旧内容在 compact 时回收
+4. 索引丢失时可以从段文件重建
+
+段文件中每个条目为一行 JSON 头（记录 id、格式、标题、长度）加上引用原文。
+需要按文件保存的形式时，用 export files 导出。
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from citescholareasy.core.enw import iter_lines_records
+from citescholareasy.core.normalize import normalize_title
+
+STORE_DIR = ".store"
+INDEX_NAME = "index.sqlite3"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".dat"
+# 当前段文件超过这个大小后写入新的段文件
+SEGMENT_SIZE = 64 * 1024 * 1024
+
+# 索引中规范化标题的版本，记录在 PRAGMA user_version 中；normalize_title 改变时递增，打开旧索引时重新计算
+KEY_VERSION = 1
+
+_SEGMENT_RE = re.compile(re.escape(SEGMENT_PREFIX) + r"(\d+)" + re.escape(SEGMENT_SUFFIX) + "$")
+
+
+def content_digest(text):
+    """
+    计算引用内容的摘要，用于按内容去重
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def open_store(library_dir):
+    """
+    打开引用库中已有的紧凑存储
+
+    参数：
+    library_dir (str): 引用库目录
+
+    返回：
+    PackedStore/None: 引用库没有使用紧凑存储时返回 None
+    """
+    if os.path.isdir(os.path.join(library_dir, STORE_DIR)):
+        return PackedStore(library_dir)
+    return None
+
+
+class PackedStore:
+    """
+    追加写入的引用存储，可在多个线程间共享
+
+    记录以"引用路径"对外表示，形如 <引用库>/.store/<id>.enw，
+    可以像 .enw 文件路径一样写入任务日志和标题索引，但并不对应磁盘上的文件
+    """
+
+    def __init__(self, library_dir, segment_size=SEGMENT_SIZE):
+        """
+        参数：
+        library_dir (str): 引用库目录
+        segment_size (int): 单个段文件的大小上限（字节）
+        """
+        self.library_dir = os.path.abspath(library_dir)
+        self.directory = os.path.join(self.library_dir, STORE_DIR)
+        self.segment_size = segment_size
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.index_path = os.path.join(self.directory, INDEX_NAME)
+        rebuild = not os.path.exists(self.index_path)
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL 模式下 NORMAL 只在检查点时同步，进程崩溃不会丢失已提交的记录
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT,
+                    key TEXT NOT NULL,
+                    digest TEXT NOT NULL UNIQUE,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS records_key ON records (key)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    record_id INTEGER NOT NULL,
+                    format TEXT NOT NULL,
+                    segment INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    digest TEXT,
+                    PRIMARY KEY (record_id, format)
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(blobs)")}
+            if "digest" not in columns:
+                # 旧索引没有内容摘要，这些条目在下次写入同一格式时读出原文比较
+                self._conn.execute("ALTER TABLE blobs ADD COLUMN digest TEXT")
+            if rebuild and self._segments():
+                self._rebuild()
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < KEY_VERSION:
+                self._rekey()
+            self._conn.commit()
+        self._writer = None
+        self._segment = None
+
+    def _segments(self):
+        """
+        返回已有段文件的编号（升序）
+        """
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+    def _open_writer(self, number):
+        if self._writer:
+            self._writer.close()
+        self._segment = number
+        self._writer = open(self._segment_path(number), 'ab')
+
+    def _append(self, record_id, fmt, title, text):
+        """
+        追加一个条目，返回 (段编号, 偏移, 条目长度)；调用方持有锁
+        """
+        if self._writer is None:
+            segments = self._segments()
+            self._open_writer(segments[-1] if segments else 1)
+        elif self._writer.tell() >= self.segment_size:
+            self._open_writer(self._segment + 1)
+        body = text.encode("utf-8")
+        header = json.dumps({"id": record_id, "format": fmt, "title": title, "length": len(body)},
+                            ensure_ascii=False).encode("utf-8")
+        entry = header + b"\n" + body + b"\n"
+        offset = self._writer.tell()
+        self._writer.write(entry)
+        self._writer.flush()
+        return self._segment, offset, len(entry)
+
+    def _read_entry(self, segment, offset):
+        """
+        读取一个条目，返回 (JSON 头, 原文字节)；条目不完整时返回 None
+        """
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return self._read_next(f)
+
+    @staticmethod
+    def _read_next(f):
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
+        try:
+            header = json.loads(line)
+        except ValueError:
+            return None
+        body = f.read(header["length"] + 1)
+        if len(body) != header["length"] + 1:
+            return None
+        return header, body[:-1]
+
+    def _rebuild(self):
+        """
+        索引丢失时扫描段文件重建；同一记录同一格式以最后写入的条目为准
+        """
+        print("重建紧凑存储索引...")
+        for number in self._segments():
+            with open(self._segment_path(number), 'rb') as f:
+                while True:
+                    offset = f.tell()
+                    entry = self._read_next(f)
+                    if entry is None:
+                        # 崩溃时写了一半的条目
+                        break
+                    header, body = entry
+                    digest = content_digest(body.decode("utf-8"))
+                    if header["format"] == "enw":
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO records (id, title, key, digest, created_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (header["id"], header["title"], normalize_title(header["title"] or ""),
+                             digest, time.time()),
+                        )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO blobs (record_id, format, segment, offset, length, digest) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (header["id"], header["format"], number, offset, f.tell() - offset, digest),
+                    )
+
+    def _rekey(self):
+        """
+        按当前的规范化方式重新计算记录的标题键
+        """
+        rows = self._conn.execute("SELECT id, title FROM records").fetchall()
+        self._conn.executemany("UPDATE records SET key = ? WHERE id = ?",
+                               [(normalize_title(title or ""), record_id) for record_id, title in rows])
+        self._conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+    def ref(self, record_id):
+        """
+        返回记录的引用路径
+        """
+        return os.path.join(self.directory, f"{record_id}.enw")
+
+    def owns(self, path):
+        """
+        路径是否为本存储中的记录
+        """
+        return os.path.dirname(path) == self.directory
+
+    def record_id(self, path):
+        """
+        从引用路径解析记录 id，不是本存储中的记录时返回 None
+        """
+        if not self.owns(path):
+            return None
+        name = os.path.basename(path)[:-len(".enw")]
+        return int(name) if name.isdigit() else None
+
+    def find(self, enw_text):
+        """
+        查找内容完全相同的记录
+
+        返回：
+        str/None: 引用路径
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM records WHERE digest = ?",
+                                     (content_digest(enw_text),)).fetchone()
+        return self.ref(row[0]) if row else None
+
+    def lookup(self, title):
+        """
+        按规范化标题查找记录
+
+        返回：
+        list: 引用路径，较新的在前
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM records WHERE key = ? ORDER BY id DESC",
+                                      (normalize_title(title),)).fetchall()
+        return [self.ref(row[0]) for row in rows]
+
+    def put(self, enw_text, title):
+        """
+        保存一条引用；内容完全相同的记录已存在时直接返回它
+
+        参数：
+        enw_text (str): EndNote 引用内容
+        title (str): 论文标题（EndNote 中的 %T，没有时为搜索标题）
+
+        返回：
+        str: 引用路径
+        """
+        digest = content_digest(enw_text)
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM records WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                return self.ref(row[0])
+            cursor = self._conn.execute(
+                "INSERT INTO records (title, key, digest, created_at) VALUES (?, ?, ?, ?)",
+                (title, normalize_title(title), digest, time.time()),
+            )
+            record_id = cursor.lastrowid
+            location = self._append(record_id, "enw", title, enw_text)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs (record_id, format, segment, offset, length, digest) "
+                "VALUES (?, 'enw', ?, ?, ?, ?)",
+                (record_id,) + location + (digest,),
+            )
+            self._conn.commit()
+        return self.ref(record_id)
+
+    def put_formats(self, path, texts):
+        """
+        保存记录的其他引用格式，替换已有的同格式内容；内容与已保存的完全相同时不再追加
+
+        参数：
+        path (str): 引用路径
+        texts (dict): 格式到引用内容的映射（enw 会被忽略）
+
+        返回：
+        list: 实际写入的格式
+        """
+        record_id = self.record_id(path)
+        written = []
+        with self._lock:
+            row = self._conn.execute("SELECT title FROM records WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                raise KeyError(path)
+            for fmt, text in texts.items():
+                if fmt == "enw":
+                    continue
+                digest = content_digest(text)
+                stored = self._conn.execute(
+                    "SELECT digest, segment, offset FROM blobs WHERE record_id = ? AND format = ?", (record_id, fmt)
+                ).fetchone()
+                if stored and stored[0] is None:
+                    entry = self._read_entry(stored[1], stored[2])
+                    stored = (content_digest(entry[1].decode("utf-8")),) if entry else None
+                if stored and stored[0] == digest:
+                    continue
+                location = self._append(record_id, fmt, row[0], text)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (record_id, format, segment, offset, length, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (record_id, fmt) + location + (digest,),
+                )
+                written.append(fmt)
+            self._conn.commit()
+        return written
+
+    def formats(self, path):
+        """
+        返回记录已保存的格式集合，记录不存在时为空集合
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT format FROM blobs WHERE record_id = ?",
+                                      (self.record_id(path),)).fetchall()
+        return {row[0] for row in rows}
+
+    def exists(self, path):
+        """
+        记录是否存在
+        """
+        return "enw" in self.formats(path)
+
+    def read(self, path, fmt="enw"):
+        """
+        读取记录某一格式的内容
+
+        返回：
+        str/None: 引用内容；记录或格式不存在、条目损坏时返回 None
+        """
+        record_id = self.record_id(path)
+        with self._lock:
+            row = self._conn.execute("SELECT segment, offset FROM blobs WHERE record_id = ? AND format = ?",
+                                     (record_id, fmt)).fetchone()
+        if row is None:
+            return None
+        entry = self._read_entry(*row)
+        if entry is None or entry[0]["id"] != record_id or entry[0]["format"] != fmt:
+            print(f"紧凑存储中的条目已损坏: {path} ({fmt})")
+            return None
+        return entry[1].decode("utf-8")
+
+    def titles(self):
+        """
+        逐条返回 (引用路径, 标题)
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, title FROM records ORDER BY id").fetchall()
+        for record_id, title in rows:
+            if title:
+                yield self.ref(record_id), title
+
+    def _iter_entries(self, fmt=None):
+        """
+        按记录 id 顺序逐条读取条目，返回 (记录 id, 格式, 标题, 内容)
+
+        使用单独的只读连接逐行读取索引，每个段文件只打开一次，内存占用与记录数量无关
+        """
+        conn = sqlite3.connect(self.index_path)
+        handles = {}
+        try:
+            rows = conn.execute(
+                "SELECT blobs.record_id, blobs.format, records.title, blobs.segment, blobs.offset "
+                "FROM blobs JOIN records ON records.id = blobs.record_id "
+                + ("WHERE blobs.format = ? " if fmt else "")
+                + "ORDER BY blobs.record_id, blobs.format",
+                (fmt,) if fmt else (),
+            )
+            for record_id, entry_format, title, segment, offset in rows:
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self._segment_path(segment), 'rb')
+                f.seek(offset)
+                entry = self._read_next(f)
+                if entry is None or entry[0]["id"] != record_id or entry[0]["format"] != entry_format:
+                    print(f"紧凑存储中的条目已损坏: {self.ref(record_id)} ({entry_format})")
+                    continue
+                yield record_id, entry_format, title, entry[1].decode("utf-8")
+        finally:
+            for f in handles.values():
+                f.close()
+            conn.close()
+
+    def iter_texts(self):
+        """
+        逐条返回 (引用路径, 标题, 格式到内容的映射)，按记录 id 顺序
+        """
+        for record_id, entries in itertools.groupby(self._iter_entries(), key=lambda entry: entry[0]):
+            entries = list(entries)
+            yield self.ref(record_id), entries[0][2], {fmt: text for _, fmt, _, text in entries}
+
+    def iter_records(self):
+        """
+        逐条返回 (引用路径, EnwRecord)，与 enw.iter_directory 的产出形式相同
+        """
+        for record_id, _, _, text in self._iter_entries("enw"):
+            path = self.ref(record_id)
+            for record in iter_lines_records(text.splitlines()):
+                yield path, record
+
+    def stats(self):
+        """
+        返回存储的统计信息
+
+        返回：
+        dict: records（记录数）、blobs（条目数）、segments（段文件数）、
+              size（段文件总字节数）、live（仍被索引引用的条目字节数）
+        """
+        with self._lock:
+            records = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            blobs, live = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM blobs").fetchone()
+        segments = self._segments()
+        size = sum(os.path.getsize(self._segment_path(number)) for number in segments)
+        return {"records": records, "blobs": blobs, "segments": len(segments), "size": size, "live": live}
+
+    def compact(self):
+        """
+        把仍被引用的条目按顺序复制到新的段文件，删除旧段文件，回收被替换的内容和写了一半的条目
+
+        返回：
+        tuple: (压缩前字节数, 压缩后字节数)
+        """
+        with self._lock:
+            old_segments = self._segments()
+            before = sum(os.path.getsize(self._segment_path(number)) for number in old_segments)
+            rows = self._conn.execute(
+                "SELECT record_id, format, segment, offset FROM blobs ORDER BY segment, offset"
+            ).fetchall()
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+            # 新段文件的编号接在旧段文件之后，提交索引前中断不影响原有数据
+            self._open_writer((old_segments[-1] if old_segments else 0) + 1)
+            moved = []
+            broken = []
+            for record_id, fmt, segment, offset in rows:
+                entry = self._read_entry(segment, offset)
+                if entry is None:
+                    print(f"删除已损坏的条目: {self.ref(record_id)} ({fmt})")
+                    broken.append((record_id, fmt))
+                    continue
+                header, body = entry
+                moved.append(self._append(record_id, fmt, header["title"], body.decode("utf-8"))
+                             + (record_id, fmt))
+            self._conn.executemany(
+                "UPDATE blobs SET segment = ?, offset = ?, length = ? WHERE record_id = ? AND format = ?",
+                moved,
+            )
+            self._conn.executemany("DELETE FROM blobs WHERE record_id = ? AND format = ?", broken)
+            # 主记录损坏后整条记录无法使用
+            self._conn.execute("DELETE FROM records WHERE id NOT IN (SELECT record_id FROM blobs WHERE format = 'enw')")
+            self._conn.execute("DELETE FROM blobs WHERE record_id NOT IN (SELECT id FROM records)")
+            self._conn.commit()
+            for number in old_segments:
+                os.remove(self._segment_path(number))
+            after = sum(os.path.getsize(self._segment_path(number)) for number in self._segments())
+        return before, after
+
+    def close(self):
+        """
+        关闭段文件和索引
+        """
+        with self._lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+            self._conn.close()
@@ -0,0 +1,192 @@
+"""
+引用库标题索引
+
+为引用库中每个 .enw 文件（以及紧凑存储中每条记录）的 %T 标题建立字符 n-gram 倒排索引，
+在访问网络之前快速找出库中是否已有几乎相同的记录。
+
+索引保存在引用库目录中：.title_index.json 为快照，.title_index.log 为追加写入的增量日志，
+新增记录只追加一行，关闭时合并为新的快照。
+"""
+import json
+import os
+import threading
+from collections import defaultdict
+
+from citescholareasy.core.matcher import default_matcher
+
+SNAPSHOT_NAME = ".title_index.json"
+LOG_NAME = ".title_index.log"
+
+# 出现在超过这个比例文档中的 n-gram 区分度太低，查询时跳过
+COMMON_GRAM_RATIO = 0.2
+
+
+class TitleIndex:
+    """
+    引用库标题的倒排索引
+
+    主要功能：
+    1. 首次使用时扫描引用库建立索引，之后增量维护
+    2. closest：返回与给定标题最相似的已有记录
+    """
+
+    def __init__(self, library_dir, read_title, matcher=None, store=None):
+        """
+        参数：
+        library_dir (str): 引用库目录
+        read_title (callable): 从 .enw 文件读取 %T 标题的函数，用于首次建立索引
+        matcher (TitleMatcher): 标题匹配器
+        store (PackedStore): 引用库的紧凑存储（如果使用）
+        """
+        self.library_dir = os.path.abspath(library_dir)
+        self.store = store
+        self.snapshot_path = os.path.join(self.library_dir, SNAPSHOT_NAME)
+        self.log_path = os.path.join(self.library_dir, LOG_NAME)
+        self.matcher = matcher or default_matcher
+        self._lock = threading.Lock()
+        self._docs = {}        # 文件名 -> 标题
+        self._postings = defaultdict(set)  # n-gram -> 文件名集合
+        self._log_entries = 0
+        self._load(read_title)
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def _index(self, filename, title, grams=None):
+        self._remove(filename)
+        self._docs[filename] = title
+        for gram in grams if grams is not None else self.matcher.grams(title):
+            self._postings[gram].add(filename)
+
+    def _remove(self, filename):
+        title = self._docs.pop(filename, None)
+        if title is None:
+            return
+        for gram in self.matcher.grams(title):
+            postings = self._postings.get(gram)
+            if postings:
+                postings.discard(filename)
+                if not postings:
+                    del self._postings[gram]
+
+    def _load(self, read_title):
+        """
+        读取快照和增量日志；没有快照时扫描引用库
+        """
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                docs = json.load(f)
+            # 快照中的标题一次批量规范化
+            for (filename, title), grams in zip(docs.items(), self.matcher.grams_many(docs.values())):
+                self._index(filename, title, grams)
+        else:
+            print("首次建立引用库标题索引...")
+            for filename in os.listdir(self.library_dir):
+                if filename.endswith(".enw") and not filename.startswith("."):
+                    title = read_title(os.path.join(self.library_dir, filename))
+                    if title:
+                        self._index(filename, title)
+            if self.store is not None:
+                for path, title in self.store.titles():
+                    self._index(os.path.relpath(path, self.library_dir), title)
+            self._write_snapshot()
+
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._log_entries += 1
+                    if entry.get("title") is None:
+                        self._remove(entry["file"])
+                    else:
+                        self._index(entry["file"], entry["title"])
+
+    def _write_snapshot(self):
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._docs, f, ensure_ascii=False)
+        os.replace(temp_path, self.snapshot_path)
+
+    def _append(self, filename, title):
+        self._log.write(json.dumps({"file": filename, "title": title}, ensure_ascii=False) + "\n")
+        self._log.flush()
+        self._log_entries += 1
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _exists(self, path):
+        if self.store is not None and self.store.owns(path):
+            return self.store.exists(path)
+        return os.path.exists(path)
+
+    def add(self, title, path):
+        """
+        记录引用库中新增的文件
+
+        参数：
+        title (str): 文件中的 %T 标题
+        path (str): 文件路径（位于引用库目录中）或紧凑存储的引用路径
+        """
+        filename = os.path.relpath(path, self.library_dir)
+        with self._lock:
+            self._index(filename, title)
+            self._append(filename, title)
+
+    def items(self):
+        """
+        返回 (文件名, 标题) 列表的快照
+        """
+        with self._lock:
+            return list(self._docs.items())
+
+    def closest(self, title, candidates=20, exclude=None):
+        """
+        查找与标题最相似的已有记录
+
+        参数：
+        title (str): 论文标题
+        candidates (int): 参与精确打分的候选数量
+        exclude (str): 不参与比较的文件名（查找库内重复时排除记录自身）
+
+        返回：
+        tuple/None: (已有标题, 文件路径, 相似度)；没有候选时返回 None
+        """
+        grams = self.matcher.grams(title)
+        with self._lock:
+            limit = max(1, int(len(self._docs) * COMMON_GRAM_RATIO)) if len(self._docs) > 1000 else None
+            counts = defaultdict(int)
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if not postings or (limit and len(postings) > limit):
+                    continue
+                for filename in postings:
+                    counts[filename] += 1
+            counts.pop(exclude, None)
+            shortlist = sorted(counts, key=counts.__getitem__, reverse=True)[:candidates]
+            titles = [self._docs[filename] for filename in shortlist]
+
+        while shortlist:
+            best_index, score = self.matcher.best_match(title, titles)
+            filename = shortlist[best_index]
+            path = os.path.join(self.library_dir, filename)
+            if self._exists(path):
+                return titles[best_index], path, score
+            # 文件已被删除，从索引中移除
+            with self._lock:
+                self._remove(filename)
+                self._append(filename, None)
+            del shortlist[best_index], titles[best_index]
+        return None
+
+    def close(self):
+        """
+        合并增量日志为新的快照
+        """
+        with self._lock:
+            self._log.close()
+            if self._log_entries:
+                self._write_snapshot()
+                open(self.log_path, 'w').close()
+                self._log_entries = 0
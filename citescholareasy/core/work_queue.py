@@ -0,0 +1,348 @@
+"""
+多进程、多主机共享的任务队列
+
+队列是一个 SQLite 数据库，放在共享文件系统上即可被多台机器上的任意数量的 download 进程同时使用：
+1. 进程每次领取一篇论文，领取时获得一段时间的租约，后台心跳线程定期续约
+2. 处理完成后写回结果（引用文件路径或失败原因）
+3. 进程崩溃或失联后租约过期，其他进程会自动重新领取这篇论文；
+   同一篇论文的租约过期次数达到上限时标记为失败，避免反复拖垮进程
+4. 正常退出（包括 Ctrl+C）时归还尚未完成的论文
+
+数据库使用默认的回滚日志模式：WAL 依赖共享内存，不能跨主机使用。
+租约以各主机的系统时间计算，主机之间的时钟偏差应远小于租约时长。
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from citescholareasy.core.normalize import normalize_title
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+STATES = (PENDING, LEASED, DONE, FAILED)
+
+# 默认租约时长（秒）；心跳每隔三分之一租约续约一次
+DEFAULT_LEASE = 300
+# 同一篇论文的租约最多过期几次
+DEFAULT_MAX_ATTEMPTS = 3
+# 等待其他进程释放数据库锁的最长时间（秒）
+BUSY_TIMEOUT = 60
+# 登记标题时每批提交的数量
+ADD_BATCH = 1000
+
+
+def make_owner():
+    """
+    生成进程的领取者标识：主机名:进程号:随机后缀
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    """
+    带租约的共享任务队列，可在同一进程的多个线程间共享
+
+    特点：
+    1. 以规范化标题为键，重复登记同一篇论文不会产生重复任务
+    2. 领取在 BEGIN IMMEDIATE 事务中完成，多个进程不会领到同一篇论文
+    3. 租约过期的论文优先于新论文被重新领取
+    """
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS, owner=None):
+        """
+        参数：
+        path (str): 队列数据库路径（多台机器使用时放在共享文件系统上）
+        lease_seconds (float): 租约时长（秒），超过这段时间没有续约的论文会被其他进程重新领取
+        max_attempts (int): 同一篇论文最多领取几次（租约过期后重新领取计为一次）
+        owner (str): 领取者标识，默认由主机名和进程号生成
+        """
+        self.path = os.path.abspath(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = owner or make_owner()
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._stop = threading.Event()
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # 自行控制事务，领取时需要 BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                     check_same_thread=False)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    owner TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    path TEXT,
+                    reason TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    owner TEXT PRIMARY KEY,
+                    last_seen REAL NOT NULL
+                )
+            """)
+
+    def add(self, titles):
+        """
+        登记待处理的论文，已登记的论文（包括已完成的）保持原状
+
+        参数：
+        titles (iterable): 论文标题，可以是按需读取的迭代器
+
+        返回：
+        int: 新登记的数量
+        """
+        added = 0
+        batch = []
+
+        def flush():
+            nonlocal added
+            now = time.time()
+            with self._lock:
+                before = self._conn.total_changes
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (key, title, state, updated_at) VALUES (?, ?, ?, ?)",
+                    [(normalize_title(title), title, PENDING, now) for title in batch],
+                )
+                self._conn.execute("COMMIT")
+                added += self._conn.total_changes - before
+            batch.clear()
+
+        for title in titles:
+            batch.append(title)
+            if len(batch) >= ADD_BATCH:
+                flush()
+        if batch:
+            flush()
+        return added
+
+    def claim(self):
+        """
+        领取一篇论文：先领取租约已过期的论文，再领取新论文
+
+        返回：
+        str/None: 论文标题；没有可领取的论文时返回 None
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    row = self._conn.execute(
+                        "SELECT id, title, attempts FROM tasks WHERE state = ? AND lease_until < ? "
+                        "ORDER BY lease_until LIMIT 1", (LEASED, now)
+                    ).fetchone() or self._conn.execute(
+                        "SELECT id, title, attempts FROM tasks WHERE state = ? ORDER BY id LIMIT 1", (PENDING,)
+                    ).fetchone()
+                    if row is None:
+                        title = None
+                        break
+                    task_id, title, attempts = row
+                    if attempts >= self.max_attempts:
+                        # 已被领取过多次且每次都没有完成，处理它的进程可能反复崩溃
+                        self._conn.execute(
+                            "UPDATE tasks SET state = ?, owner = NULL, lease_until = NULL, reason = ?, "
+                            "updated_at = ? WHERE id = ?",
+                            (FAILED, f"租约过期 {attempts} 次，处理该论文的进程可能反复崩溃", now, task_id),
+                        )
+                        logger.warning(f"放弃租约多次过期的论文: {title}")
+                        continue
+                    self._conn.execute(
+                        "UPDATE tasks SET state = ?, owner = ?, lease_until = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE id = ?",
+                        (LEASED, self.owner, now + self.lease_seconds, now, task_id),
+                    )
+                    break
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return title
+
+    def titles(self):
+        """
+        逐篇领取论文的迭代器，队列中没有可领取的论文时结束
+
+        返回：
+        generator: 论文标题
+        """
+        while not self._stop.is_set():
+            title = self.claim()
+            if title is None:
+                return
+            yield title
+
+    def finish(self, title, path=None, reason=None):
+        """
+        写回一篇论文的处理结果
+
+        参数：
+        title (str): 论文标题
+        path (str): 引用文件路径，成功时给出
+        reason (str): 失败原因
+
+        返回：
+        bool: 是否写回；本进程的租约已过期（论文可能已被其他进程重新领取）时不修改队列，返回 False
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = ?, lease_until = NULL, path = ?, reason = ?, "
+                "updated_at = ? WHERE key = ? AND owner = ? AND lease_until >= ?",
+                (DONE if path else FAILED, path, None if path else (reason or "未知原因"),
+                 now, normalize_title(title), self.owner, now),
+            )
+        return cursor.rowcount > 0
+
+    def renew(self):
+        """
+        为本进程持有的全部租约续约，并记录心跳
+
+        返回：
+        int: 续约的论文数量
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE tasks SET lease_until = ? WHERE state = ? AND owner = ?",
+                    (now + self.lease_seconds, LEASED, self.owner),
+                )
+                self._conn.execute("INSERT OR REPLACE INTO workers (owner, last_seen) VALUES (?, ?)",
+                                   (self.owner, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # 不回滚的话连接会一直持有写锁，之后的 BEGIN 全部失败
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def start_heartbeat(self):
+        """
+        启动后台心跳线程，每隔三分之一租约时长续约一次
+        """
+        if self._heartbeat is not None:
+            return
+        self.renew()
+
+        def beat():
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    # 共享文件系统暂时不可用时下次再试，租约还有三分之二的余量
+                    logger.warning(f"续约失败: {str(e)}")
+
+        self._heartbeat = threading.Thread(target=beat, name="work-queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def release(self):
+        """
+        把本进程领取但尚未完成的论文放回队列，不计入领取次数
+
+        返回：
+        int: 放回的论文数量
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, lease_until = NULL, attempts = MAX(attempts - 1, 0), "
+                "updated_at = ? WHERE state = ? AND owner = ?",
+                (PENDING, time.time(), LEASED, self.owner),
+            )
+            self._conn.execute("DELETE FROM workers WHERE owner = ?", (self.owner,))
+        return cursor.rowcount
+
+    def retry_failed(self):
+        """
+        把失败的论文重新放回队列
+
+        返回：
+        int: 放回的论文数量
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, attempts = 0, reason = NULL, updated_at = ? "
+                "WHERE state = ?", (PENDING, time.time(), FAILED),
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        """
+        统计各状态的论文数量
+
+        返回：
+        dict: 状态到数量的映射，另有 expired 表示租约已过期、等待重新领取的数量
+        """
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+            expired = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE state = ? AND lease_until < ?", (LEASED, time.time())
+            ).fetchone()[0]
+        result = {state: counts.get(state, 0) for state in STATES}
+        result["expired"] = expired
+        return result
+
+    def workers(self):
+        """
+        列出记录过心跳的进程
+
+        返回：
+        list: (领取者标识, 最后心跳时间, 当前持有的论文数量)，按最后心跳时间倒序
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT w.owner, w.last_seen, "
+                "(SELECT COUNT(*) FROM tasks t WHERE t.state = ? AND t.owner = w.owner) "
+                "FROM workers w ORDER BY w.last_seen DESC", (LEASED,)
+            ).fetchall()
+
+    def failures(self, limit=20):
+        """
+        返回最近失败的论文
+
+        返回：
+        list: (标题, 失败原因)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT title, reason FROM tasks WHERE state = ? ORDER BY updated_at DESC LIMIT ?", (FAILED, limit)
+            ).fetchall()
+
+    def close(self):
+        """
+        停止心跳，归还尚未完成的论文并关闭数据库
+
+        返回：
+        int: 归还的论文数量
+        """
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        try:
+            released = self.release()
+        finally:
+            with self._lock:
+                self._conn.close()
+        return released
@@ -0,0 +1,177 @@
+"""
+多浏览器并行下载
+
+每个工作线程拥有独立的 Chrome 实例和独立的下载目录，
+从共享的标题来源中按需取任务，最终文件统一移动到共享的引用库目录。
+"""
+import os
+import shutil
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RunStats:
+    """
+    线程安全的运行统计，汇总所有工作线程的进度
+    """
+
+    def __init__(self, total=None):
+        """
+        参数：
+        total (int/None): 标题总数，未知时为 None
+        """
+        self.total = total
+        self.done = 0
+        self.succeeded = 0
+        self.failed = []
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, title, ok):
+        """
+        记录单篇论文的处理结果
+
+        返回：
+        int: 当前已处理的数量
+        """
+        with self._lock:
+            self.done += 1
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed.append(title)
+            return self.done
+
+    def progress(self):
+        """
+        返回进度文字，例如 "15/2000"
+        """
+        return f"{self.done}/{self.total}" if self.total is not None else str(self.done)
+
+    def print_summary(self):
+        """
+        打印运行总结
+        """
+        elapsed = time.time() - self.start_time
+        rate = self.done / elapsed * 60 if elapsed > 0 else 0
+        print("\n" + "=" * 50)
+        print("处理完成")
+        print(f"共处理: {self.done} 篇，成功: {self.succeeded} 篇，失败: {len(self.failed)} 篇")
+        print(f"耗时: {elapsed:.1f} 秒 ({rate:.1f} 篇/分钟)")
+        if self.failed:
+            print("未成功的论文：")
+            for title in self.failed:
+                print(f"  - {title}")
+        print("=" * 50)
+
+
+class SharedTitles:
+    """
+    多个工作线程共用的标题迭代器，按需读取，不预先放入队列
+    """
+
+    def __init__(self, titles):
+        self._titles = iter(titles)
+        self._lock = threading.Lock()
+
+    def next(self):
+        """
+        取下一个标题，读完后返回 None
+        """
+        with self._lock:
+            return next(self._titles, None)
+
+
+class BrowserWorkerPool:
+    """
+    并行下载工作池
+
+    特点：
+    1. N 个独立的下载器，每个有自己的浏览器和下载目录
+    2. 共享标题来源，空闲的工作线程自动取下一篇
+    3. 所有工作线程共用一份进度和总结
+    """
+
+    def __init__(self, downloader, workers):
+        """
+        参数：
+        downloader (CiteDownloader): 提供配置和引用库目录的主下载器
+        workers (int): 工作线程数量
+        """
+        self.downloader = downloader
+        self.workers = workers
+        self.stop_event = threading.Event()
+
+    def _worker(self, worker_id, titles, stats):
+        """
+        单个工作线程：循环取标题并下载
+        """
+        worker_dir = os.path.join(self.downloader.download_dir, f".worker-{worker_id}")
+        worker = self.downloader.clone_for_worker(worker_dir)
+
+        def finished(title, new_path, source):
+            # 启用后处理流水线时由后台线程调用
+            stats.record(title, bool(new_path))
+            status = "成功" if new_path else "失败"
+            print(f"[工作线程 {worker_id}] {status} ({stats.progress()}): {title}")
+
+        try:
+            while not self.stop_event.is_set():
+                title = titles.next()
+                if title is None:
+                    break
+                print(f"\n[工作线程 {worker_id}] 处理论文 [{worker.rate.describe()}]: {title}")
+                try:
+                    worker.download_title(title, done=finished)
+                except Exception as e:
+                    logger.error(f"[工作线程 {worker_id}] 处理论文时发生未知错误: {str(e)}")
+                    finished(title, None, None)
+        finally:
+            if worker.pipeline:
+                # 已提交的后处理任务还会读取本线程下载目录中的文件
+                worker.pipeline.join()
+            worker.close()
+            shutil.rmtree(worker_dir, ignore_errors=True)
+
+    def run(self, titles):
+        """
+        并行处理所有标题
+
+        参数：
+        titles (iterable): 论文标题，可以是按需读取的迭代器
+
+        返回：
+        RunStats: 汇总统计
+        """
+        shared_titles = SharedTitles(titles)
+        total = len(titles) if hasattr(titles, "__len__") else None
+        stats = RunStats(total=total)
+
+        workers = (min(self.workers, total) or 1) if total is not None else self.workers
+        print(f"\n启动 {workers} 个并行浏览器...")
+        threads = [
+            threading.Thread(target=self._worker, args=(n, shared_titles, stats),
+                             name=f"cite-worker-{n}")
+            for n in range(1, workers + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                # 使用短超时 join，保证主线程能响应 KeyboardInterrupt
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            print("\n正在停止所有工作线程...")
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+            raise
+        if self.downloader.pipeline:
+            # 浏览器已全部完成，等待后处理线程整理完最后几篇
+            self.downloader.pipeline.join()
+        stats.print_summary()
+        return stats